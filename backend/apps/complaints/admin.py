@@ -1,10 +1,16 @@
+from apps.utils.admin import LargeTableAdmin
 from django.contrib import admin
 
 from .models import Complaint
 
 
 @admin.register(Complaint)
-class ComplaintAdmin(admin.ModelAdmin):
+class ComplaintAdmin(LargeTableAdmin):
     list_display = ("author", "content_object", "status", "created_at", "resolved_at")
     list_filter = ("status", "created_at")
     search_fields = ("author__email", "reason")
+    list_select_related = ("author", "content_type")
+    autocomplete_fields = ("author",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("content_object")
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+from apps.utils.admin import AutocompleteFilter, LargeTableAdmin, LimitedInlineMixin, SubqueryCount
 from django.contrib import admin
+from django.db.models import OuterRef
 from django.utils.translation import gettext_lazy as _
 
 from .models import ChatRoom, ChatRoomParticipant, ChatMessage
+from .search import matching_messages, search_supported
 
 
-class ChatRoomParticipantInline(admin.TabularInline):
+class ChatRoomParticipantInline(LimitedInlineMixin, admin.TabularInline):
     """
-    Участники комнаты — редактируются прямо из комнаты.
+    Участники комнаты — редактируются прямо из комнаты (первые limit,
+    остальные — в списке участников с фильтром по комнате).
     """
     model = ChatRoomParticipant
     extra = 1
@@ -18,16 +22,19 @@ class ChatRoomParticipantInline(admin.TabularInline):
     show_change_link = True
 
 
-class ChatMessageInline(admin.TabularInline):
+class ChatMessageInline(LimitedInlineMixin, admin.TabularInline):
     """
-    Сообщения комнаты — только для чтения, чтобы видеть контекст.
+    Последние limit сообщений комнаты — только для чтения, чтобы видеть контекст.
     """
     model = ChatMessage
     extra = 0
     fields = ("created_at", "sender", "short_text")
     readonly_fields = ("created_at", "sender", "short_text")
     can_delete = False
-    ordering = ("created_at",)
+    ordering = ("-created_at", "-id")
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("sender")
 
     @admin.display(description=_("Текст"))
     def short_text(self, obj: ChatMessage) -> str:
@@ -35,7 +42,7 @@ class ChatMessageInline(admin.TabularInline):
 
 
 @admin.register(ChatRoom)
-class ChatRoomAdmin(admin.ModelAdmin):
+class ChatRoomAdmin(LargeTableAdmin):
     """
     Удобное управление комнатами:
     - фильтр по типу,
@@ -51,7 +58,8 @@ class ChatRoomAdmin(admin.ModelAdmin):
         "created_at",
         "updated_at",
     )
-    list_filter = ("type", "owner")
+    list_filter = ("type", ("owner", AutocompleteFilter))
+    list_select_related = ("owner",)
     search_fields = (
         "id",
         "name",
@@ -65,19 +73,24 @@ class ChatRoomAdmin(admin.ModelAdmin):
     readonly_fields = ("id", "created_at", "updated_at")
     ordering = ("-created_at",)
 
-    @admin.display(description=_("Кол-во участников"))
+    def get_queryset(self, request):
+        members = ChatRoomParticipant.objects.filter(room=OuterRef("pk"))
+        return super().get_queryset(request).annotate(participants_total=SubqueryCount(members))
+
+    @admin.display(description=_("Кол-во участников"), ordering="participants_total")
     def participants_count(self, obj: ChatRoom) -> int:
-        return obj.participants.count()
+        return obj.participants_total  # pyright: ignore[reportAttributeAccessIssue]
 
 
 @admin.register(ChatRoomParticipant)
-class ChatRoomParticipantAdmin(admin.ModelAdmin):
+class ChatRoomParticipantAdmin(LargeTableAdmin):
     """
     Отдельный просмотр/редактирование участия пользователя в комнатах.
     Удобно, если нужно найти все комнаты конкретного пользователя.
     """
     list_display = ("room", "user", "is_admin", "joined_at")
-    list_filter = ("is_admin",)
+    list_filter = ("is_admin", ("room", AutocompleteFilter))
+    list_select_related = ("room", "user")
     search_fields = (
         "room__id",
         "room__name",
@@ -90,17 +103,17 @@ class ChatRoomParticipantAdmin(admin.ModelAdmin):
 
 
 @admin.register(ChatMessage)
-class ChatMessageAdmin(admin.ModelAdmin):
+class ChatMessageAdmin(LargeTableAdmin):
     """
     Админка для сообщений:
     - просмотр истории по комнате/пользователю,
-    - поиск по тексту,
+    - поиск по тексту (полнотекстовый, только на PostgreSQL),
     - по умолчанию только чтение.
     """
     list_display = ("created_at", "room", "sender", "short_text")
-    list_filter = ("room", "sender")
+    list_filter = (("room", AutocompleteFilter), ("sender", AutocompleteFilter))
+    list_select_related = ("room", "sender")
     search_fields = (
-        "text",
         "room__id",
         "room__name",
         "sender__email",
@@ -110,6 +123,14 @@ class ChatMessageAdmin(admin.ModelAdmin):
     readonly_fields = ("created_at", "room", "sender", "text")
     ordering = ("-created_at",)
 
+    def get_search_results(self, request, queryset, search_term):
+        # текст ищем по tsvector, а не ILIKE по всей таблице сообщений
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term and search_supported():
+            found = matching_messages(self.model.objects.all(), search_term).values("pk")
+            results |= queryset.filter(pk__in=found)
+        return results, may_have_duplicates
+
     @admin.display(description=_("Текст"))
     def short_text(self, obj: ChatMessage) -> str:
         return (obj.text[:80] + "…") if len(obj.text) > 80 else obj.text
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import uuid
+from typing import Any, AsyncIterator, Protocol
+from uuid import UUID
+
+import httpx
+from apps.messaging.services import broadcast_message, persist_message
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class ReplyGenerator(Protocol):
+    def stream(self, prompt: str) -> AsyncIterator[str]:
+        ...
+
+
+class FakeReplyGenerator:
+    """
+    Детерминированный генератор для тестов и локальной разработки:
+    повторяет запрос по словам, как модель отдаёт токены.
+    """
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        for token in re.findall(r"\S+\s*", f"Вы написали: {prompt}"):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield token
+
+
+class OpenAIReplyGenerator:
+    """
+    Потоковый ответ chat.completions через AsyncOpenAI (stream=True).
+
+    CHAT_BOT_API_BASE_URL — для OpenAI-совместимых серверов; по умолчанию api.openai.com.
+    """
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        async with AsyncOpenAI(
+            api_key=settings.CHAT_BOT_API_KEY,
+            base_url=settings.CHAT_BOT_API_BASE_URL,
+            timeout=httpx.Timeout(30, read=60),
+        ) as client:
+            stream = await client.chat.completions.create(
+                model=settings.CHAT_BOT_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+            )
+            async for chunk in stream:
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    yield content
+
+
+GENERATORS: dict[str, type[ReplyGenerator]] = {
+    "fake": FakeReplyGenerator,
+    "openai": OpenAIReplyGenerator,
+}
+
+
+def get_reply_generator() -> ReplyGenerator:
+    return GENERATORS[settings.CHAT_BOT_GENERATOR]()
+
+
+async def coalesce(tokens: AsyncIterator[str], interval: float, max_chars: int) -> AsyncIterator[str]:
+    """
+    Склейка токенов в куски: кусок уходит, когда с его первого токена прошло
+    interval секунд или набралось max_chars символов.
+
+    Следующий токен ждём в отдельной задаче, поэтому окно закрывается вовремя,
+    даже если генератор замолчал посреди ответа.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = aiter(tokens)
+    buffer: list[str] = []
+    size = 0
+    deadline: float | None = None
+    pending = asyncio.ensure_future(anext(iterator))
+    try:
+        while True:
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if done:
+                try:
+                    token = pending.result()
+                except StopAsyncIteration:
+                    break
+                pending = asyncio.ensure_future(anext(iterator))
+                if not token:
+                    continue
+                if not buffer:
+                    deadline = loop.time() + interval
+                buffer.append(token)
+                size += len(token)
+                if size < max_chars and loop.time() < deadline:  # pyright: ignore[reportOperatorIssue]
+                    continue
+
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+            deadline = None
+    finally:
+        if not pending.done():
+            pending.cancel()
+
+    if buffer:
+        yield "".join(buffer)
+
+
+@database_sync_to_async
+def get_bot_user() -> Any:
+    email = User.objects.normalize_email(settings.CHAT_BOT_EMAIL)
+    try:
+        return User.objects.get(email=email)
+    except User.DoesNotExist:
+        pass
+    try:
+        return User.objects.create_user(email=email, display_name=settings.CHAT_BOT_DISPLAY_NAME)
+    except IntegrityError:
+        # параллельный воркер успел создать первым
+        return User.objects.get(email=email)
+
+
+def stream_event(room_id: UUID | str, stream_id: str, display_name: str, text: str, is_start: bool) -> dict[str, Any]:
+    """
+    Кусок потокового ответа: без id и seq — в БД и буфер догрузки не попадает.
+    """
+    return {
+        "type": "chat.message",
+        "room_id": str(room_id),
+        "stream_id": stream_id,
+        "message": text,
+        "display_name": display_name,
+        "is_stream": True,
+        "is_start": is_start,
+        "is_end": False,
+    }
+
+
+async def stream_bot_reply(room_id: UUID | str, prompt: str, generator: ReplyGenerator | None = None) -> dict[str, Any] | None:
+    """
+    Ответ бота в комнату потоком: склеенные куски рассылаются по мере генерации,
+    сообщение сохраняется один раз — целиком, при is_end.
+
+    Завершающий кадр несёт id и seq сохранённого сообщения и пустой текст
+    (клиент уже собрал его из кусков). При догрузке после переподключения
+    клиент получает обычное сообщение с полным текстом.
+
+    :return: событие сохранённого сообщения или None, если ответ пуст.
+    """
+    generator = generator or get_reply_generator()
+    bot = await get_bot_user()
+    stream_id = uuid.uuid4().hex
+    parts: list[str] = []
+
+    try:
+        chunks = coalesce(generator.stream(prompt), settings.CHAT_BOT_FLUSH_INTERVAL, settings.CHAT_BOT_FLUSH_CHARS)
+        async for chunk in chunks:
+            await broadcast_message(room_id, stream_event(room_id, stream_id, bot.display_name, chunk, is_start=not parts))
+            parts.append(chunk)
+    except Exception:
+        logger.exception("Bot reply generation failed in room %s", room_id)
+
+    end = stream_event(room_id, stream_id, bot.display_name, "", is_start=not parts)
+    end["is_end"] = True
+    event = None
+    if parts:
+        event = await persist_message(room_id, bot.pk, bot.display_name, "".join(parts))
+        end.update(id=event["id"], seq=event["seq"], created_at=event["created_at"])
+    await broadcast_message(room_id, end)
+    return event
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+from uuid import UUID
+
+from apps.messaging.models import ChatRoom, ChatRoomParticipant
+from channels.db import database_sync_to_async
+from config.async_redis import AsyncRedisClient
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+def room_meta_key(room_id: UUID | str) -> str:
+    return f"chat:room:{room_id}:meta"
+
+
+def room_members_key(room_id: UUID | str) -> str:
+    return f"chat:room:{room_id}:members"
+
+
+def _load_room(room_id: UUID | str) -> tuple[dict[str, Any], list[int]] | None:
+    try:
+        meta = ChatRoom.objects.filter(pk=room_id).values("type", "name").first()
+    except ValidationError:
+        # room_id из URL не является UUID
+        return None
+    if meta is None:
+        return None
+    member_ids = list(ChatRoomParticipant.objects.filter(room_id=room_id).values_list("user_id", flat=True))
+    return meta, member_ids
+
+
+def room_generation_key(room_id: UUID | str) -> str:
+    return f"chat:room:{room_id}:gen"
+
+
+# Запись прогретого кеша, только если с чтения поколения до записи не было инвалидации:
+# иначе прогрев, начавшийся до коммита изменения участников, вернул бы устаревший список
+# на весь CHAT_ROOM_CACHE_TTL. SADD — кусками, unpack ограничен стеком Lua.
+FILL_ROOM_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+local ttl = tonumber(ARGV[2])
+redis.call('DEL', KEYS[3])
+redis.call('HSET', KEYS[2], 'type', ARGV[3], 'name', ARGV[4])
+for i = 5, #ARGV, 5000 do
+    redis.call('SADD', KEYS[3], unpack(ARGV, i, math.min(i + 4999, #ARGV)))
+end
+if #ARGV > 4 then
+    redis.call('EXPIRE', KEYS[3], ttl)
+end
+redis.call('EXPIRE', KEYS[2], ttl)
+return 1
+"""
+
+# Инвалидация: сдвиг поколения и удаление кеша одной операцией
+INVALIDATE_ROOM_SCRIPT = """
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return redis.call('DEL', KEYS[2], KEYS[3])
+"""
+
+
+def _room_keys(room_id: UUID | str) -> list[str]:
+    return [room_generation_key(room_id), room_meta_key(room_id), room_members_key(room_id)]
+
+
+def _fill_args(generation: Any, meta: dict[str, Any], member_ids: list[int]) -> list[Any]:
+    return [generation or "0", settings.CHAT_ROOM_CACHE_TTL, meta["type"], meta["name"], *member_ids]
+
+
+async def warm_room_cache(room_id: UUID | str) -> list[int] | None:
+    """
+    Загружает метаданные и участников комнаты из БД и кладёт их в Redis.
+
+    Поколение читается до запроса в БД: если за это время кеш инвалидировали,
+    результат не записывается (следующее обращение прогреет заново).
+
+    :return: id участников или None, если комнаты нет.
+    """
+    redis = await AsyncRedisClient.initialize()
+    generation = await redis.get(room_generation_key(room_id))
+    loaded = await database_sync_to_async(_load_room)(room_id)
+    if loaded is None:
+        return None
+    meta, member_ids = loaded
+
+    await redis.register_script(FILL_ROOM_SCRIPT)(
+        keys=_room_keys(room_id), args=_fill_args(generation, meta, member_ids)
+    )
+    return member_ids
+
+
+async def is_room_member(room_id: UUID | str, user_id: int) -> bool | None:
+    """
+    Проверка участия пользователя в комнате.
+
+    В типичном случае (кеш прогрет, пользователь — участник) это один SISMEMBER.
+    Промах идёт в БД один раз и прогревает кеш для следующих подключений.
+
+    :return: True/False — участник или нет, None — комнаты не существует.
+    """
+    redis = await AsyncRedisClient.initialize()
+    if await redis.sismember(room_members_key(room_id), str(user_id)):
+        return True
+
+    if await redis.exists(room_meta_key(room_id)):
+        return False
+
+    member_ids = await warm_room_cache(room_id)
+    if member_ids is None:
+        return None
+    return user_id in member_ids
+
+
+async def is_room_member_many(room_ids: list[str], user_id: int) -> list[bool | None]:
+    """
+    is_room_member для нескольких комнат: прогретые проверяются одним конвейером,
+    в БД идут только комнаты без кеша.
+    """
+    redis = await AsyncRedisClient.initialize()
+    async with redis.pipeline(transaction=False) as pipe:
+        for room_id in room_ids:
+            pipe.sismember(room_members_key(room_id), str(user_id))  # pyright: ignore[reportGeneralTypeIssues]
+            pipe.exists(room_meta_key(room_id))
+        replies = await pipe.execute()
+
+    result: list[bool | None] = [
+        True if is_member else False if cached else None for is_member, cached in zip(replies[::2], replies[1::2])
+    ]
+    cold = [index for index, is_member in enumerate(result) if is_member is None]
+    checked = await asyncio.gather(*(is_room_member(room_ids[index], user_id) for index in cold))
+    for index, is_member in zip(cold, checked):
+        result[index] = is_member
+    return result
+
+
+async def room_member_ids(room_id: UUID | str) -> list[int]:
+    """
+    id участников комнаты из кеша (SMEMBERS); при промахе — прогрев из БД.
+    """
+    redis = await AsyncRedisClient.initialize()
+    member_ids = await redis.smembers(room_members_key(room_id))  # pyright: ignore[reportGeneralTypeIssues]
+    if member_ids:
+        return [int(member_id) for member_id in member_ids]
+    if await redis.exists(room_meta_key(room_id)):
+        return []
+    return await warm_room_cache(room_id) or []
+
+
+def is_room_member_sync(room_id: UUID | str, user_id: int) -> bool | None:
+    """
+    Синхронный вариант is_room_member для DRF-представлений (settings.REDIS_CLIENT).
+    """
+    redis = settings.REDIS_CLIENT
+    if redis.sismember(room_members_key(room_id), str(user_id)):
+        return True
+
+    if redis.exists(room_meta_key(room_id)):
+        return False
+
+    generation = redis.get(room_generation_key(room_id))
+    loaded = _load_room(room_id)
+    if loaded is None:
+        return None
+    meta, member_ids = loaded
+    redis.register_script(FILL_ROOM_SCRIPT)(keys=_room_keys(room_id), args=_fill_args(generation, meta, member_ids))
+    return user_id in member_ids
+
+
+def invalidate_room_cache(room_id: UUID | str) -> None:
+    """
+    Сброс кеша комнаты (синхронно — вызывается из сигналов ORM).
+    """
+    try:
+        # поколение живёт дольше кеша: прогрев, прочитавший его до сдвига, не запишет старое
+        settings.REDIS_CLIENT.register_script(INVALIDATE_ROOM_SCRIPT)(
+            keys=_room_keys(room_id), args=[settings.CHAT_ROOM_CACHE_TTL * 2]
+        )
+    except Exception:
+        logger.exception("Failed to invalidate chat room cache for %s", room_id)
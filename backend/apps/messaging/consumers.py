@@ -1,55 +1,426 @@
 from __future__ import annotations
 
-import json
-from typing import Any
-
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Any, Iterable
+from urllib.parse import parse_qs
+
+from apps.messaging.cache import is_room_member, is_room_member_many
+from apps.messaging.fanout import large_rooms, local_fanout
+from apps.messaging.frames import JSON, MSGPACK, MSGPACK_SUBPROTOCOL, decode, encode, message_frame
+from apps.messaging.metrics import send_queue_metrics
+from apps.messaging.models import ChatRoomParticipant
+from apps.messaging.presence import leave_presence, online_members, presence_batcher, touch_presence_many
+from apps.messaging.replay import events_since
+from apps.messaging.services import publish_message, room_group_name
+from apps.messaging.tasks import bot_reply
+from apps.messaging.unread import mark_read
+from apps.utils.ratelimit import TokenBucket, get_async_rate_limiter
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from config.async_redis import AsyncRedisClient
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from messaging.models import ChatMessage, ChatRoom
 
 User = get_user_model()
 
+# закрытие сокета, который не успевает читать кадры
+CLOSE_SLOW_CONSUMER = 4008
+
+# не чаще одного сообщения в MESSAGE_INTERVAL секунд на пользователя в комнате
+MESSAGE_INTERVAL = 2
+MESSAGE_RATE = TokenBucket(rate=1 / MESSAGE_INTERVAL, capacity=1)
+
+
+class BaseChatConsumer(AsyncWebsocketConsumer):
+    """
+    Общая часть сокетов чата: формат кадров, присутствие, «печатает»,
+    квитанции о прочтении и отправка сообщений в комнату.
+
+    Наследники решают, на какие комнаты подписан сокет (self.rooms).
+
+    Сокетов на воркер — десятки тысяч, и почти все простаивают, поэтому
+    состояние держится скупо: только id и примитивы, значения по умолчанию —
+    атрибуты класса, словари, очередь и задача записи создаются при первом
+    использовании и отпускаются, когда снова не нужны.
+    """
+
+    user_id: int | None = None
+    display_name: str = ""
+    frame_format: str = JSON
+    presence_touched_at: float = 0.0
+    replayed_seq: dict[str, int] | None = None
+    typing_until: dict[str, float] | None = None
+    local_rooms: set[str] | None = None  # большие комнаты: через local_fanout, а не группу
+    outbox: deque[str | bytes] | None = None
+    writer: asyncio.Task | None = None
+    accepted: bool = False
+    evicted: bool = False
 
-class ChatConsumer(AsyncWebsocketConsumer):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
-        self.redis_client = AsyncRedisClient.get_client()
-        self.room: ChatRoom | None = None
-        self.room_group_name: str | None = None
-        self.message_count: int = 0
-
-    # ---------- helpers (БД) ----------
-
-    @database_sync_to_async
-    def _get_room(self, room_id: str) -> ChatRoom:
-        return ChatRoom.objects.get(id=room_id)
-
-    @database_sync_to_async
-    def _user_in_room(self, room: ChatRoom, user: User) -> bool:
-        return room.participants.filter(pk=user.pk).exists()
-
-    @database_sync_to_async
-    def _save_message(self, user: User, text: str) -> ChatMessage:
-        assert self.room is not None
-        return ChatMessage.objects.create(
-            room=self.room,
-            sender=user,
-            text=text,
+        self.rooms: set[str] = set()
+
+    def _authenticated_user(self) -> Any | None:
+        scope_user = self.scope.get("user")
+        if scope_user is None or not getattr(scope_user, "is_authenticated", False):
+            return None
+        return scope_user
+
+    def bind_user(self, user: Any) -> None:
+        """
+        От пользователя сокету нужны только id и имя: сам объект модели
+        (и снимок из JWTAuthMiddleware в scope) не живёт всё соединение.
+        """
+        self.user_id = user.pk
+        self.display_name = user.display_name
+        self.scope.pop("user", None)
+
+    def _query_param(self, name: str) -> str | None:
+        query = parse_qs(self.scope.get("query_string", b"").decode("latin1"))
+        values = query.get(name)
+        return values[0] if values else None
+
+    async def accept_client(self) -> None:
+        if MSGPACK_SUBPROTOCOL in (self.scope.get("subprotocols") or []):
+            self.frame_format = MSGPACK
+            await self.accept(subprotocol=MSGPACK_SUBPROTOCOL)
+        else:
+            await self.accept()
+        self.accepted = True
+        send_queue_metrics.connections += 1
+
+    # ---------- rooms ----------
+
+    async def subscribe_rooms(self, room_ids: list[str]) -> None:
+        """
+        Подписка на события комнат: группы channels или, для больших
+        комнат, локальная рассылка воркера.
+
+        Размер комнат проверяется одним конвейером, group_add идут параллельно:
+        общий сокет подписывается на сотню комнат за пару обращений к Redis.
+        """
+        large = await large_rooms(room_ids)
+        for room_id in room_ids:
+            if room_id in large:
+                await local_fanout.subscribe(room_id, self)
+                if self.local_rooms is None:
+                    self.local_rooms = set()
+                self.local_rooms.add(room_id)
+        await asyncio.gather(
+            *(
+                self.channel_layer.group_add(room_group_name(room_id), self.channel_name)
+                for room_id in room_ids
+                if room_id not in large
+            )
         )
+        self.rooms.update(room_ids)
+
+    async def unsubscribe_room(self, room_id: str) -> None:
+        self.rooms.discard(room_id)
+        if self.local_rooms and room_id in self.local_rooms:
+            self.local_rooms.discard(room_id)
+            await local_fanout.unsubscribe(room_id, self)
+        else:
+            await self.channel_layer.group_discard(room_group_name(room_id), self.channel_name)
+
+    async def join_rooms(self, room_ids: Iterable[str]) -> None:
+        """
+        Подписка на группы комнат (членство уже проверено) и отметка присутствия.
+        """
+        new_rooms = [room_id for room_id in room_ids if room_id not in self.rooms]
+        await self.subscribe_rooms(new_rooms)
+        await self._touch_presence(new_rooms)
+
+    async def leave_room(self, room_id: str) -> None:
+        if room_id not in self.rooms:
+            return
+        if self.replayed_seq:
+            self.replayed_seq.pop(room_id, None)
+        if self.user_id is not None:
+            self.set_typing(room_id, False)
+            if await leave_presence(room_id, self.user_id, self.channel_name):
+                presence_batcher.add(room_id, "offline", self.user_id)
+        await self.unsubscribe_room(room_id)
+
+    async def disconnect(self, code: int) -> None:
+        for room_id in list(self.rooms):
+            await self.leave_room(room_id)
+        self._stop_writer()
+        if self.accepted:
+            self.accepted = False
+            send_queue_metrics.connections -= 1
+
+    async def replay_since(self, room_id: str, since: int) -> None:
+        """
+        Догрузка пропущенного: события с seq > since отправляются до живых.
+
+        Подписка на группу уже оформлена, поэтому разрыва нет; живые события
+        с seq <= последнего догруженного chat_message отбросит как дубли.
+        """
+        for event in await events_since(room_id, since):
+            await self.chat_message(event)
+            if self.replayed_seq is None:
+                self.replayed_seq = {}
+            self.replayed_seq[room_id] = event["seq"]
+
+    # ---------- presence / typing ----------
+
+    async def _touch_presence(self, room_ids: list[str]) -> None:
+        if self.user_id is None or not room_ids:
+            return
+        appeared = await touch_presence_many(room_ids, self.user_id, self.channel_name)
+        for room_id, is_new in zip(room_ids, appeared):
+            if is_new:
+                presence_batcher.add(room_id, "online", self.user_id)
+
+    async def heartbeat(self) -> None:
+        """
+        Продление присутствия, «на попутных» кадрах клиента.
+
+        В Redis идём не чаще раза в CHAT_PRESENCE_HEARTBEAT секунд (все комнаты
+        сокета — одним конвейером); остальным участникам уходит только
+        появление онлайн (через батчер комнаты).
+        """
+        now = time.monotonic()
+        if now - self.presence_touched_at < settings.CHAT_PRESENCE_HEARTBEAT:
+            return
+        self.presence_touched_at = now
+        await self._touch_presence(sorted(self.rooms))
+
+    def set_typing(self, room_id: str, is_typing: bool) -> None:
+        """
+        Дебаунс «печатает»: в комнату уходит только смена состояния.
+
+        Повторные кадры typing лишь продлевают состояние на CHAT_TYPING_TIMEOUT;
+        по истечении клиенты гасят индикатор сами, без отдельного кадра.
+        """
+        if self.user_id is None:
+            return
+        now = time.monotonic()
+        typing_until = self.typing_until or {}
+        was_typing = now < typing_until.get(room_id, 0.0)
+        if is_typing:
+            typing_until[room_id] = now + settings.CHAT_TYPING_TIMEOUT
+        else:
+            typing_until.pop(room_id, None)
+        self.typing_until = typing_until or None
+        if is_typing and not was_typing:
+            presence_batcher.add(room_id, "typing", self.user_id)
+        elif was_typing and not is_typing:
+            presence_batcher.add(room_id, "stopped_typing", self.user_id)
+
+    # ---------- incoming ----------
+
+    async def decode_payload(self, text_data: str | None, bytes_data: bytes | None) -> dict[str, Any] | None:
+        data = text_data if text_data is not None else bytes_data
+        if data is None:
+            return None
+        try:
+            payload = decode(data)
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            await self.send_error("Некорректный формат сообщения.")
+            return None
+        return payload
+
+    async def handle_room_frame(self, room_id: str, payload: dict[str, Any]) -> None:
+        """
+        Кадр клиента, относящийся к комнате: ping, typing, read, presence или сообщение.
+        """
+        frame_type = payload.get("type")
+        if frame_type == "ping":
+            return
+        if frame_type == "typing":
+            self.set_typing(room_id, bool(payload.get("is_typing", True)))
+            return
+        if frame_type == "read":
+            await self.receive_read(room_id, payload.get("seq"))
+            return
+        if frame_type == "presence":
+            # полный список онлайн — по запросу клиента, дальше только изменения
+            await self.send_frame({"event": "presence", "room": room_id, "online": await online_members(room_id)})
+            return
+
+        message = payload.get("message")
+        if not message:
+            await self.send_error("Пустое сообщение.", room_id)
+            return
+        if not isinstance(message, str):
+            await self.send_error("Некорректное сообщение.", room_id)
+            return
+        await self.send_message(room_id, message)
+
+    async def send_message(self, room_id: str, message: str) -> None:
+        if self.user_id is None:
+            await self.send_error("Пользователь не определён.", room_id)
+            return
+
+        redis_key = f"chat:room:{room_id}:user:{self.user_id}:rate"
+
+        # проверка и списание — один вызов Lua, без гонки между GET и SET
+        limiter = await get_async_rate_limiter()
+        if not await limiter.hit(redis_key, MESSAGE_RATE):
+            await self.send_error(
+                f"Запросы можно отправлять не чаще, чем раз в {MESSAGE_INTERVAL} секунды.",
+                room_id,
+            )
+            return
+
+        self.set_typing(room_id, False)
+
+        # номер в комнате → БД (или буфер отложенной записи) → рассылка участникам
+        await publish_message(room_id, self.user_id, self.display_name, message)
+
+        trigger = settings.CHAT_BOT_TRIGGER
+        if trigger and message.startswith(trigger):
+            # ответ генерирует воркер taskiq и стримит в группу комнаты сам
+            await bot_reply.kiq(room_id, message[len(trigger):].strip())
+
+    async def receive_read(self, room_id: str, seq: Any) -> None:
+        """Квитанция о прочтении: {"type": "read", "seq": <последний прочитанный>}."""
+        if not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+            await self.send_error("Некорректный номер сообщения.", room_id)
+            return
+        assert self.user_id is not None
+        await mark_read(room_id, self.user_id, seq)
+
+    # ---------- outgoing ----------
+
+    def event_room(self, event: dict[str, Any]) -> str | None:
+        room_id = event.get("room_id")
+        return str(room_id) if room_id is not None else None
+
+    async def chat_message(self, event: dict[str, Any]) -> None:
+        """
+        Отправка сообщения на клиент.
+
+        Обычно кадр уже закодирован отправителем один раз на всю группу
+        (event["frames"]); кодируем сами только события без него (догрузка).
+        """
+        seq = event.get("seq")
+        room_id = self.event_room(event)
+        if seq is not None and self.replayed_seq and room_id is not None and seq <= self.replayed_seq.get(room_id, 0):
+            # уже отправлено при догрузке после переподключения
+            return
+
+        frames = event.get("frames")
+        if frames:
+            await self.send_encoded(frames[self.frame_format])
+        else:
+            await self.send_frame(message_frame(event))
+
+    async def chat_member_removed(self, event: dict[str, Any]) -> None:
+        """Пользователя удалили из комнаты: сокет перестаёт получать её события."""
+        room_id = self.event_room(event)
+        if event.get("user_id") != self.user_id or room_id not in self.rooms:
+            return
+        await self.leave_room(room_id)
+        await self.room_revoked(room_id)
+
+    async def room_revoked(self, room_id: str) -> None:
+        await self.send_frame({"event": "unsubscribed", "rooms": [room_id]})
+
+    async def chat_presence(self, event: dict[str, Any]) -> None:
+        """Склеенные изменения присутствия и набора текста в комнате (без своих)."""
+        changes = {
+            kind: [user_id for user_id in event.get(kind, []) if user_id != self.user_id]
+            for kind in ("online", "offline", "typing", "stopped_typing")
+        }
+        if not any(changes.values()):
+            return
+        await self.send_frame({"event": "presence", "room": self.event_room(event), **changes})
+
+    async def send_frame(self, frame: dict[str, Any]) -> None:
+        await self.send_encoded(encode(frame, self.frame_format))
+
+    async def send_encoded(self, data: str | bytes) -> None:
+        """
+        Постановка кадра в ограниченную исходящую очередь сокета.
+
+        Кадры пишет отдельная задача, поэтому медленный клиент не держит
+        обработчики событий группы. Если очередь заполнена — по
+        CHAT_SEND_QUEUE_POLICY выбрасываем самый старый кадр ("drop") или
+        закрываем сокет кодом 4008 ("close"): клиент переподключится и
+        догрузит пропущенное по ?since=.
+
+        Очередь и задача живут, пока есть что писать: простаивающий сокет
+        их не держит.
+        """
+        if self.evicted:
+            return
+        if self.outbox is None:
+            self.outbox = deque()
+        outbox = self.outbox
+
+        if len(outbox) >= settings.CHAT_SEND_QUEUE_SIZE:
+            if settings.CHAT_SEND_QUEUE_POLICY == "drop":
+                outbox.popleft()
+                send_queue_metrics.frames_dropped += 1
+            else:
+                await self.evict_slow_consumer()
+                return
+
+        outbox.append(data)
+        send_queue_metrics.observe_depth(len(outbox))
+        if self.writer is None:
+            self.writer = asyncio.create_task(self._drain_outbox(outbox))
+
+    def _stop_writer(self) -> None:
+        if self.writer is not None:
+            self.writer.cancel()
+            self.writer = None
+        self.outbox = None
+
+    async def _drain_outbox(self, outbox: deque[str | bytes]) -> None:
+        try:
+            while outbox:
+                data = outbox.popleft()
+                if isinstance(data, bytes):
+                    await self.send(bytes_data=data)
+                else:
+                    await self.send(text_data=data)
+                send_queue_metrics.frames_sent += 1
+        finally:
+            if self.writer is asyncio.current_task():
+                self.writer = None
+                if self.outbox is outbox:
+                    self.outbox = None
+
+    async def evict_slow_consumer(self) -> None:
+        self.evicted = True
+        send_queue_metrics.slow_consumers_closed += 1
+        self._stop_writer()
+        await self.close(code=CLOSE_SLOW_CONSUMER)
+
+    async def send_error(self, error_message: str, room_id: str | None = None) -> None:
+        frame: dict[str, Any] = {
+            "message": error_message,
+            "error": True,
+        }
+        if room_id is not None:
+            frame["room"] = room_id
+        await self.send_frame(frame)
+
+
+class ChatConsumer(BaseChatConsumer):
+    """
+    Сокет одной комнаты: ws/chat/<room_id>/[?since=<seq>].
+    """
+
+    room_id: str | None = None
 
     # ---------- lifecycle ----------
 
     async def connect(self) -> None:
         # --- user из scope ---
-        scope_user = self.scope.get("user")
-        if scope_user is None or not getattr(scope_user, "is_authenticated", False):
+        user = self._authenticated_user()
+        if user is None:
             await self.close(code=4001)
             return
 
-        user: User = scope_user  # после проверки можно типизировать
-
         # --- url_route из scope ---
         url_route: dict[str, Any] | None = self.scope.get("url_route")  # type: ignore
         if not url_route:
@@ -62,116 +433,162 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close(code=4000)
             return
 
-        try:
-            room = await self._get_room(room_id)
-        except ChatRoom.DoesNotExist:
+        is_member = await is_room_member(room_id, user.pk)
+        if is_member is None:
             await self.close(code=4004)
             return
-
-        is_member = await self._user_in_room(room, user)
         if not is_member:
             await self.close(code=4003)  # forbidden
             return
 
-        self.room = room
-        self.room_group_name = f"chat_room_{room.id}"
-        self.message_count = 0
+        self.bind_user(user)
+        self.room_id = room_id
 
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name,
-        )
+        await self.subscribe_rooms([room_id])
 
-        await self.accept()
+        await self.accept_client()
 
-    async def disconnect(self, code: int) -> None:
-        if self.room_group_name:
-            await self.channel_layer.group_discard(
-                self.room_group_name,
-                self.channel_name,
-            )
+        since = self._since_from_query()
+        if since is not None:
+            await self.replay_since(room_id, since)
+
+        self.presence_touched_at = time.monotonic()
+        await self._touch_presence([room_id])
+
+    async def room_revoked(self, room_id: str) -> None:
+        # единственная комната сокета — закрываем, как при подключении не-участника
+        await self.close(code=4003)
+
+    def _since_from_query(self) -> int | None:
+        try:
+            since = int(self._query_param("since") or "")
+        except ValueError:
+            return None
+        return since if since >= 0 else None
+
+    def event_room(self, event: dict[str, Any]) -> str | None:
+        return self.room_id
 
     async def receive(
         self,
         text_data: str | None = None,
         bytes_data: bytes | None = None,
     ) -> None:
-        if text_data is None:
+        payload = await self.decode_payload(text_data, bytes_data)
+        if payload is None:
             return
 
-        try:
-            payload = json.loads(text_data)
-        except json.JSONDecodeError:
-            await self.send_error("Некорректный формат сообщения.")
+        if self.room_id is None:
+            await self.send_error("Комната не инициализирована.")
             return
 
-        message = payload.get("message")
-        if not message:
-            await self.send_error("Пустое сообщение.")
-            return
+        await self.heartbeat()
+        await self.handle_room_frame(self.room_id, payload)
 
-        scope_user = self.scope.get("user")
-        if scope_user is None:
-            await self.send_error("Пользователь не определён.")
-            return
 
-        user: User = scope_user
+def _normalize_room_id(value: Any) -> str | None:
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
 
-        if self.room is None or self.room_group_name is None:
-            await self.send_error("Комната не инициализирована.")
-            return
 
-        redis_key = f"chat:room:{self.room.id}:user:{user.id}:lock"
-        time_limit = (
-            (2, "ы") if getattr(user, "is_authenticated", False) else (5, ", для незарегистрированных пользователей")
-        )
+@database_sync_to_async
+def _user_room_ids(user_id: int, limit: int) -> list[str]:
+    rooms = (
+        ChatRoomParticipant.objects.filter(user_id=user_id)
+        .order_by("-room__last_message_at")
+        .values_list("room_id", flat=True)[:limit]
+    )
+    return [str(room_id) for room_id in rooms]
 
-        if await self.redis_client.get(redis_key):
-            await self.send_error(
-                f"Запросы можно отправлять не чаще, чем раз в {time_limit[0]} секунд{time_limit[1]}."
-            )
-            return
 
-        await self.redis_client.set(redis_key, "locked", ex=time_limit[0])
+class UserChatConsumer(BaseChatConsumer):
+    """
+    Один сокет пользователя на все его комнаты: ws/chat/[?rooms=<id>,<id>].
 
-        self.message_count += 1
+    Без ?rooms= подписывает на все комнаты пользователя (не больше
+    CHAT_MUX_MAX_ROOMS, самые активные). Кадры в обе стороны несут "room";
+    подписки меняются на лету:
 
-        # сохраняем в БД
-        await self._save_message(user, message)
+        {"type": "subscribe", "rooms": [...], "since": {"<room>": <seq>}}
+        {"type": "unsubscribe", "rooms": [...]}
+    """
 
-        # шлём всем участникам комнаты
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "chat.message",
-                "message": message,
-                "display_name": user.display_name,
-                "is_stream": False,
-                "is_start": False,
-                "is_end": False,
-            },
-        )
+    async def connect(self) -> None:
+        user = self._authenticated_user()
+        if user is None:
+            await self.close(code=4001)
+            return
 
-    async def chat_message(self, event: dict[str, Any]) -> None:
-        """Отправка сообщения на клиент."""
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "message": event["message"],
-                    "display_name": event["display_name"],
-                    "is_stream": event.get("is_stream", False),
-                    "is_start": event.get("is_start", False),
-                    "is_end": event.get("is_end", False),
-                }
-            )
-        )
+        self.bind_user(user)
+        await self.accept_client()
+        self.presence_touched_at = time.monotonic()
+
+        requested = self._query_param("rooms")
+        if requested is None:
+            room_ids = await _user_room_ids(self.user_id, settings.CHAT_MUX_MAX_ROOMS)
+            await self.join_rooms(room_ids)
+            await self.send_frame({"event": "subscribed", "rooms": room_ids, "rejected": []})
+        else:
+            await self.subscribe([room_id for room_id in requested.split(",") if room_id])
+
+    async def subscribe(self, room_ids: list[Any], since: dict[str, Any] | None = None) -> None:
+        """
+        Подписка на комнаты из списка; чужие и несуществующие попадают в rejected.
+        """
+        assert self.user_id is not None
+        rejected: list[str] = [str(room_id) for room_id in room_ids if _normalize_room_id(room_id) is None]
+        requested = [room_id for room_id in dict.fromkeys(map(_normalize_room_id, room_ids)) if room_id is not None]
+        # сверх CHAT_MUX_MAX_ROOMS — отказ без проверки участия
+        new_rooms = [room_id for room_id in requested if room_id not in self.rooms]
+        new_rooms = new_rooms[: max(settings.CHAT_MUX_MAX_ROOMS - len(self.rooms), 0)]
+        allowed = set(self.rooms)
+        allowed.update(room_id for room_id, is_member in zip(new_rooms, await is_room_member_many(new_rooms, self.user_id)) if is_member)
+        accepted = [room_id for room_id in requested if room_id in allowed]
+        rejected.extend(room_id for room_id in requested if room_id not in allowed)
+
+        await self.join_rooms(accepted)
+        await self.send_frame({"event": "subscribed", "rooms": accepted, "rejected": rejected})
+
+        for room_id, seq in (since or {}).items():
+            if room_id in accepted and isinstance(seq, int) and not isinstance(seq, bool) and seq >= 0:
+                await self.replay_since(room_id, seq)
+
+    async def unsubscribe(self, room_ids: list[Any]) -> None:
+        left = [room_id for room_id in map(_normalize_room_id, room_ids) if room_id in self.rooms]
+        for room_id in left:
+            await self.leave_room(room_id)
+        await self.send_frame({"event": "unsubscribed", "rooms": left})
 
-    async def send_error(self, error_message: str) -> None:
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "message": error_message,
-                    "error": True,
-                }
-            )
-        )
+    async def receive(
+        self,
+        text_data: str | None = None,
+        bytes_data: bytes | None = None,
+    ) -> None:
+        payload = await self.decode_payload(text_data, bytes_data)
+        if payload is None:
+            return
+
+        await self.heartbeat()
+
+        frame_type = payload.get("type")
+        if frame_type in ("subscribe", "unsubscribe"):
+            room_ids = payload.get("rooms")
+            if not isinstance(room_ids, list):
+                await self.send_error("Ожидается список комнат.")
+                return
+            if frame_type == "subscribe":
+                since = payload.get("since")
+                await self.subscribe(room_ids, since if isinstance(since, dict) else None)
+            else:
+                await self.unsubscribe(room_ids)
+            return
+
+        room_id = _normalize_room_id(payload.get("room"))
+        if frame_type == "ping" and room_id is None:
+            return
+        if room_id is None or room_id not in self.rooms:
+            await self.send_error("Нет подписки на комнату.", payload.get("room"))
+            return
+        await self.handle_room_frame(room_id, payload)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Iterable
+from uuid import UUID
+
+import msgpack
+import redis.asyncio as aioredis
+from apps.messaging.cache import room_member_ids, room_members_key
+from config.async_redis import AsyncRedisClient
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Комнаты, переведённые на локальную рассылку; флаг не снимается, пока жив ключ
+LARGE_ROOMS_KEY = "chat:fanout:large"
+
+
+def room_topic(room_id: UUID | str) -> str:
+    return f"chat:room:{room_id}:fanout"
+
+
+async def is_large_room(room_id: UUID | str) -> bool:
+    """
+    Комната рассылается через pub/sub, если в ней не меньше
+    CHAT_LARGE_ROOM_THRESHOLD участников (0 — режим выключен).
+
+    Решение липкое: однажды попав в LARGE_ROOMS_KEY, комната остаётся там,
+    даже если участников стало меньше, — иначе сокеты, подписанные на топик,
+    перестали бы получать сообщения.
+    """
+    return str(room_id) in await large_rooms([room_id])
+
+
+async def large_rooms(room_ids: Iterable[UUID | str]) -> set[str]:
+    """
+    is_large_room для нескольких комнат одним конвейером (общий сокет пользователя).
+
+    :return: id больших комнат из room_ids.
+    """
+    threshold = settings.CHAT_LARGE_ROOM_THRESHOLD
+    room_keys = [str(room_id) for room_id in room_ids]
+    if not threshold or not room_keys:
+        return set()
+    redis = await AsyncRedisClient.initialize()
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.smismember(LARGE_ROOMS_KEY, room_keys)  # pyright: ignore[reportGeneralTypeIssues]
+        for room_key in room_keys:
+            pipe.scard(room_members_key(room_key))  # pyright: ignore[reportGeneralTypeIssues]
+        flags, *counts = await pipe.execute()
+
+    large = {room_key for room_key, is_large in zip(room_keys, flags) if is_large}
+    members = dict(zip(room_keys, counts))
+    # кеш участников пуст — прогреваем из БД
+    cold = [room_key for room_key in room_keys if room_key not in large and not members[room_key]]
+    for room_key, member_ids in zip(cold, await asyncio.gather(*map(room_member_ids, cold))):
+        members[room_key] = len(member_ids)
+
+    grown = [room_key for room_key in room_keys if room_key not in large and members[room_key] >= threshold]
+    if grown:
+        await redis.sadd(LARGE_ROOMS_KEY, *grown)  # pyright: ignore[reportGeneralTypeIssues]
+        large.update(grown)
+    return large
+
+
+async def publish_local(room_id: UUID | str, event: dict[str, Any]) -> None:
+    """
+    Одно событие в топик комнаты: каждый воркер получает его один раз
+    и раздаёт своим сокетам сам (LocalFanout).
+    """
+    redis = await AsyncRedisClient.initialize()
+    await redis.publish(room_topic(room_id), msgpack.packb(event, use_bin_type=True))  # pyright: ignore[reportArgumentType]
+
+
+class LocalFanout:
+    """
+    Рассылка в большие комнаты внутри воркера.
+
+    group_send в группу из десятков тысяч каналов кладёт копию события
+    в очередь каждого канала из одной корутины. Здесь воркер держит одну
+    подписку Redis pub/sub на комнату, а пришедшее событие передаёт
+    обработчикам своих consumer’ов напрямую: кадр уже закодирован
+    (frames), и каждый consumer лишь ставит его в исходящую очередь.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: dict[str, set[Any]] = {}
+        self._redis: aioredis.Redis | None = None
+        self._pubsub: Any = None
+        self._reader: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _bind_loop(self) -> Any:
+        # соединения привязаны к циклу событий; в новом цикле (тесты, перезапуск) — с нуля
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._subscribers.clear()
+            self._reader = None
+            # отдельный клиент без decode_responses: в топике бинарный MessagePack
+            self._redis = aioredis.from_url(
+                f"redis://:{settings.REDIS_PASSWORD}@{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}",
+                socket_connect_timeout=5,
+            )
+            self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        return self._pubsub
+
+    def subscribers(self, room_id: UUID | str) -> int:
+        return len(self._subscribers.get(str(room_id), ()))
+
+    async def subscribe(self, room_id: UUID | str, consumer: Any) -> None:
+        pubsub = self._bind_loop()
+        room_key = str(room_id)
+        subscribers = self._subscribers.setdefault(room_key, set())
+        if not subscribers:
+            await pubsub.subscribe(room_topic(room_key))
+        subscribers.add(consumer)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read(pubsub))
+
+    async def unsubscribe(self, room_id: UUID | str, consumer: Any) -> None:
+        room_key = str(room_id)
+        subscribers = self._subscribers.get(room_key)
+        if subscribers is None:
+            return
+        subscribers.discard(consumer)
+        if not subscribers:
+            del self._subscribers[room_key]
+            await self._pubsub.unsubscribe(room_topic(room_key))
+
+    async def _read(self, pubsub: Any) -> None:
+        # listen() завершается, когда подписок не осталось; subscribe запустит чтение заново
+        try:
+            async for message in pubsub.listen():
+                room_key = message["channel"].decode().split(":")[2]
+                await self.deliver(room_key, msgpack.unpackb(message["data"], raw=False))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Local fan-out reader stopped")
+
+    async def deliver(self, room_key: str, event: dict[str, Any]) -> None:
+        handler = event["type"].replace(".", "_")
+        for consumer in list(self._subscribers.get(room_key, ())):
+            try:
+                await getattr(consumer, handler)(event)
+            except Exception:
+                logger.exception("Failed to deliver %s to a consumer in room %s", event["type"], room_key)
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
+        self._subscribers.clear()
+        self._reader = self._pubsub = self._redis = self._loop = None
+
+
+local_fanout = LocalFanout()
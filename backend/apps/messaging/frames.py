@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import msgpack
+
+# Подпротокол WebSocket для бинарных кадров; без него — JSON-текст
+MSGPACK_SUBPROTOCOL = "chat.msgpack"
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+
+def message_frame(event: dict[str, Any]) -> dict[str, Any]:
+    """
+    Кадр сообщения, как его видит клиент (из события chat.message).
+
+    Куски потокового ответа несут stream_id; id и seq появляются только
+    в завершающем кадре (is_end), когда сообщение сохранено.
+    """
+    frame: dict[str, Any] = {
+        "room": event.get("room_id"),
+        "id": event.get("id"),
+        "seq": event.get("seq"),
+        "created_at": event.get("created_at"),
+        "message": event["message"],
+        "display_name": event["display_name"],
+        "is_stream": event.get("is_stream", False),
+        "is_start": event.get("is_start", False),
+        "is_end": event.get("is_end", False),
+    }
+    if "stream_id" in event:
+        frame["stream_id"] = event["stream_id"]
+    return frame
+
+
+def encode(frame: dict[str, Any], fmt: str) -> str | bytes:
+    if fmt == MSGPACK:
+        return msgpack.packb(frame, use_bin_type=True)
+    return json.dumps(frame, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode(data: str | bytes) -> Any:
+    """
+    Входящий кадр: текст — JSON, бинарный — MessagePack.
+
+    :raises ValueError: кадр не разбирается.
+    """
+    if isinstance(data, bytes):
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except Exception as exc:
+            raise ValueError("Invalid MessagePack frame") from exc
+    return json.loads(data)
+
+
+def with_frames(event: dict[str, Any], frame: dict[str, Any]) -> dict[str, Any]:
+    """
+    Событие для group_send с кадром, закодированным один раз на рассылку
+    в обоих форматах: получатели отправляют готовые байты без json.dumps.
+    """
+    return {**event, "frames": {JSON: encode(frame, JSON), MSGPACK: encode(frame, MSGPACK)}}
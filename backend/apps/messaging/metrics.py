@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import os
+import socket
+from collections import deque
+from typing import Any
+
+
+class SendQueueMetrics:
+    """
+    Метрики исходящих очередей сокетов в процессе воркера.
+
+    Глубина очереди снимается при каждой постановке кадра; перцентили
+    считаются по последним ``window`` замерам, поэтому память постоянна.
+    """
+
+    def __init__(self, window: int = 4096) -> None:
+        self.depths: deque[int] = deque(maxlen=window)
+        self.connections = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.slow_consumers_closed = 0
+
+    def observe_depth(self, depth: int) -> None:
+        self.depths.append(depth)
+
+    def percentiles(self, points: tuple[int, ...] = (50, 95, 99)) -> dict[str, int]:
+        data = sorted(self.depths)
+        if not data:
+            return {f"p{point}": 0 for point in points} | {"max": 0}
+        # nearest-rank
+        result = {f"p{point}": data[min(len(data) - 1, max(0, -(-point * len(data) // 100) - 1))] for point in points}
+        return result | {"max": data[-1]}
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "worker": f"{socket.gethostname()}:{os.getpid()}",
+            "connections": self.connections,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "slow_consumers_closed": self.slow_consumers_closed,
+            "queue_depth": self.percentiles(),
+        }
+
+    def reset(self) -> None:
+        """Сброс накопленного (открытые соединения не трогаем)."""
+        self.depths.clear()
+        self.frames_sent = self.frames_dropped = self.slow_consumers_closed = 0
+
+
+send_queue_metrics = SendQueueMetrics()
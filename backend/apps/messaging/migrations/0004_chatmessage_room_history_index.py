@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_chatmessage_created_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='chatmessage',
+            options={'ordering': ['created_at', 'id'], 'verbose_name': 'Сообщение чата', 'verbose_name_plural': 'Сообщения чата'},
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['room', 'created_at', 'id'], name='chat_msg_room_created_id_idx'),
+        ),
+    ]
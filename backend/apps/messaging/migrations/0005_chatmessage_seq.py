@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_chatmessage_room_history_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='seq',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Монотонный номер сообщения внутри комнаты для догрузки пропущенного после переподключения.', null=True, verbose_name='Номер в комнате'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['room', 'seq'], name='chat_msg_room_seq_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0005_chatmessage_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroomparticipant',
+            name='last_read_seq',
+            field=models.PositiveBigIntegerField(default=0, help_text='Номер (seq) последнего прочитанного сообщения в комнате.', verbose_name='Прочитано до'),
+        ),
+    ]
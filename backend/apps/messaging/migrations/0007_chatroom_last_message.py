@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+
+def backfill_last_message(apps, schema_editor):
+    """
+    Снимок последнего сообщения для существующих комнат — одним UPDATE.
+    """
+    ChatRoom = apps.get_model("messaging", "ChatRoom")
+    ChatMessage = apps.get_model("messaging", "ChatMessage")
+    latest = ChatMessage.objects.filter(room=OuterRef("pk")).order_by("-created_at", "-id")
+    ChatRoom.objects.update(
+        last_message_at=Coalesce(Subquery(latest.values("created_at")[:1]), F("created_at")),
+        last_message_preview=Coalesce(Substr(Subquery(latest.values("text")[:1]), 1, 140), Value("")),
+        last_sender_id=Subquery(latest.values("sender_id")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0006_chatroomparticipant_last_read_seq'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Время последнего сообщения, для комнаты без сообщений — время создания.', verbose_name='Последняя активность'),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=140, verbose_name='Последнее сообщение'),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор последнего сообщения'),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='chatroom',
+            index=models.Index(fields=['-last_message_at', '-id'], name='chat_room_last_message_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatroomparticipant',
+            index=models.Index(fields=['user', 'room'], include=('last_read_seq',), name='chat_participant_user_room_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_pair_key(apps, schema_editor):
+    """
+    Ключ пары для существующих личных чатов ровно с двумя участниками.
+    Если у пары несколько комнат, ключ получает самая ранняя.
+    """
+    ChatRoom = apps.get_model("messaging", "ChatRoom")
+    ChatRoomParticipant = apps.get_model("messaging", "ChatRoomParticipant")
+
+    members: dict = {}
+    participants = ChatRoomParticipant.objects.filter(room__type="private").order_by("room__created_at", "room_id")
+    for room_id, user_id in participants.values_list("room_id", "user_id").iterator():
+        members.setdefault(room_id, []).append(user_id)
+
+    seen = set()
+    rooms = []
+    for room_id, user_ids in members.items():
+        if len(user_ids) != 2:
+            continue
+        pair_key = "%d:%d" % tuple(sorted(user_ids))
+        if pair_key in seen:
+            continue
+        seen.add(pair_key)
+        rooms.append(ChatRoom(pk=room_id, pair_key=pair_key))
+    ChatRoom.objects.bulk_update(rooms, ["pair_key"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0007_chatroom_last_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='pair_key',
+            field=models.CharField(blank=True, editable=False, help_text='Для личного чата — id собеседников по возрастанию через двоеточие.', max_length=41, null=True, verbose_name='Ключ пары'),
+        ),
+        migrations.RunPython(backfill_pair_key, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='chatroom',
+            constraint=models.UniqueConstraint(condition=models.Q(('type', 'private')), fields=('pair_key',), name='chat_room_private_pair_uniq'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+from django.db import migrations
+
+# Полнотекстовый поиск по ChatMessage.text (только PostgreSQL).
+# Колонка не объявлена в модели: её заполняет триггер при вставке, а ORM
+# обращается к ней только в поиске (apps.messaging.search).
+TABLE = "messaging_chatmessage"
+BATCH_SIZE = 10_000
+
+VECTOR = "to_tsvector('russian', coalesce({text}, '')) || to_tsvector('english', coalesce({text}, ''))"
+
+FORWARD = [
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    f"""
+    CREATE OR REPLACE FUNCTION chat_message_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {VECTOR.format(text="NEW.text")};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    f"DROP TRIGGER IF EXISTS chat_message_search_vector_trg ON {TABLE}",
+    f"""
+    CREATE TRIGGER chat_message_search_vector_trg
+    BEFORE INSERT OR UPDATE OF text ON {TABLE}
+    FOR EACH ROW EXECUTE FUNCTION chat_message_search_vector()
+    """,
+]
+
+# backfill идёт по ключу id: каждая пачка начинается с места, где кончилась
+# предыдущая, а не перечитывает уже заполненные строки с начала таблицы
+NEXT_BOUND = f"SELECT max(id) FROM (SELECT id FROM {TABLE} WHERE id > %s ORDER BY id LIMIT {BATCH_SIZE}) AS batch"
+
+BACKFILL = f"""
+UPDATE {TABLE} SET search_vector = {VECTOR.format(text="text")}
+WHERE id > %s AND id <= %s AND search_vector IS NULL
+"""
+
+INDEX = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS chat_msg_search_idx ON {TABLE} USING gin (search_vector)"
+
+BACKWARD = [
+    "DROP INDEX CONCURRENTLY IF EXISTS chat_msg_search_idx",
+    f"DROP TRIGGER IF EXISTS chat_message_search_vector_trg ON {TABLE}",
+    "DROP FUNCTION IF EXISTS chat_message_search_vector()",
+    f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def create_search_vector(apps, schema_editor):
+    """
+    Колонка и триггер — сразу (без перезаписи таблицы), старые строки —
+    пачками по BATCH_SIZE в отдельных транзакциях, индекс — CONCURRENTLY,
+    чтобы не держать блокировку на записи в чат.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in FORWARD:
+            cursor.execute(statement)
+        last_id = 0
+        while True:
+            cursor.execute(NEXT_BOUND, [last_id])
+            bound = cursor.fetchone()[0]
+            if bound is None:
+                break
+            cursor.execute(BACKFILL, [last_id, bound])
+            last_id = bound
+        cursor.execute(INDEX)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in BACKWARD:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY и пакетный backfill — вне общей транзакции
+    atomic = False
+
+    dependencies = [
+        ('messaging', '0008_chatroom_pair_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_vector, drop_search_vector),
+    ]
@@ -0,0 +1,138 @@
+from datetime import datetime, timezone
+
+from django.db import migrations, transaction
+from django.db.migrations.exceptions import IrreversibleError
+
+# Помесячное RANGE-партиционирование ChatMessage по created_at (только PostgreSQL).
+# Существующая таблица без перезаписи становится партицией LEGACY (от MINVALUE до
+# начала следующего месяца), новые сообщения ложатся в помесячные партиции
+# messaging_chatmessage_pYYYY_MM; дальше их создаёт задача maintain_chat_partitions.
+# Первичный ключ партиционированной таблицы обязан включать ключ партиционирования,
+# поэтому в БД он (id, created_at); модель по-прежнему адресует строки по id.
+TABLE = "messaging_chatmessage"
+LEGACY = f"{TABLE}_legacy"
+MONTHS_AHEAD = 3
+
+
+def month_start(moment, shift=0):
+    moment = moment.astimezone(timezone.utc)
+    index = moment.year * 12 + moment.month - 1 + shift
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE])
+        if cursor.fetchone() is not None:
+            # подмена уже прошла, не записана только сама миграция
+            return
+
+        cursor.execute(f"SELECT greatest(now(), max(created_at)) FROM {TABLE}")
+        boundary = month_start(cursor.fetchone()[0], 1)
+
+        # Всё, что требует прохода по таблице, — до блокировки и без остановки записи:
+        # индекс под новый первичный ключ и CHECK, по которому ATTACH не сканирует строки.
+        # Прерванный прогон мог оставить INVALID-индекс (IF NOT EXISTS его не пересоздаст)
+        # и CHECK со старой границей — повторный запуск начинает с них.
+        cursor.execute(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [f"{LEGACY}_pkey"],
+        )
+        row = cursor.fetchone()
+        if row is not None and not row[0]:
+            cursor.execute(f"DROP INDEX CONCURRENTLY {LEGACY}_pkey")
+        cursor.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {LEGACY}_pkey ON {TABLE} (id, created_at)")
+        cursor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT IF EXISTS chat_msg_legacy_bound")
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT chat_msg_legacy_bound "
+            f"CHECK (created_at < '{boundary.isoformat()}') NOT VALID"
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} VALIDATE CONSTRAINT chat_msg_legacy_bound")
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}")
+        cursor.execute(f"ALTER TABLE {LEGACY} DROP CONSTRAINT {TABLE}_pkey")
+        cursor.execute(f"ALTER TABLE {LEGACY} ADD CONSTRAINT {LEGACY}_pkey PRIMARY KEY USING INDEX {LEGACY}_pkey")
+        cursor.execute(f"ALTER TABLE {LEGACY} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+        cursor.execute(f"DROP TRIGGER IF EXISTS chat_message_search_vector_trg ON {LEGACY}")
+
+        # Индексы и внешние ключи родителя получают прежние имена (их знает состояние
+        # миграций Django), а одноимённые у LEGACY переименовываются; при ATTACH
+        # PostgreSQL подцепляет их как партиции родительских, без перестроения.
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s ORDER BY indexname",
+            [LEGACY, f"{LEGACY}_pkey"],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f' ORDER BY conname",
+            [LEGACY],
+        )
+        foreign_keys = cursor.fetchall()
+        for number, (name, _) in enumerate(indexes):
+            cursor.execute(f'ALTER INDEX "{name}" RENAME TO chat_msg_legacy_idx_{number}')
+        for number, (name, _) in enumerate(foreign_keys):
+            cursor.execute(f'ALTER TABLE {LEGACY} RENAME CONSTRAINT "{name}" TO chat_msg_legacy_fk_{number}')
+
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {LEGACY} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE (created_at)"
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT IF EXISTS chat_msg_legacy_bound")
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+        cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, created_at)")
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT "{name}" {definition}')
+        for _, definition in indexes:
+            on_table = definition.index(" ON ") + len(" ON ")
+            using = definition.index(" USING ")
+            cursor.execute(f"{definition[:on_table]}{TABLE}{definition[using:]}")
+        cursor.execute(
+            f"""
+            CREATE TRIGGER chat_message_search_vector_trg
+            BEFORE INSERT OR UPDATE OF text ON {TABLE}
+            FOR EACH ROW EXECUTE FUNCTION chat_message_search_vector()
+            """
+        )
+
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {LEGACY} "
+            f"FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')"
+        )
+        cursor.execute(f"ALTER TABLE {LEGACY} DROP CONSTRAINT chat_msg_legacy_bound")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), coalesce(max(id), 0) + 1, false) FROM {TABLE}"
+        )
+        for shift in range(MONTHS_AHEAD):
+            month = month_start(boundary, shift)
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_p{month:%Y_%m} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{month_start(month, 1).isoformat()}')"
+            )
+
+
+def unpartition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # обратно — только восстановлением из бэкапа: старые партиции могли уже уйти в архив
+    raise IrreversibleError("messaging.0010_chatmessage_partitions нельзя откатить на PostgreSQL")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY и VALIDATE — вне транзакции, подмена таблицы — в своей
+    atomic = False
+
+    dependencies = [
+        ('messaging', '0009_chatmessage_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_table, unpartition_table),
+    ]
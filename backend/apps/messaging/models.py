@@ -1,5 +1,6 @@
 from __future__ import annotations
 import uuid
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 from django.db import models
@@ -8,6 +9,8 @@ from apps.utils.models import Create, CreateUpdater
 
 User = get_user_model()
 
+PREVIEW_LENGTH = 140
+
 
 class ChatRoom(CreateUpdater):
     class RoomType(models.TextChoices):
@@ -45,11 +48,51 @@ class ChatRoom(CreateUpdater):
         through="ChatRoomParticipant",
         related_name="chat_rooms",
     )
+    # снимок последнего сообщения для списка комнат — пишется вместе с сообщением
+    last_message_at = models.DateTimeField(
+        _("Последняя активность"),
+        default=timezone.now,
+        help_text=_("Время последнего сообщения, для комнаты без сообщений — время создания."),
+    )
+    last_message_preview = models.CharField(_("Последнее сообщение"), max_length=PREVIEW_LENGTH, blank=True)
+    last_sender = models.ForeignKey(
+        User,
+        verbose_name=_("Автор последнего сообщения"),
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    # личный чат ищется по ключу пары, а не двойным JOIN через участников
+    pair_key = models.CharField(
+        _("Ключ пары"),
+        max_length=41,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Для личного чата — id собеседников по возрастанию через двоеточие."),
+    )
 
     class Meta:  # pyright: ignore[reportIncompatibleVariableOverride]
+        indexes = [
+            # «мои комнаты, новые сверху»: keyset по (last_message_at, id)
+            models.Index(fields=["-last_message_at", "-id"], name="chat_room_last_message_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["pair_key"],
+                condition=models.Q(type="private"),
+                name="chat_room_private_pair_uniq",
+            ),
+        ]
         verbose_name = _("Комната чата")
         verbose_name_plural = _("Комнаты чата")
 
+    @staticmethod
+    def make_pair_key(user_id: int, other_id: int) -> str:
+        low, high = sorted((int(user_id), int(other_id)))
+        return f"{low}:{high}"
+
     def __str__(self) -> str:
         if self.type == self.RoomType.PRIVATE:
             return _("Личный чат %(id)s") % {"id": self.id}
@@ -71,9 +114,19 @@ class ChatRoomParticipant(models.Model):
     )
     is_admin = models.BooleanField(_("Администратор"), default=False)
     joined_at = models.DateTimeField(_("Дата вступления"), auto_now_add=True)
+    # seq последнего прочитанного сообщения; без FK — пишется пачками из Redis
+    last_read_seq = models.PositiveBigIntegerField(
+        _("Прочитано до"),
+        default=0,
+        help_text=_("Номер (seq) последнего прочитанного сообщения в комнате."),
+    )
 
     class Meta:
         unique_together = ("room", "user")
+        indexes = [
+            # комнаты пользователя без обращения к таблице (index-only scan в PostgreSQL)
+            models.Index(fields=["user", "room"], include=["last_read_seq"], name="chat_participant_user_room_idx"),
+        ]
         verbose_name = _("Участник комнаты")
         verbose_name_plural = _("Участники комнат")
 
@@ -95,9 +148,23 @@ class ChatMessage(Create):
         related_name="chat_messages",
     )
     text = models.TextField(_("Текст"))
+    seq = models.PositiveBigIntegerField(
+        _("Номер в комнате"),
+        null=True,
+        blank=True,
+        help_text=_("Монотонный номер сообщения внутри комнаты для догрузки пропущенного после переподключения."),
+    )
+    # не auto_now_add: при отложенной записи время назначается в момент рассылки
+    # и не должно перезаписываться при bulk_create
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     class Meta:  # pyright: ignore[reportIncompatibleVariableOverride]
-        ordering = ["created_at"]
+        ordering = ["created_at", "id"]
+        indexes = [
+            # история комнаты: keyset-пагинация по (created_at, id) внутри room
+            models.Index(fields=["room", "created_at", "id"], name="chat_msg_room_created_id_idx"),
+            models.Index(fields=["room", "seq"], name="chat_msg_room_seq_idx"),
+        ]
         verbose_name = _("Сообщение чата")
         verbose_name_plural = _("Сообщения чата")
 
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import gzip
+import logging
+import re
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from django.db import connection
+from django.utils import timezone
+
+from apps.messaging.models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+# Помесячные RANGE-партиции по created_at создаёт миграция 0010_chatmessage_partitions
+# (только PostgreSQL); всё, что было до неё, лежит в одной партиции LEGACY_PARTITION.
+TABLE = ChatMessage._meta.db_table
+LEGACY_PARTITION = f"{TABLE}_legacy"
+PARTITION_PREFIX = f"{TABLE}_p"
+
+# search_vector не выгружается: при загрузке обратно его заполнит триггер
+EXPORT_COLUMNS = ("id", "room_id", "sender_id", "text", "seq", "created_at")
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    upper: datetime  # верхняя граница диапазона, не включительно
+
+
+def month_start(moment: datetime, shift: int = 0) -> datetime:
+    """
+    Начало месяца (UTC), в который попадает moment, сдвинутое на shift месяцев.
+    """
+    moment = moment.astimezone(dt_timezone.utc)
+    index = moment.year * 12 + moment.month - 1 + shift
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y_%m}"
+
+
+def partitioning_enabled() -> bool:
+    """
+    Таблица сообщений партиционирована — миграция 0010 применена на PostgreSQL.
+    """
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> list[Partition]:
+    """
+    Подключённые партиции по возрастанию верхней границы.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+            """,
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        match = _UPPER_BOUND.search(bound)
+        if match:
+            partitions.append(Partition(name=name, upper=datetime.fromisoformat(match.group(1))))
+    return sorted(partitions, key=lambda partition: partition.upper)
+
+
+def detached_partitions() -> list[str]:
+    """
+    Отсоединённые, но ещё не выгруженные партиции — хвост прерванной архивации.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname FROM pg_class c
+            WHERE c.relkind = 'r' AND pg_table_is_visible(c.oid)
+              AND (c.relname = %s OR starts_with(c.relname, %s))
+              AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)
+            ORDER BY c.relname
+            """,
+            [LEGACY_PARTITION, PARTITION_PREFIX],
+        )
+        return [name for (name,) in cursor.fetchall()]
+
+
+def ensure_partitions(now: datetime | None = None, ahead: int | None = None) -> list[str]:
+    """
+    Партиции на текущий месяц и ahead месяцев вперёд. Идемпотентно: месяцы,
+    уже покрытые существующими партициями, пропускаются.
+
+    :return: имена созданных партиций.
+    """
+    if not partitioning_enabled():
+        return []
+    ahead = settings.CHAT_PARTITION_MONTHS_AHEAD if ahead is None else ahead
+    current = month_start(now or timezone.now())
+    partitions = list_partitions()
+    covered = partitions[-1].upper if partitions else current
+
+    created = []
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for shift in range(ahead + 1):
+            month = month_start(current, shift)
+            if month < covered:
+                continue
+            name = partition_name(month)
+            # границы — литералами: в DDL нет параметров запроса
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(TABLE)} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{month_start(month, 1).isoformat()}')"
+            )
+            created.append(name)
+    return created
+
+
+def detach_partition(name: str) -> None:
+    """
+    DETACH ... CONCURRENTLY не блокирует запись в родительскую таблицу,
+    но не работает внутри транзакции — вызывать в autocommit.
+    """
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(name)} CONCURRENTLY")
+
+
+def export_partition(name: str) -> str:
+    """
+    Выгрузка партиции в gzip CSV с заголовком в хранилище dbbackup;
+    обратно загружается через COPY ... FROM с тем же списком колонок.
+
+    :return: имя файла в хранилище.
+    """
+    qn = connection.ops.quote_name
+    columns = ", ".join(qn(column) for column in EXPORT_COLUMNS)
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz, connection.cursor() as cursor:
+            with cursor.copy(f"COPY (SELECT {columns} FROM {qn(name)}) TO STDOUT WITH (FORMAT csv, HEADER)") as copy:
+                for data in copy:
+                    gz.write(data)
+        raw.seek(0)
+        return storages["dbbackup"].save(f"partitions/chat_message/{name}.csv.gz", File(raw))
+
+
+def drop_partition(name: str) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(name)}")
+
+
+def archive_old_partitions(now: datetime | None = None, days: int | None = None) -> list[str]:
+    """
+    Партиции, целиком старше days дней: отсоединить, выгрузить в хранилище
+    и удалить. Таблица удаляется только после успешного сохранения файла;
+    оставшиеся после сбоя отсоединённые партиции подбираются следующим прогоном.
+
+    Срок — RETENTION_DAYS["chat_message"], общий с построчной политикой
+    apps.utils.retention (она для партиционированной таблицы не запускается).
+    Месяц уходит целиком, поэтому сообщение живёт до days дней плюс месяц.
+
+    :return: имена сохранённых файлов.
+    """
+    days = settings.RETENTION_DAYS.get("chat_message", 0) if days is None else days
+    if days <= 0 or not partitioning_enabled():
+        return []
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+
+    archives = []
+    expired = [partition.name for partition in list_partitions() if partition.upper <= cutoff]
+    for name in expired:
+        detach_partition(name)
+    for name in detached_partitions():
+        archive = export_partition(name)
+        drop_partition(name)
+        logger.info("Chat partition %s archived to %s", name, archive)
+        archives.append(archive)
+    return archives
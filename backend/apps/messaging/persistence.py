@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Iterable
+from uuid import UUID
+
+from apps.messaging.models import PREVIEW_LENGTH, ChatMessage, ChatRoom
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# БД недоступна (рестарт, failover, сеть): сообщения уже разосланы с id и seq,
+# поэтому пачка возвращается в буфер и пишется повторно, а не отбрасывается
+TRANSIENT_DB_ERRORS = (OperationalError, InterfaceError)
+# Потолок экспоненциальной паузы между повторами, секунд
+MAX_RETRY_DELAY = 30.0
+
+
+def write_behind_enabled() -> bool:
+    """
+    Отложенная запись включается настройкой и работает только на PostgreSQL:
+    id сообщений резервируются блоками из sequence таблицы.
+    """
+    return settings.CHAT_WRITE_BEHIND and connection.vendor == "postgresql"
+
+
+class MessageIdAllocator:
+    """
+    Выдаёт id сообщений до INSERT, резервируя их блоками из sequence PostgreSQL.
+
+    Один запрос к БД на CHAT_MESSAGE_ID_BLOCK сообщений; id уникальны между
+    воркерами, но внутри комнаты могут идти не по порядку — порядок задаёт created_at.
+    """
+
+    def __init__(self, block_size: int | None = None) -> None:
+        self.block_size = block_size or settings.CHAT_MESSAGE_ID_BLOCK
+        self._ids: deque[int] = deque()
+        self._lock: asyncio.Lock | None = None
+
+    @database_sync_to_async
+    def _reserve_block(self) -> list[int]:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [ChatMessage._meta.db_table, self.block_size],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    async def next_id(self) -> int:
+        if not self._ids:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if not self._ids:
+                    self._ids.extend(await self._reserve_block())
+        return self._ids.popleft()
+
+
+def _touch_rooms(messages: Iterable[ChatMessage]) -> None:
+    """
+    Снимок последнего сообщения в ChatRoom — вызывается в той же транзакции,
+    что и INSERT сообщений. Один UPDATE на комнату; условие по last_message_at
+    не даёт более старому сообщению (соседний воркер, запоздавшая пачка)
+    затереть более новое.
+    """
+    latest: dict[Any, ChatMessage] = {}
+    for message in messages:
+        current = latest.get(message.room_id)
+        if current is None or (message.created_at, message.pk) > (current.created_at, current.pk):
+            latest[message.room_id] = message
+
+    for room_id, message in latest.items():
+        ChatRoom.objects.filter(pk=room_id, last_message_at__lte=message.created_at).update(
+            last_message_at=message.created_at,
+            last_message_preview=message.text[:PREVIEW_LENGTH],
+            last_sender_id=message.sender_id,
+        )
+
+
+def _create_message(**fields: Any) -> ChatMessage:
+    with transaction.atomic():
+        message = ChatMessage.objects.create(**fields)
+        _touch_rooms([message])
+    return message
+
+
+def _insert_batch(batch: list[ChatMessage]) -> tuple[list[ChatMessage], list[ChatMessage]]:
+    """
+    Пачка одним bulk_create; если пачка не проходит (например, комнату удалили
+    между рассылкой и записью), пишем по одному, чтобы не терять остальные.
+
+    :return: (отброшенные — их запись не пройдёт и при повторе,
+        отложенные — БД недоступна, нужен повтор).
+    """
+    try:
+        with transaction.atomic():
+            ChatMessage.objects.bulk_create(batch)
+            _touch_rooms(batch)
+        return [], []
+    except TRANSIENT_DB_ERRORS:
+        logger.warning("Chat database unavailable, %d messages postponed", len(batch), exc_info=True)
+        return [], batch
+    except Exception:
+        logger.exception("Bulk insert of %d chat messages failed, retrying one by one", len(batch))
+
+    dropped = []
+    for index, message in enumerate(batch):
+        try:
+            with transaction.atomic():
+                ChatMessage.objects.bulk_create([message])
+                _touch_rooms([message])
+        except TRANSIENT_DB_ERRORS:
+            logger.warning("Chat database unavailable, %d messages postponed", len(batch) - index, exc_info=True)
+            return dropped, batch[index:]
+        except Exception:
+            logger.exception("Chat message %s dropped", message.pk)
+            dropped.append(message)
+    return dropped, []
+
+
+class MessageWriteBuffer:
+    """
+    Буфер отложенной записи сообщений на воркер.
+
+    Сообщения копятся в памяти и сбрасываются bulk_create каждые
+    CHAT_WRITE_BEHIND_FLUSH_INTERVAL секунд или при накоплении
+    CHAT_WRITE_BEHIND_BATCH_SIZE штук. close() при штатной остановке
+    дописывает всё, что осталось.
+
+    Пока БД недоступна, неудавшиеся пачки остаются в начале очереди, а повтор
+    идёт с экспоненциальной паузой до MAX_RETRY_DELAY секунд.
+    """
+
+    def __init__(self, *, flush_interval: float | None = None, batch_size: int | None = None) -> None:
+        self.flush_interval = flush_interval or settings.CHAT_WRITE_BEHIND_FLUSH_INTERVAL
+        self.batch_size = batch_size or settings.CHAT_WRITE_BEHIND_BATCH_SIZE
+        self._pending: list[ChatMessage] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._lock: asyncio.Lock | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self.retry_delay = 0.0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._task = None
+        return loop
+
+    def _ensure_started(self) -> None:
+        loop = self._bind_loop()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    def add(self, message: ChatMessage) -> None:
+        self._ensure_started()
+        self._pending.append(message)
+        # во время паузы после отказа БД накопление не будит сброс раньше времени
+        if len(self._pending) >= self.batch_size and not self.retry_delay:
+            self._wakeup.set()  # pyright: ignore[reportOptionalMemberAccess]
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.retry_delay or self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Записать всё накопленное. Возвращает число записанных сообщений.
+        """
+        if not self._pending:
+            return 0
+        self._bind_loop()
+        assert self._lock is not None
+        written = 0
+        async with self._lock:
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                dropped, postponed = await database_sync_to_async(_insert_batch)(batch)
+                written += len(batch) - len(dropped) - len(postponed)
+                if postponed:
+                    self._pending[:0] = postponed
+                    self.retry_delay = min(max(self.retry_delay * 2, self.flush_interval), MAX_RETRY_DELAY)
+                    break
+                self.retry_delay = 0.0
+        return written
+
+    async def close(self) -> None:
+        """
+        Штатная остановка: дожидаемся текущего сброса (не отменяем его посреди
+        INSERT) и дописываем остаток.
+        """
+        self._closing = True
+        if self._task is not None and not self._task.done() and self._loop is asyncio.get_running_loop():
+            self._wakeup.set()  # pyright: ignore[reportOptionalMemberAccess]
+            await self._task
+        self._task = None
+        await self.flush()
+        if self._pending:
+            logger.error("Chat database unavailable on shutdown, %d messages not written", len(self._pending))
+        self._closing = False
+
+
+message_id_allocator = MessageIdAllocator()
+message_buffer = MessageWriteBuffer()
+
+
+async def store_message(room_id: UUID | str, sender_id: int, text: str, *, seq: int | None = None) -> ChatMessage:
+    """
+    Сохранение сообщения чата.
+
+    Обычный режим — INSERT до рассылки. В режиме отложенной записи сообщение
+    сразу получает id и время, уходит в буфер воркера и рассылается, не дожидаясь БД.
+    В обоих случаях снимок последнего сообщения в ChatRoom пишется той же транзакцией.
+    """
+    if not write_behind_enabled():
+        return await database_sync_to_async(_create_message)(
+            room_id=room_id,
+            sender_id=sender_id,
+            text=text,
+            seq=seq,
+        )
+
+    message = ChatMessage(
+        id=await message_id_allocator.next_id(),
+        room_id=room_id,
+        sender_id=sender_id,
+        text=text,
+        seq=seq,
+        created_at=timezone.now(),
+    )
+    message_buffer.add(message)
+    return message
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Iterable
+from uuid import UUID
+
+from apps.messaging.services import room_send
+from config.async_redis import AsyncRedisClient
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] — хеш комнаты user_id → время последнего сигнала (мс, часы Redis),
+# KEYS[2] — хеш соединений пользователя в комнате channel_name → время сигнала.
+# Возвращает 1, если пользователь до этого не считался онлайн.
+TOUCH_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local ttl = tonumber(ARGV[3])
+redis.call('HSET', KEYS[2], ARGV[2], now)
+redis.call('PEXPIRE', KEYS[2], ttl)
+local prev = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+redis.call('HSET', KEYS[1], ARGV[1], now)
+redis.call('PEXPIRE', KEYS[1], ttl)
+if prev < now - ttl then
+    return 1
+end
+return 0
+"""
+
+# Закрытие соединения; протухшие соединения пользователя удаляются заодно.
+# Возвращает 1, если это было последнее живое соединение и пользователь ушёл офлайн.
+LEAVE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local ttl = tonumber(ARGV[3])
+redis.call('HDEL', KEYS[2], ARGV[2])
+local entries = redis.call('HGETALL', KEYS[2])
+local alive = false
+for i = 1, #entries, 2 do
+    if tonumber(entries[i + 1]) >= now - ttl then
+        alive = true
+    else
+        redis.call('HDEL', KEYS[2], entries[i])
+    end
+end
+if alive then
+    return 0
+end
+return redis.call('HDEL', KEYS[1], ARGV[1])
+"""
+
+# Живые участники; протухшие поля (упавший воркер, обрыв без disconnect) удаляются.
+ONLINE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local ttl = tonumber(ARGV[1])
+local entries = redis.call('HGETALL', KEYS[1])
+local online = {}
+for i = 1, #entries, 2 do
+    if tonumber(entries[i + 1]) >= now - ttl then
+        table.insert(online, entries[i])
+    else
+        redis.call('HDEL', KEYS[1], entries[i])
+    end
+end
+return online
+"""
+
+
+def room_presence_key(room_id: UUID | str) -> str:
+    return f"chat:room:{room_id}:presence"
+
+
+def connections_presence_key(room_id: UUID | str, user_id: int) -> str:
+    return f"chat:room:{room_id}:presence:{user_id}"
+
+
+async def touch_presence(room_id: UUID | str, user_id: int, channel_name: str) -> bool:
+    """
+    Отметка «соединение пользователя в комнате»; продлевает записи на CHAT_PRESENCE_TTL.
+
+    Соединения учитываются по отдельности (вкладки, устройства, общий сокет
+    ws/chat/), поэтому закрытие одного из них не уводит пользователя офлайн.
+
+    :return: True, если пользователь только что появился онлайн.
+    """
+    return (await touch_presence_many([room_id], user_id, channel_name))[0]
+
+
+async def touch_presence_many(room_ids: Iterable[UUID | str], user_id: int, channel_name: str) -> list[bool]:
+    """
+    touch_presence для нескольких комнат одним конвейером (общий сокет пользователя).
+    """
+    redis = await AsyncRedisClient.initialize()
+    touch = redis.register_script(TOUCH_SCRIPT)
+    ttl_ms = settings.CHAT_PRESENCE_TTL * 1000
+    async with redis.pipeline(transaction=False) as pipe:
+        for room_id in room_ids:
+            keys = [room_presence_key(room_id), connections_presence_key(room_id, user_id)]
+            await touch(keys=keys, args=[user_id, channel_name, ttl_ms], client=pipe)
+        return [bool(appeared) for appeared in await pipe.execute()]
+
+
+async def leave_presence(room_id: UUID | str, user_id: int, channel_name: str) -> bool:
+    """
+    Снятие отметки соединения.
+
+    :return: True, если закрылось последнее живое соединение пользователя в комнате.
+    """
+    redis = await AsyncRedisClient.initialize()
+    keys = [room_presence_key(room_id), connections_presence_key(room_id, user_id)]
+    ttl_ms = settings.CHAT_PRESENCE_TTL * 1000
+    left = await redis.register_script(LEAVE_SCRIPT)(keys=keys, args=[user_id, channel_name, ttl_ms])
+    return bool(left)
+
+
+async def online_members(room_id: UUID | str) -> list[int]:
+    redis = await AsyncRedisClient.initialize()
+    ttl_ms = settings.CHAT_PRESENCE_TTL * 1000
+    online = await redis.register_script(ONLINE_SCRIPT)(keys=[room_presence_key(room_id)], args=[ttl_ms])
+    return sorted(int(user_id) for user_id in online)
+
+
+class PresenceBatcher:
+    """
+    Склейка событий присутствия и набора текста по комнатам.
+
+    Изменения копятся interval секунд и уходят в группу комнаты одним
+    событием chat.presence. Противоположные изменения одного пользователя
+    в пределах окна гасят друг друга, поэтому при 200 печатающих участниках
+    каждый воркер шлёт не больше одного кадра на комнату за окно, а не
+    по кадру на каждое нажатие.
+    """
+
+    OPPOSITE = {
+        "online": "offline",
+        "offline": "online",
+        "typing": "stopped_typing",
+        "stopped_typing": "typing",
+    }
+
+    def __init__(self, interval: float | None = None) -> None:
+        self.interval = settings.CHAT_PRESENCE_BATCH_INTERVAL if interval is None else interval
+        self._pending: dict[str, dict[str, set[int]]] = {}
+        self._timers: dict[str, asyncio.Task] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _bind_loop(self) -> None:
+        # таймеры привязаны к циклу событий; в новом цикле (тесты, перезапуск) — с нуля
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending.clear()
+            self._timers.clear()
+
+    def add(self, room_id: UUID | str, kind: str, user_id: int) -> None:
+        self._bind_loop()
+        room_key = str(room_id)
+        pending = self._pending.setdefault(room_key, {name: set() for name in self.OPPOSITE})
+        opposite = pending[self.OPPOSITE[kind]]
+        if user_id in opposite:
+            opposite.discard(user_id)
+        else:
+            pending[kind].add(user_id)
+
+        if room_key not in self._timers:
+            self._timers[room_key] = asyncio.create_task(self._flush_later(room_key))
+
+    async def _flush_later(self, room_key: str) -> None:
+        try:
+            await asyncio.sleep(self.interval)
+        finally:
+            self._timers.pop(room_key, None)
+        await self.flush(room_key)
+
+    async def close(self) -> None:
+        """
+        Отмена отложенных рассылок (остановка воркера, конец теста); накопленное сбрасывается.
+        """
+        timers = list(self._timers.values())
+        for timer in timers:
+            timer.cancel()
+        await asyncio.gather(*timers, return_exceptions=True)
+        self._timers.clear()
+        self._pending.clear()
+
+    async def flush(self, room_key: str) -> None:
+        pending = self._pending.pop(room_key, None)
+        if not pending or not any(pending.values()):
+            return
+        event: dict[str, Any] = {"type": "chat.presence", "room_id": room_key}
+        event.update({kind: sorted(user_ids) for kind, user_ids in pending.items()})
+        try:
+            await room_send(room_key, event)
+        except Exception:
+            logger.exception("Failed to broadcast presence for room %s", room_key)
+
+
+presence_batcher = PresenceBatcher()
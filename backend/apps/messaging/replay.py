@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any
+from uuid import UUID
+
+from apps.messaging.models import ChatMessage
+from channels.db import database_sync_to_async
+from config.async_redis import AsyncRedisClient
+from django.conf import settings
+from django.db.models import Max
+
+
+# запас на расхождение часов воркеров: created_at ставит один процесс, заглушку — другой
+CLOCK_SKEW = 60
+
+
+def room_seq_key(room_id: UUID | str) -> str:
+    return f"chat:room:{room_id}:seq"
+
+
+def room_replay_key(room_id: UUID | str) -> str:
+    return f"chat:room:{room_id}:replay"
+
+
+@database_sync_to_async
+def _max_persisted_seq(room_id: UUID | str) -> int:
+    return ChatMessage.objects.filter(room_id=room_id).aggregate(seq=Max("seq"))["seq"] or 0
+
+
+# Номер и место в буфере догрузки — одной операцией: в буфере сразу стоит заглушка
+# "<seq>:@<unix time>", которую remember_event заменит событием. Так догрузка отличает
+# «ещё в пути» от «пропущено» и не отдаёт seq N+1 раньше, чем N дойдёт вживую.
+# floor — досев счётчика после потери Redis: номер не меньше floor + 1.
+RESERVE_SEQ_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+local floor = tonumber(ARGV[1])
+if seq <= floor then
+    seq = redis.call('INCRBY', KEYS[1], floor - seq + 1)
+end
+redis.call('ZADD', KEYS[2], seq, seq .. ':@' .. ARGV[2])
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -tonumber(ARGV[3]) - 1)
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return seq
+"""
+
+
+async def _reserve_seq(redis: Any, room_id: UUID | str, floor: int) -> int:
+    return int(
+        await redis.register_script(RESERVE_SEQ_SCRIPT)(
+            keys=[room_seq_key(room_id), room_replay_key(room_id)],
+            args=[floor, int(time.time()), settings.CHAT_REPLAY_BUFFER_SIZE, settings.CHAT_REPLAY_BUFFER_TTL],
+        )
+    )
+
+
+async def next_seq(room_id: UUID | str) -> int:
+    """
+    Следующий номер сообщения в комнате (Redis INCR) с заглушкой в буфере догрузки.
+
+    Если счётчик потерян (Redis очищен), первый INCR вернёт 1 — тогда
+    досеиваем его максимумом из БД, чтобы номера не пошли по второму кругу.
+    """
+    redis = await AsyncRedisClient.initialize()
+    seq = await _reserve_seq(redis, room_id, 0)
+    if seq == 1:
+        persisted = await _max_persisted_seq(room_id)
+        if persisted:
+            await forget_seq(room_id, seq)
+            seq = await _reserve_seq(redis, room_id, persisted)
+    return seq
+
+
+async def forget_seq(room_id: UUID | str, seq: int) -> None:
+    """
+    Снять заглушку номера, событие которого так и не появится (сообщение не сохранено).
+    """
+    redis = await AsyncRedisClient.initialize()
+    await redis.zremrangebyscore(room_replay_key(room_id), seq, seq)
+
+
+async def remember_event(room_id: UUID | str, event: dict[str, Any]) -> None:
+    """
+    Кладёт разосланное событие в ограниченный буфер комнаты (ZSET по seq) на место заглушки.
+    """
+    redis = await AsyncRedisClient.initialize()
+    key = room_replay_key(room_id)
+    seq = event["seq"]
+    member = f"{seq}:{json.dumps(event, ensure_ascii=False)}"
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.zremrangebyscore(key, seq, seq)
+        pipe.zadd(key, {member: seq})
+        pipe.zremrangebyrank(key, 0, -settings.CHAT_REPLAY_BUFFER_SIZE - 1)
+        pipe.expire(key, settings.CHAT_REPLAY_BUFFER_TTL)
+        await pipe.execute()
+
+
+@database_sync_to_async
+def _persisted_events_since(room_id: UUID | str, since: int, created_after: datetime, limit: int) -> list[dict[str, Any]]:
+    rows = (
+        # граница по created_at — ключу партиций: запрос не обходит все месяцы таблицы
+        ChatMessage.objects.filter(room_id=room_id, seq__gt=since, created_at__gte=created_after)
+        .order_by("seq")
+        .values("id", "seq", "created_at", "text", "sender__display_name")[:limit]
+    )
+    return [
+        {
+            "type": "chat.message",
+            "room_id": str(room_id),
+            "id": row["id"],
+            "seq": row["seq"],
+            "created_at": row["created_at"].isoformat(),
+            "message": row["text"],
+            "display_name": row["sender__display_name"],
+            "is_stream": False,
+            "is_start": False,
+            "is_end": False,
+        }
+        for row in rows
+    ]
+
+
+def _parse_buffer(members: list[str]) -> tuple[list[dict[str, Any]], dict[int, int]]:
+    """
+    :return: (события по возрастанию seq, {seq: время резервирования} для заглушек).
+    """
+    events: list[dict[str, Any]] = []
+    pending: dict[int, int] = {}
+    for member in members:
+        seq, payload = member.split(":", 1)
+        if payload.startswith("@"):
+            pending[int(seq)] = int(payload[1:])
+        else:
+            events.append(json.loads(payload))
+    return events, pending
+
+
+def _window_start(buffered: list[dict[str, Any]], pending: dict[int, int], since: int) -> datetime:
+    """
+    Нижняя граница created_at для догрузки из БД: время seq since + 1, если он
+    ещё в буфере (событием или заглушкой), иначе — возраст самого буфера
+    CHAT_REPLAY_BUFFER_TTL. Более старый разрыв догрузка не покрывает: клиент
+    видит скачок номера и перечитывает историю через API.
+    """
+    first = since + 1
+    if first in pending:
+        started = float(pending[first])
+    elif buffered and buffered[0]["seq"] == first:
+        started = datetime.fromisoformat(buffered[0]["created_at"]).timestamp()
+    else:
+        started = time.time() - settings.CHAT_REPLAY_BUFFER_TTL
+    return datetime.fromtimestamp(started - CLOCK_SKEW, tz=timezone.utc)
+
+
+def _is_contiguous(events: list[dict[str, Any]], since: int, current: int) -> bool:
+    return [event["seq"] for event in events] == list(range(since + 1, current + 1))
+
+
+async def events_since(room_id: UUID | str, since: int) -> list[dict[str, Any]]:
+    """
+    События комнаты с номером больше since — для догрузки после переподключения.
+
+    Буфер в Redis отдаётся, только если в нём все номера от since + 1 до текущего
+    подряд. Иначе (разрыв старше буфера, сообщение ещё в пути) — из БД (не больше
+    CHAT_REPLAY_MAX_EVENTS, в окне _window_start) вместе с буфером. Выдача обрывается перед первым
+    номером, который ещё в пути (заглушка моложе CHAT_REPLAY_PENDING_TIMEOUT):
+    он и следующие придут вживую, а consumer не отбросит живой N как дубль
+    уже догруженного N+1. Номера без события и без свежей заглушки (сообщение
+    не сохранилось) пропускаются.
+
+    :return: события по возрастанию seq.
+    """
+    redis = await AsyncRedisClient.initialize()
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.get(room_seq_key(room_id))
+        pipe.zrangebyscore(room_replay_key(room_id), f"({since}", "+inf")
+        current_raw, members = await pipe.execute()
+
+    current = int(current_raw or 0)
+    if current <= since:
+        return []
+
+    buffered, pending = _parse_buffer(members)
+    if not pending and _is_contiguous(buffered, since, current):
+        return buffered
+
+    limit = settings.CHAT_REPLAY_MAX_EVENTS
+    persisted = await _persisted_events_since(room_id, since, _window_start(buffered, pending, since), limit)
+    if len(persisted) >= limit:
+        # разрыв слишком большой — клиенту лучше перечитать историю через API
+        return persisted
+
+    merged = {event["seq"]: event for event in buffered}
+    merged.update((event["seq"], event) for event in persisted)
+    fresh_after = time.time() - settings.CHAT_REPLAY_PENDING_TIMEOUT
+    in_flight = [seq for seq, reserved_at in pending.items() if seq not in merged and reserved_at >= fresh_after]
+    cut = min(in_flight, default=current + 1)
+    return [merged[seq] for seq in sorted(merged) if seq < cut]
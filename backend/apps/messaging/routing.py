@@ -4,11 +4,16 @@ from typing import Any, Callable, cast
 
 from django.urls import re_path
 
-from .consumers import ChatConsumer
+from .consumers import ChatConsumer, UserChatConsumer
 
 websocket_urlpatterns: list[Any] = [
     re_path(
         r"^ws/chat/(?P<room_id>[0-9a-f-]+)/$",
         cast(Callable[..., Any], ChatConsumer.as_asgi()),
-    )
+    ),
+    # один сокет на все комнаты пользователя
+    re_path(
+        r"^ws/chat/$",
+        cast(Callable[..., Any], UserChatConsumer.as_asgi()),
+    ),
 ]
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchVectorField
+from django.db import connection
+from django.db.models import F, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Replace
+
+# Конфигурации для языков из settings.LANGUAGES; такой же вектор строит
+# триггер из миграции 0009_chatmessage_search_vector
+SEARCH_CONFIGS = ("russian", "english")
+
+# Подсветка совпадений: snippet — готовый HTML, текст сообщения в нём экранирован,
+# и единственная разметка — эти маркеры
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+# Как django.utils.html.escape; "&" — первым, чтобы не экранировать сущности повторно
+HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;"))
+
+
+def search_supported() -> bool:
+    """
+    Поиск работает только по tsvector в PostgreSQL; ILIKE-подстановки нет намеренно.
+    """
+    return connection.vendor == "postgresql"
+
+
+def search_query(text: str) -> SearchQuery:
+    """
+    Запрос в синтаксисе веб-поиска ("фраза", -исключение, or) во всех конфигурациях.
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIGS[0], search_type="websearch")
+    for config in SEARCH_CONFIGS[1:]:
+        query |= SearchQuery(text, config=config, search_type="websearch")
+    return query
+
+
+def matching_messages(queryset: QuerySet, text: str) -> QuerySet:
+    """
+    Сообщения из queryset, подходящие под запрос; фильтр идёт по GIN-индексу chat_msg_search_idx.
+    """
+    vector = RawSQL(f"{connection.ops.quote_name(queryset.model._meta.db_table)}.search_vector", [], output_field=SearchVectorField())
+    return queryset.annotate(search_vector=vector).filter(search_vector=search_query(text))
+
+
+def html_escaped(field: str) -> Replace:
+    """
+    Значение поля с экранированным HTML — в SQL, до ts_headline.
+    """
+    expression = F(field)
+    for char, entity in HTML_ESCAPES:
+        expression = Replace(expression, Value(char), Value(entity))
+    return expression  # pyright: ignore[reportReturnType]
+
+
+def search_messages(queryset: QuerySet, text: str) -> QuerySet:
+    """
+    То же, что matching_messages, с аннотацией snippet — фрагментом текста
+    с подсвеченными совпадениями.
+
+    Текст экранируется до ts_headline: иначе разметка из сообщения попала бы
+    в snippet как есть, рядом с настоящими <mark>.
+    """
+    return matching_messages(queryset, text).annotate(
+        snippet=SearchHeadline(
+            html_escaped("text"),
+            search_query(text),
+            config=SEARCH_CONFIGS[0],
+            start_sel=HIGHLIGHT_START,
+            stop_sel=HIGHLIGHT_STOP,
+            max_fragments=2,
+            max_words=20,
+            min_words=5,
+        )
+    )
@@ -0,0 +1,71 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+
+class ChatHistoryQuerySerializer(serializers.Serializer):
+    before = serializers.IntegerField(required=False, min_value=1)
+    after = serializers.IntegerField(required=False, min_value=1)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=100, default=50)
+
+    def validate(self, attrs):
+        if attrs.get("before") and attrs.get("after"):
+            raise serializers.ValidationError(_("Укажите только один курсор: before или after."))
+        return attrs
+
+
+class ChatMessageSerializer(serializers.Serializer):
+    """
+    Сообщение в истории — только поля, которые рисует клиент
+    (строится из .values(), без загрузки моделей).
+    """
+    id = serializers.IntegerField()
+    seq = serializers.IntegerField(allow_null=True)
+    created_at = serializers.DateTimeField()
+    text = serializers.CharField()
+    sender_id = serializers.IntegerField()
+    sender_display_name = serializers.CharField(source="sender__display_name")
+
+
+class ChatInboxQuerySerializer(serializers.Serializer):
+    before = serializers.UUIDField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=100, default=30)
+
+
+class ChatInboxRoomSerializer(serializers.Serializer):
+    """
+    Комната во «входящих» пользователя: снимок последнего сообщения хранится
+    в самой комнате, unread — из счётчиков в Redis.
+    """
+    id = serializers.UUIDField()
+    type = serializers.CharField()
+    name = serializers.CharField()
+    last_message_at = serializers.DateTimeField()
+    last_message_preview = serializers.CharField()
+    last_sender_id = serializers.IntegerField(allow_null=True)
+    last_sender_display_name = serializers.CharField(source="last_sender__display_name", allow_null=True)
+    last_read_seq = serializers.IntegerField(source="memberships__last_read_seq")
+    unread = serializers.IntegerField()
+
+
+class ChatPrivateRoomSerializer(serializers.Serializer):
+    user_id = serializers.IntegerField(min_value=1)
+
+
+class ChatSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=200, trim_whitespace=True)
+    room = serializers.UUIDField(required=False)
+    before = serializers.IntegerField(required=False, min_value=1)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=50, default=20)
+
+
+class ChatSearchResultSerializer(serializers.Serializer):
+    """
+    Найденное сообщение: snippet — фрагмент текста (экранированный HTML) с совпадениями в <mark>…</mark>.
+    """
+    id = serializers.IntegerField()
+    room_id = serializers.UUIDField()
+    seq = serializers.IntegerField(allow_null=True)
+    created_at = serializers.DateTimeField()
+    sender_id = serializers.IntegerField()
+    sender_display_name = serializers.CharField(source="sender__display_name")
+    snippet = serializers.CharField()
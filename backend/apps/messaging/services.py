@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import logging
+from typing import Any
+from uuid import UUID
+
+import msgpack
+from apps.messaging.fanout import LARGE_ROOMS_KEY, is_large_room, publish_local, room_topic
+from apps.messaging.frames import message_frame, with_frames
+from apps.messaging.models import ChatMessage, ChatRoom, ChatRoomParticipant
+from apps.messaging.persistence import store_message
+from apps.messaging.replay import forget_seq, next_seq, remember_event
+from apps.messaging.unread import count_unread
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def room_group_name(room_id: UUID | str) -> str:
+    return f"chat_room_{room_id}"
+
+
+def message_event(chat_message: ChatMessage, display_name: str) -> dict[str, Any]:
+    """
+    Событие chat.message для рассылки в группу комнаты.
+    """
+    return {
+        "type": "chat.message",
+        "room_id": str(chat_message.room_id),
+        "id": chat_message.pk,
+        "seq": chat_message.seq,
+        "created_at": chat_message.created_at.isoformat(),
+        "message": chat_message.text,
+        "display_name": display_name,
+        "is_stream": False,
+        "is_start": False,
+        "is_end": False,
+    }
+
+
+async def persist_message(room_id: UUID | str, sender_id: int, display_name: str, text: str) -> dict[str, Any]:
+    """
+    Сообщение становится частью комнаты: номер → сохранение → буфер догрузки →
+    счётчики непрочитанного. Рассылка — на вызывающем.
+
+    Счётчики растут до рассылки: квитанция о прочтении, пришедшая в ответ
+    на это сообщение, уже застанет его учтённым и обнулит корректно.
+    """
+    seq = await next_seq(room_id)
+    try:
+        chat_message = await store_message(room_id, sender_id, text, seq=seq)
+    except Exception:
+        await forget_seq(room_id, seq)
+        raise
+    event = message_event(chat_message, display_name)
+    await remember_event(room_id, event)
+    await count_unread(room_id, seq, sender_id)
+    return event
+
+
+async def room_send(room_id: UUID | str, event: dict[str, Any]) -> None:
+    """
+    Событие всем сокетам комнаты.
+
+    Группа channels — всегда: в большой комнате в ней остаются только сокеты,
+    подключившиеся до перехода на pub/sub (обычно никого), и рассылка в
+    пустую группу почти бесплатна. Большой комнате — ещё и топик pub/sub.
+    """
+    await get_channel_layer().group_send(room_group_name(room_id), event)  # pyright: ignore[reportOptionalMemberAccess]
+    if await is_large_room(room_id):
+        await publish_local(room_id, event)
+
+
+def notify_member_removed(room_id: UUID | str, user_id: int) -> None:
+    """
+    Сокеты удалённого участника отписываются от комнаты (синхронно —
+    вызывается из сигналов ORM после коммита).
+
+    Без обращения к AsyncRedisClient: он привязан к циклу событий сервера,
+    а async_to_sync вне ASGI поднимает свой цикл.
+    """
+    event = {"type": "chat.member_removed", "room_id": str(room_id), "user_id": user_id}
+    try:
+        async_to_sync(get_channel_layer().group_send)(room_group_name(room_id), event)  # pyright: ignore[reportOptionalMemberAccess]
+        redis = settings.REDIS_CLIENT
+        if redis.sismember(LARGE_ROOMS_KEY, str(room_id)):
+            redis.publish(room_topic(room_id), msgpack.packb(event, use_bin_type=True))  # pyright: ignore[reportArgumentType]
+    except Exception:
+        logger.exception("Failed to notify sockets of user %s removed from room %s", user_id, room_id)
+
+
+async def broadcast_message(room_id: UUID | str, event: dict[str, Any]) -> None:
+    # кадр кодируется здесь один раз, а не в каждом из consumer’ов получателей
+    await room_send(room_id, with_frames(event, message_frame(event)))
+
+
+async def publish_message(room_id: UUID | str, sender_id: int, display_name: str, text: str) -> dict[str, Any]:
+    """
+    Полный путь нового сообщения: persist_message → рассылка участникам.
+    """
+    event = await persist_message(room_id, sender_id, display_name, text)
+    await broadcast_message(room_id, event)
+    return event
+
+
+def _find_private_room(pair_key: str) -> ChatRoom | None:
+    try:
+        return ChatRoom.objects.get(type=ChatRoom.RoomType.PRIVATE, pair_key=pair_key)
+    except ChatRoom.DoesNotExist:
+        return None
+
+
+def get_or_create_private_room(user_id: int, other_id: int) -> tuple[ChatRoom, bool]:
+    """
+    Личный чат двух пользователей — один поиск по уникальному индексу pair_key.
+
+    Одновременные запросы разводит сам индекс: проигравший гонку получает
+    IntegrityError и возвращает комнату победителя.
+
+    :return: (комната, создана ли она сейчас).
+    :raises ValueError: чат с самим собой.
+    """
+    if user_id == other_id:
+        raise ValueError("Private room requires two different users")
+    pair_key = ChatRoom.make_pair_key(user_id, other_id)
+    room = _find_private_room(pair_key)
+    if room is not None:
+        return room, False
+
+    try:
+        with transaction.atomic():
+            room = ChatRoom.objects.create(type=ChatRoom.RoomType.PRIVATE, pair_key=pair_key)
+            for member_id in (user_id, other_id):
+                ChatRoomParticipant.objects.create(room=room, user_id=member_id)
+    except IntegrityError:
+        room = _find_private_room(pair_key)
+        if room is None:
+            raise
+        return room, False
+    return room, True
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from functools import partial
+from typing import Any
+
+from apps.messaging.cache import invalidate_room_cache
+from apps.messaging.models import ChatRoom, ChatRoomParticipant
+from apps.messaging.services import notify_member_removed
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender=ChatRoomParticipant)
+@receiver(post_delete, sender=ChatRoomParticipant)
+def participant_changed(sender: type[ChatRoomParticipant], instance: ChatRoomParticipant, **kwargs: Any) -> None:
+    transaction.on_commit(partial(invalidate_room_cache, instance.room_id))
+
+
+@receiver(post_delete, sender=ChatRoomParticipant)
+def participant_removed(sender: type[ChatRoomParticipant], instance: ChatRoomParticipant, **kwargs: Any) -> None:
+    """
+    Открытые сокеты удалённого участника отписываются от комнаты.
+
+    room.participants.remove()/clear() удаляют строки через QuerySet.delete(),
+    а он при подключённых обработчиках шлёт post_delete для каждой.
+    """
+    transaction.on_commit(partial(notify_member_removed, instance.room_id, instance.user_id))
+
+
+@receiver(m2m_changed, sender=ChatRoom.participants.through)
+def participants_changed(sender: Any, instance: Any, action: str, reverse: bool, pk_set: set | None, **kwargs: Any) -> None:
+    """
+    room.participants.add()/remove()/clear() не шлют post_save для through-модели.
+    """
+    if reverse and action == "pre_clear":
+        # user.chat_rooms.clear(): после очистки список комнат уже не узнать
+        room_ids = set(ChatRoomParticipant.objects.filter(user=instance).values_list("room_id", flat=True))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        room_ids = (pk_set or set()) if reverse else {instance.pk}
+    else:
+        return
+    for room_id in room_ids:
+        transaction.on_commit(partial(invalidate_room_cache, room_id))
+
+
+@receiver(post_save, sender=ChatRoom)
+@receiver(post_delete, sender=ChatRoom)
+def room_changed(sender: type[ChatRoom], instance: ChatRoom, **kwargs: Any) -> None:
+    transaction.on_commit(partial(invalidate_room_cache, instance.pk))
@@ -0,0 +1,32 @@
+import logging
+
+from apps.messaging.bot import stream_bot_reply
+from apps.messaging.partitions import archive_old_partitions, ensure_partitions
+from apps.messaging.unread import flush_read_pointers
+from asgiref.sync import sync_to_async
+from config.taskiq_app import taskiq_broker
+
+logger = logging.getLogger(__name__)
+
+
+@taskiq_broker.task(schedule=[{"cron": "* * * * *"}])
+async def flush_chat_read_pointers():
+    """Запись указателей прочтения из Redis в ChatRoomParticipant."""
+    updated = await sync_to_async(flush_read_pointers)()
+    if updated:
+        logger.info("Chat read pointers flushed: %d", updated)
+
+
+@taskiq_broker.task
+async def bot_reply(room_id: str, prompt: str):
+    """Потоковый ответ бота на сообщение с префиксом CHAT_BOT_TRIGGER."""
+    await stream_bot_reply(room_id, prompt)
+
+
+@taskiq_broker.task(schedule=[{"cron": "30 2 * * *"}])
+async def maintain_chat_partitions():
+    """Создание будущих партиций ChatMessage и выгрузка старых в хранилище dbbackup."""
+    created = await sync_to_async(ensure_partitions)()
+    archived = await sync_to_async(archive_old_partitions)()
+    if created or archived:
+        logger.info("Chat partitions: created=%s archived=%s", created, archived)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import logging
+from typing import Iterable
+from uuid import UUID
+
+from apps.messaging.cache import room_member_ids
+from apps.messaging.models import ChatRoomParticipant
+from apps.messaging.replay import room_seq_key
+from config.async_redis import AsyncRedisClient
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Указатели прочтения, ещё не записанные в БД: поле "<room_id>:<user_id>" → seq
+READ_POINTERS_KEY = "chat:read:pending"
+READ_POINTERS_FLUSHING_KEY = "chat:read:flushing"
+
+# Прочитано до seq: счётчик = сообщения после указателя, указатель не откатывается назад.
+# Наибольший указатель хранится в KEYS[4] и переживает сброс отложенных в БД (KEYS[3]).
+MARK_READ_SCRIPT = """
+local read = tonumber(ARGV[3])
+local prev = tonumber(redis.call('HGET', KEYS[4], ARGV[1]) or '0')
+if read < prev then
+    read = prev
+end
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if read > current then
+    read = current
+end
+if read > prev then
+    redis.call('HSET', KEYS[4], ARGV[1], read)
+    redis.call('HSET', KEYS[3], ARGV[2], read)
+end
+local unread = current - read
+redis.call('HSET', KEYS[2], ARGV[1], unread)
+return unread
+"""
+
+
+def user_unread_key(user_id: int) -> str:
+    return f"chat:user:{user_id}:unread"
+
+
+def user_read_key(user_id: int) -> str:
+    return f"chat:user:{user_id}:read"
+
+
+def _pointer_field(room_id: UUID | str, user_id: int) -> str:
+    return f"{room_id}:{user_id}"
+
+
+def _mark_read_args(room_id: UUID | str, user_id: int, seq: int) -> tuple[list[str], list[str | int]]:
+    keys = [room_seq_key(room_id), user_unread_key(user_id), READ_POINTERS_KEY, user_read_key(user_id)]
+    return keys, [str(room_id), _pointer_field(room_id, user_id), seq]
+
+
+async def count_unread(room_id: UUID | str, seq: int, sender_id: int) -> None:
+    """
+    +1 к счётчику непрочитанного у всех участников, кроме отправителя, —
+    один конвейер на комнату. Отправитель прочитал комнату до своего сообщения.
+    """
+    member_ids = await room_member_ids(room_id)
+    redis = await AsyncRedisClient.initialize()
+    mark_read = redis.register_script(MARK_READ_SCRIPT)
+    room_field = str(room_id)
+    async with redis.pipeline(transaction=False) as pipe:
+        for member_id in member_ids:
+            if member_id != sender_id:
+                pipe.hincrby(user_unread_key(member_id), room_field, 1)  # pyright: ignore[reportGeneralTypeIssues]
+        keys, args = _mark_read_args(room_id, sender_id, seq)
+        await mark_read(keys=keys, args=args, client=pipe)
+        await pipe.execute()
+
+
+async def mark_read(room_id: UUID | str, user_id: int, seq: int) -> int:
+    """
+    Квитанция о прочтении до seq: сброс счётчика и отложенная запись указателя.
+
+    :return: сколько сообщений комнаты осталось непрочитанными.
+    """
+    redis = await AsyncRedisClient.initialize()
+    keys, args = _mark_read_args(room_id, user_id, seq)
+    return int(await redis.register_script(MARK_READ_SCRIPT)(keys=keys, args=args))
+
+
+def unread_counts(user_id: int, rooms: Iterable[tuple[UUID | str, int]]) -> dict[str, int]:
+    """
+    Счётчики непрочитанного для списка комнат пользователя (синхронно, для DRF).
+
+    Обычный случай — один HGETALL. Если счётчика нет (Redis очищен), он
+    восстанавливается как «номер последнего сообщения − указатель прочтения»
+    без обращения к ChatMessage.
+
+    :param rooms: пары (room_id, last_read_seq из БД).
+    """
+    redis = settings.REDIS_CLIENT
+    stored = {field.decode(): int(value) for field, value in redis.hgetall(user_unread_key(user_id)).items()}  # pyright: ignore[reportAttributeAccessIssue]
+    rooms = [(str(room_id), last_read_seq) for room_id, last_read_seq in rooms]
+    missing = [(room_id, last_read_seq) for room_id, last_read_seq in rooms if room_id not in stored]
+
+    if missing:
+        current = redis.mget([room_seq_key(room_id) for room_id, _ in missing])
+        restored = {
+            room_id: max(int(seq or 0) - last_read_seq, 0)
+            for (room_id, last_read_seq), seq in zip(missing, current)  # pyright: ignore[reportArgumentType]
+        }
+        redis.hset(user_unread_key(user_id), mapping=restored)  # pyright: ignore[reportArgumentType]
+        # указатели из БД — нижняя граница для поздних квитанций, если Redis их потерял
+        with redis.pipeline(transaction=False) as pipe:
+            for room_id, last_read_seq in missing:
+                pipe.hsetnx(user_read_key(user_id), room_id, last_read_seq)
+            pipe.execute()
+        stored.update(restored)
+
+    return {room_id: stored[room_id] for room_id, _ in rooms}
+
+
+def flush_read_pointers(batch_size: int = 1000) -> int:
+    """
+    Запись накопленных указателей прочтения в ChatRoomParticipant пачками.
+
+    Хеш атомарно переименовывается перед обработкой, так что новые квитанции
+    копятся в свежем ключе; если прошлый запуск упал, его остаток дописывается
+    первым. Указатель в БД только растёт.
+
+    :return: сколько участников обновлено.
+    """
+    redis = settings.REDIS_CLIENT
+    if not redis.exists(READ_POINTERS_FLUSHING_KEY):
+        if not redis.exists(READ_POINTERS_KEY):
+            return 0
+        redis.rename(READ_POINTERS_KEY, READ_POINTERS_FLUSHING_KEY)
+
+    pointers: dict[tuple[str, int], int] = {}
+    for field, value in redis.hgetall(READ_POINTERS_FLUSHING_KEY).items():  # pyright: ignore[reportAttributeAccessIssue]
+        room_id, user_id = field.decode().rsplit(":", 1)
+        pointers[(room_id, int(user_id))] = int(value)
+
+    updated = 0
+    items = list(pointers.items())
+    for start in range(0, len(items), batch_size):
+        chunk = dict(items[start:start + batch_size])
+        participants = ChatRoomParticipant.objects.filter(
+            room_id__in={room_id for room_id, _ in chunk},
+            user_id__in={user_id for _, user_id in chunk},
+        ).only("id", "room_id", "user_id", "last_read_seq")
+
+        changed = []
+        for participant in participants:
+            seq = chunk.get((str(participant.room_id), participant.user_id))
+            if seq is not None and seq > participant.last_read_seq:
+                participant.last_read_seq = seq
+                changed.append(participant)
+        ChatRoomParticipant.objects.bulk_update(changed, ["last_read_seq"])
+        updated += len(changed)
+
+    redis.delete(READ_POINTERS_FLUSHING_KEY)
+    logger.debug("Flushed %d chat read pointers", updated)
+    return updated
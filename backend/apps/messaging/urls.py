@@ -0,0 +1,11 @@
+from django.urls import path
+
+from .views import ChatHistoryAPIView, ChatInboxAPIView, ChatMetricsAPIView, ChatPrivateRoomAPIView, ChatSearchAPIView
+
+urlpatterns = [
+    path("chat/rooms/", ChatInboxAPIView.as_view(), name="chat-inbox"),
+    path("chat/rooms/private/", ChatPrivateRoomAPIView.as_view(), name="chat-private-room"),
+    path("chat/rooms/<uuid:room_id>/messages/", ChatHistoryAPIView.as_view(), name="chat-room-messages"),
+    path("chat/search/", ChatSearchAPIView.as_view(), name="chat-search"),
+    path("chat/metrics/", ChatMetricsAPIView.as_view(), name="chat-metrics"),
+]
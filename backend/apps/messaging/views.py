@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+from typing import Any, cast
+from uuid import UUID
+
+from apps.messaging.cache import is_room_member_sync
+from apps.messaging.metrics import send_queue_metrics
+from apps.messaging.models import ChatMessage, ChatRoom, ChatRoomParticipant
+from apps.messaging.search import search_messages, search_supported
+from apps.messaging.services import get_or_create_private_room
+from apps.messaging.unread import unread_counts
+from apps.utils.pagination import keyset_filter
+from django.contrib.auth import get_user_model
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .serializers import (
+    ChatHistoryQuerySerializer,
+    ChatInboxQuerySerializer,
+    ChatInboxRoomSerializer,
+    ChatMessageSerializer,
+    ChatPrivateRoomSerializer,
+    ChatSearchQuerySerializer,
+    ChatSearchResultSerializer,
+)
+
+User = get_user_model()
+
+HISTORY_FIELDS = ("id", "seq", "created_at", "text", "sender_id", "sender__display_name")
+INBOX_FIELDS = (
+    "id",
+    "type",
+    "name",
+    "last_message_at",
+    "last_message_preview",
+    "last_sender_id",
+    "last_sender__display_name",
+    "memberships__last_read_seq",
+)
+SEARCH_FIELDS = ("id", "room_id", "seq", "created_at", "sender_id", "sender__display_name", "snippet")
+
+
+class ChatHistoryAPIView(APIView):
+    """
+    GET /api/chat/rooms/<room_id>/messages/?before=<id>|after=<id>&limit=50
+
+    История комнаты с keyset-пагинацией по (created_at, id):
+    - без курсора — последние limit сообщений,
+    - before — более старые, чем указанное сообщение,
+    - after — более новые.
+
+    Сообщения всегда в хронологическом порядке; has_more — есть ли ещё в выбранную сторону.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, room_id: UUID, *args: Any, **kwargs: Any) -> Response:
+        query = ChatHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = cast(dict[str, Any], query.validated_data)
+
+        is_member = is_room_member_sync(room_id, request.user.pk)
+        if is_member is None:
+            return Response({"detail": "Комната не найдена."}, status=status.HTTP_404_NOT_FOUND)
+        if not is_member:
+            return Response({"detail": "Вы не участник этой комнаты."}, status=status.HTTP_403_FORBIDDEN)
+
+        queryset = ChatMessage.objects.filter(room_id=room_id)
+        limit = params["limit"]
+        cursor_id = params.get("before") or params.get("after")
+
+        cursor: tuple[Any, int] | None = None
+        if cursor_id:
+            cursor = queryset.filter(pk=cursor_id).values_list("created_at", "id").first()
+            if cursor is None:
+                return Response({"detail": "Сообщение-курсор не найдено."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if cursor and params.get("after"):
+            queryset = keyset_filter(queryset, ("created_at", "id"), cursor, ">").order_by("created_at", "id")
+        else:
+            if cursor:
+                queryset = keyset_filter(queryset, ("created_at", "id"), cursor, "<")
+            queryset = queryset.order_by("-created_at", "-id")
+
+        rows = list(queryset.values(*HISTORY_FIELDS)[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not params.get("after"):
+            rows.reverse()
+
+        return Response(
+            {
+                "results": ChatMessageSerializer(rows, many=True).data,
+                "has_more": has_more,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class ChatInboxAPIView(APIView):
+    """
+    GET /api/chat/rooms/?before=<room_id>&limit=30
+
+    Комнаты пользователя, новые сверху, с keyset-пагинацией по
+    (last_message_at, id). Снимок последнего сообщения денормализован в ChatRoom,
+    поэтому страница — один индексный запрос без подзапросов к ChatMessage;
+    счётчики непрочитанного — из Redis одним HGETALL.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args: Any, **kwargs: Any) -> Response:
+        query = ChatInboxQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = cast(dict[str, Any], query.validated_data)
+
+        queryset = ChatRoom.objects.filter(memberships__user=request.user)
+        limit = params["limit"]
+
+        if params.get("before"):
+            cursor = queryset.filter(pk=params["before"]).values_list("last_message_at", "id").first()
+            if cursor is None:
+                return Response({"detail": "Комната-курсор не найдена."}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = keyset_filter(queryset, ("last_message_at", "id"), cursor, "<")
+
+        rows = list(queryset.order_by("-last_message_at", "-id").values(*INBOX_FIELDS)[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        unread = unread_counts(request.user.pk, [(row["id"], row["memberships__last_read_seq"]) for row in rows])
+        for row in rows:
+            row["unread"] = unread[str(row["id"])]
+
+        return Response(
+            {
+                "results": ChatInboxRoomSerializer(rows, many=True).data,
+                "has_more": has_more,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class ChatSearchAPIView(APIView):
+    """
+    GET /api/chat/search/?q=<запрос>&room=<room_id>&before=<id>&limit=20
+
+    Полнотекстовый поиск по сообщениям комнат пользователя (или одной комнаты):
+    tsvector + GIN-индекс PostgreSQL, русская и английская морфология,
+    подсветка совпадений в snippet. Новые сверху, keyset-пагинация по
+    (created_at, id) через before. На других СУБД — 501, без ILIKE по всей таблице.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args: Any, **kwargs: Any) -> Response:
+        if not search_supported():
+            return Response({"detail": "Поиск по сообщениям недоступен."}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        query = ChatSearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = cast(dict[str, Any], query.validated_data)
+
+        if params.get("room"):
+            is_member = is_room_member_sync(params["room"], request.user.pk)
+            if is_member is None:
+                return Response({"detail": "Комната не найдена."}, status=status.HTTP_404_NOT_FOUND)
+            if not is_member:
+                return Response({"detail": "Вы не участник этой комнаты."}, status=status.HTTP_403_FORBIDDEN)
+            queryset = ChatMessage.objects.filter(room_id=params["room"])
+        else:
+            rooms = ChatRoomParticipant.objects.filter(user=request.user).values("room_id")
+            queryset = ChatMessage.objects.filter(room_id__in=rooms)
+
+        limit = params["limit"]
+        if params.get("before"):
+            cursor = queryset.filter(pk=params["before"]).values_list("created_at", "id").first()
+            if cursor is None:
+                return Response({"detail": "Сообщение-курсор не найдено."}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = keyset_filter(queryset, ("created_at", "id"), cursor, "<")
+
+        found = search_messages(queryset, params["q"]).order_by("-created_at", "-id")
+        rows = list(found.values(*SEARCH_FIELDS)[:limit + 1])
+        has_more = len(rows) > limit
+
+        return Response(
+            {
+                "results": ChatSearchResultSerializer(rows[:limit], many=True).data,
+                "has_more": has_more,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class ChatPrivateRoomAPIView(APIView):
+    """
+    POST /api/chat/rooms/private/ {"user_id": <id>}
+
+    Личный чат с пользователем: существующий (200) или новый (201).
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args: Any, **kwargs: Any) -> Response:
+        serializer = ChatPrivateRoomSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        other_id = cast(dict[str, Any], serializer.validated_data)["user_id"]
+
+        if other_id == request.user.pk:
+            return Response({"detail": "Нельзя открыть личный чат с самим собой."}, status=status.HTTP_400_BAD_REQUEST)
+        if not User.objects.filter(pk=other_id, is_active=True).exists():
+            return Response({"detail": "Пользователь не найден."}, status=status.HTTP_404_NOT_FOUND)
+
+        room, created = get_or_create_private_room(request.user.pk, other_id)
+        return Response(
+            {"id": room.pk, "created": created},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class ChatMetricsAPIView(APIView):
+    """
+    GET /api/chat/metrics/
+
+    Метрики исходящих очередей сокетов этого воркера: соединения, отправленные
+    и выброшенные кадры, закрытые медленные клиенты, перцентили глубины очереди.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args: Any, **kwargs: Any) -> Response:
+        return Response(send_queue_metrics.snapshot(), status=status.HTTP_200_OK)
@@ -1,3 +1,4 @@
+from apps.utils.admin import LargeTableAdmin
 from django.contrib import admin
 
 from .models import Place, PlaceMedia
@@ -9,14 +10,17 @@ class PlaceMediaInline(admin.TabularInline):
 
 
 @admin.register(Place)
-class PlaceAdmin(admin.ModelAdmin):
+class PlaceAdmin(LargeTableAdmin):
     list_display = ("name", "place_type", "country", "region", "is_active", "created_at")
     list_filter = ("place_type", "country", "region", "is_active")
     search_fields = ("name", "description", "country", "region", "city")
+    autocomplete_fields = ("created_by",)
     inlines = [PlaceMediaInline]
 
 
 @admin.register(PlaceMedia)
-class PlaceMediaAdmin(admin.ModelAdmin):
+class PlaceMediaAdmin(LargeTableAdmin):
     list_display = ("place", "media_type", "order", "uploaded_at")
     list_filter = ("media_type",)
+    list_select_related = ("place",)
+    autocomplete_fields = ("place",)
@@ -1,3 +1,4 @@
+from apps.utils.admin import LargeTableAdmin
 from django.contrib import admin
 
 from .models import Review, ReviewMedia
@@ -10,13 +11,17 @@ class ReviewMediaInline(admin.TabularInline):
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(LargeTableAdmin):
     list_display = ("place", "author", "rating", "is_hidden", "created_at")
     list_filter = ("rating", "is_hidden", "created_at")
     search_fields = ("place__name", "author__email", "text")
+    list_select_related = ("place", "author")
+    autocomplete_fields = ("place", "author")
     inlines = [ReviewMediaInline]
 
 
 @admin.register(ReviewMedia)
-class ReviewMediaAdmin(admin.ModelAdmin):
+class ReviewMediaAdmin(LargeTableAdmin):
     list_display = ("review", "uploaded_at")
+    list_select_related = ("review__place",)
+    autocomplete_fields = ("review",)
@@ -1,16 +1,24 @@
+from apps.utils.admin import LargeTableAdmin
 from django.contrib import admin
 
 from .models import Activity, Follow
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ("follower", "target", "created_at")
     search_fields = ("follower__email", "target__email")
+    list_select_related = ("follower", "target")
+    autocomplete_fields = ("follower", "target")
 
 
 @admin.register(Activity)
-class ActivityAdmin(admin.ModelAdmin):
+class ActivityAdmin(LargeTableAdmin):
     list_display = ("actor", "verb", "created_at", "target")
     list_filter = ("verb", "created_at")
     search_fields = ("actor__email",)
+    list_select_related = ("actor", "content_type")
+    autocomplete_fields = ("actor",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("target")
@@ -1,3 +1,4 @@
+from apps.utils.admin import AutocompleteFilter, LargeTableAdmin
 from django.contrib import admin
 
 from .models import Trip, TripPoint
@@ -7,18 +8,23 @@ class TripPointInline(admin.TabularInline):
     model = TripPoint
     extra = 1
     fields = ("order", "latitude", "longitude", "place", "note")
+    autocomplete_fields = ("place",)
 
 
 @admin.register(Trip)
-class TripAdmin(admin.ModelAdmin):
+class TripAdmin(LargeTableAdmin):
     list_display = ("title", "owner", "is_public", "is_hidden", "created_at")
     list_filter = ("is_public", "is_hidden", "created_at")
     search_fields = ("title", "short_description", "description", "owner__email")
+    list_select_related = ("owner",)
+    autocomplete_fields = ("owner", "source_trip")
     inlines = [TripPointInline]
 
 
 @admin.register(TripPoint)
-class TripPointAdmin(admin.ModelAdmin):
+class TripPointAdmin(LargeTableAdmin):
     list_display = ("trip", "order", "place", "latitude", "longitude")
-    list_filter = ("trip",)
+    list_filter = (("trip", AutocompleteFilter),)
     search_fields = ("trip__title", "note")
+    list_select_related = ("trip", "place")
+    autocomplete_fields = ("trip", "place")
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import Any
+
+from apps.users.cache import claims_user, get_user
+from apps.users.tokens import token_user_id, token_version
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.tokens import Token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без SELECT пользователя на каждый запрос.
+
+    request.user — User только с полями снимка (id, email, display_name,
+    is_active, is_staff, token_version) из свежих клеймов входа или из
+    LRU процесса → Redis → БД (apps.users.cache). Обращение к другому полю
+    догрузит его отдельным запросом — за профилем идите в БД явно.
+    """
+
+    def get_user(self, validated_token: Token) -> Any:  # pyright: ignore[reportIncompatibleMethodOverride]
+        try:
+            user_id = token_user_id(validated_token)
+        except (KeyError, ValueError) as exc:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from exc
+
+        user = claims_user(validated_token) or get_user(user_id, token_version(validated_token))
+        if user is None:
+            # нет пользователя, неактивен или токены отозваны через User.revoke_tokens()
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        return user
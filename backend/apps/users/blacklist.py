@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from typing import Iterable
+
+from django.apps import apps
+from django.conf import settings
+
+TOKEN_BLACKLIST_APP = "rest_framework_simplejwt.token_blacklist"
+
+
+def blacklist_key(jti: str) -> str:
+    return f"auth:jwt:blacklist:{jti}"
+
+
+def _ttl(exp: int | float) -> int:
+    return int(exp - time.time())
+
+
+def blacklist_jti(jti: str, exp: int | float) -> bool:
+    """
+    Отзыв refresh-токена по jti до его истечения: ключ живёт ровно
+    оставшееся время жизни токена, после него запись не нужна.
+
+    :return: False, если jti уже был в чёрном списке (SET NX) — одним токеном
+        нельзя провернуть ротацию дважды, даже конкурентно.
+    """
+    ttl = _ttl(exp)
+    if ttl <= 0:
+        return True
+    return bool(settings.REDIS_CLIENT.set(blacklist_key(jti), 1, ex=ttl, nx=True))
+
+
+def is_blacklisted(jti: str) -> bool:
+    """
+    jti отозван: в Redis или, пока включён AUTH_JWT_BLACKLIST_DB_FALLBACK,
+    в таблицах token_blacklist — до переноса командой import_jwt_blacklist
+    там лежат токены, отозванные до перехода на Redis. После переноса
+    настройку выключают, и проверка сводится к одному EXISTS.
+    """
+    if settings.REDIS_CLIENT.exists(blacklist_key(jti)):
+        return True
+    if not settings.AUTH_JWT_BLACKLIST_DB_FALLBACK or not apps.is_installed(TOKEN_BLACKLIST_APP):
+        return False
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def import_blacklist(entries: Iterable[tuple[str, datetime]], batch_size: int = 1000) -> int:
+    """
+    Перенос отозванных jti (jti, expires_at) в Redis пачками по batch_size.
+
+    :return: сколько ещё не истёкших jti записано.
+    """
+    imported = 0
+    pipe = settings.REDIS_CLIENT.pipeline(transaction=False)
+    for jti, expires_at in entries:
+        ttl = _ttl(expires_at.timestamp())
+        if ttl <= 0:
+            continue
+        pipe.set(blacklist_key(jti), 1, ex=ttl)
+        imported += 1
+        if imported % batch_size == 0:
+            pipe.execute()
+    pipe.execute()
+    return imported
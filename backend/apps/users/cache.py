@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from apps.users.tokens import PROFILE_CLAIMS, token_user_id, token_version
+from channels.db import database_sync_to_async
+from config.async_redis import AsyncRedisClient
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.tokens import Token
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Поля снимка пользователя: всё, что нужно для авторизации без строки из БД
+SNAPSHOT_FIELDS = ("id", "email", "display_name", "is_active", "is_staff", "token_version")
+
+_MISSING = object()
+
+
+class LocalSnapshotCache:
+    """
+    LRU снимков в памяти процесса перед Redis: попадание — без сети.
+
+    Запись живёт ttl секунд: сохранение User сбрасывает запись только в своём
+    процессе, другие воркеры увидят изменение не позже чем через ttl.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[int, int], tuple[float, dict[str, Any] | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[int, int]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, snapshot = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def set(self, key: tuple[int, int], snapshot: dict[str, Any] | None) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: tuple[int, int]) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+local_snapshots = LocalSnapshotCache(settings.AUTH_USER_LOCAL_CACHE_SIZE, settings.AUTH_USER_LOCAL_CACHE_TTL)
+
+
+def user_cache_key(user_id: int, version: int) -> str:
+    return f"auth:user:{user_id}:v{version}"
+
+
+def user_generation_key(user_id: int) -> str:
+    return f"auth:user:{user_id}:gen"
+
+
+# Запись снимка, только если с чтения поколения до записи не было forget_user:
+# иначе загрузка, начавшаяся до коммита (например, деактивации), вернула бы
+# устаревший снимок на весь AUTH_USER_CACHE_TTL
+FILL_USER_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+# Сброс: сдвиг поколения и удаление снимка одной операцией
+FORGET_USER_SCRIPT = """
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return redis.call('DEL', KEYS[2])
+"""
+
+
+def _user_keys(user_id: int, version: int) -> list[str]:
+    return [user_generation_key(user_id), user_cache_key(user_id, version)]
+
+
+def _fill_args(generation: Any, snapshot: dict[str, Any] | None) -> list[Any]:
+    return [generation or "0", json.dumps(snapshot), settings.AUTH_USER_CACHE_TTL]
+
+
+def _load_snapshot(user_id: int) -> dict[str, Any] | None:
+    return User.objects.filter(pk=user_id).values(*SNAPSHOT_FIELDS).first()
+
+
+def user_from_snapshot(snapshot: dict[str, Any]) -> Any:
+    """
+    Экземпляр User только с полями снимка (остальные отложены, как после .only()).
+    """
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in snapshot]
+    return User.from_db(DEFAULT_DB_ALIAS, fields, [snapshot[field] for field in fields])
+
+
+def _accepted(snapshot: dict[str, Any] | None, version: int) -> Any | None:
+    if not snapshot or not snapshot["is_active"] or snapshot["token_version"] != version:
+        return None
+    return user_from_snapshot(snapshot)
+
+
+def claims_user(token: Token) -> Any | None:
+    """
+    User из клеймов access-токена, выданного при входе по коду (VerifyCodeAPIView).
+
+    Клеймы замораживают профиль на всё время жизни токена, поэтому им верим,
+    только пока токен не старше AUTH_USER_LOCAL_CACHE_TTL — не дольше, чем
+    LRU другого воркера может отдавать снимок после сохранения User.
+    Токены из refresh этих клеймов не несут и идут через кеш.
+    """
+    if any(claim not in token for claim in PROFILE_CLAIMS) or "iat" not in token:
+        return None
+    if time.time() - token["iat"] > settings.AUTH_USER_LOCAL_CACHE_TTL:
+        return None
+    return user_from_snapshot(
+        {
+            "id": token_user_id(token),
+            "email": token["email"],
+            "display_name": token["display_name"],
+            "is_active": True,
+            "is_staff": token["is_staff"],
+            "token_version": token_version(token),
+        }
+    )
+
+
+def get_user(user_id: int, version: int) -> Any | None:
+    """
+    Пользователь по id и версии токенов из JWT: LRU процесса → Redis → БД.
+
+    Снимок живёт в Redis AUTH_USER_CACHE_TTL секунд под ключом с версией.
+    Кешируется и отказ (нет пользователя, неактивен, версия отозвана), чтобы
+    перебор старым токеном тоже не доходил до БД. Поколение читается вместе
+    со снимком, до запроса в БД: если за это время снимок сбросили, результат
+    не записывается ни в Redis, ни в LRU.
+
+    :return: User с полями SNAPSHOT_FIELDS или None.
+    """
+    snapshot = local_snapshots.get((user_id, version))
+    if snapshot is _MISSING:
+        redis = settings.REDIS_CLIENT
+        keys = _user_keys(user_id, version)
+        generation, raw = redis.mget(keys)
+        if raw is not None:
+            snapshot = json.loads(raw)
+        else:
+            snapshot = _load_snapshot(user_id)
+            if not redis.register_script(FILL_USER_SCRIPT)(keys=keys, args=_fill_args(generation, snapshot)):
+                return _accepted(snapshot, version)
+        local_snapshots.set((user_id, version), snapshot)
+    return _accepted(snapshot, version)
+
+
+async def aget_user(user_id: int, version: int) -> Any | None:
+    """
+    То же, что get_user, для event loop (аутентификация сокетов).
+    """
+    snapshot = local_snapshots.get((user_id, version))
+    if snapshot is _MISSING:
+        redis = await AsyncRedisClient.initialize()
+        keys = _user_keys(user_id, version)
+        generation, raw = await redis.mget(keys)
+        if raw is not None:
+            snapshot = json.loads(raw)
+        else:
+            snapshot = await database_sync_to_async(_load_snapshot)(user_id)
+            if not await redis.register_script(FILL_USER_SCRIPT)(keys=keys, args=_fill_args(generation, snapshot)):
+                return _accepted(snapshot, version)
+        local_snapshots.set((user_id, version), snapshot)
+    return _accepted(snapshot, version)
+
+
+def forget_user(user_id: int, version: int) -> None:
+    """
+    Сброс снимка (синхронно — вызывается из сигналов ORM после коммита).
+    """
+    local_snapshots.pop((user_id, version))
+    try:
+        # поколение живёт дольше снимка: загрузка, прочитавшая его до сдвига, не запишет старое
+        settings.REDIS_CLIENT.register_script(FORGET_USER_SCRIPT)(
+            keys=_user_keys(user_id, version), args=[settings.AUTH_USER_CACHE_TTL * 2]
+        )
+    except Exception:
+        logger.exception("Failed to invalidate user snapshot for %s", user_id)
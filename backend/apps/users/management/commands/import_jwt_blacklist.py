@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Any
+
+from apps.users.blacklist import import_blacklist
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит отозванные и ещё не истёкшие refresh-токены из таблиц token_blacklist "
+        "в чёрный список Redis. Запускать после выкладки Redis-списка; повторный запуск безопасен."
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--purge",
+            action="store_true",
+            help="После переноса удалить строки OutstandingToken (BlacklistedToken — каскадом).",
+        )
+
+    def handle(self, *args: Any, batch_size: int, purge: bool, **options: Any) -> None:
+        entries = (
+            BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+            .values_list("token__jti", "token__expires_at")
+            .iterator(chunk_size=batch_size)
+        )
+        imported = import_blacklist(entries, batch_size=batch_size)
+        self.stdout.write(f"В Redis перенесено отозванных токенов: {imported}")
+        self.stdout.write("Проверку таблиц при refresh можно выключить: AUTH_JWT_BLACKLIST_DB_FALLBACK=0")
+
+        if purge:
+            deleted = 0
+            # пачками: на больших таблицах один DELETE с каскадом держит блокировки слишком долго
+            while pks := list(OutstandingToken.objects.order_by("pk").values_list("pk", flat=True)[:batch_size]):
+                count, _ = OutstandingToken.objects.filter(pk__in=pks).delete()
+                deleted += count
+            self.stdout.write(f"Удалено строк token_blacklist: {deleted}")
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Any
+from urllib.parse import parse_qs
+
+from apps.users.cache import aget_user, claims_user
+from apps.users.tokens import token_user_id, token_version
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+def _raw_token(scope: dict[str, Any]) -> str | None:
+    """
+    Access-токен из заголовка Authorization: Bearer <token> или, для браузеров
+    (WebSocket API не даёт задать заголовки), из ?token=<token>.
+    """
+    for name, value in scope.get("headers") or ():
+        if name == b"authorization":
+            parts = value.decode("latin1").split()
+            if len(parts) == 2 and parts[0] in api_settings.AUTH_HEADER_TYPES:
+                return parts[1]
+            return None
+    values = parse_qs(scope.get("query_string", b"").decode("latin1")).get("token")
+    return values[0] if values else None
+
+
+async def get_jwt_user(scope: dict[str, Any]) -> Any:
+    raw = _raw_token(scope)
+    if raw is None:
+        return AnonymousUser()
+    try:
+        # подпись и срок проверяются локально, без БД
+        token = AccessToken(raw)  # pyright: ignore[reportArgumentType]
+        user_id = token_user_id(token)
+    except (TokenError, KeyError, ValueError):
+        return AnonymousUser()
+    return claims_user(token) or await aget_user(user_id, token_version(token)) or AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Аутентификация сокетов по access-токену simplejwt вместо сессии:
+    scope["user"] — User с полями снимка из apps.users.cache или AnonymousUser.
+    """
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        scope["user"] = await get_jwt_user(scope)
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    return JWTAuthMiddleware(inner)
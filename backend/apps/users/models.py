@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+from functools import partial
 from typing import Any
 
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.validators import FileExtensionValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
 
@@ -128,6 +129,11 @@ class User(AbstractUser):
         default=False,
         help_text=_("Отмечается после подтверждения email по коду или ссылке."),
     )
+    token_version = models.PositiveIntegerField(
+        _("Версия токенов"),
+        default=0,
+        help_text=_("Входит в JWT; увеличение отзывает все выданные пользователю токены."),
+    )
 
     objects: CustomUserManager = CustomUserManager()  # type: ignore[assignment]
 
@@ -140,3 +146,15 @@ class User(AbstractUser):
 
     def __str__(self) -> str:
         return self.display_name or self.email
+
+    def revoke_tokens(self) -> None:
+        """
+        Отзыв всех JWT пользователя (выход на всех устройствах): токены
+        с прежней версией перестают приниматься, снимок в кеше удаляется.
+        """
+        from apps.users.cache import forget_user
+
+        previous = self.token_version
+        type(self).objects.filter(pk=self.pk).update(token_version=models.F("token_version") + 1)
+        self.refresh_from_db(fields=["token_version"])
+        transaction.on_commit(partial(forget_user, self.pk, previous))
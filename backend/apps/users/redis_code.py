@@ -3,8 +3,10 @@ from __future__ import annotations
 import random
 from typing import Optional
 
+from apps.utils.ratelimit import AsyncRateLimiter, RateLimiter, RateLimitResult, SlidingWindow, get_async_rate_limiter
 from django.conf import settings
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 
 
 class CodeManager:
@@ -16,6 +18,7 @@ class CodeManager:
 
     def __init__(self) -> None:
         self.redis: Redis = settings.REDIS_CLIENT
+        self.limiter = RateLimiter(self.redis)
 
     def generate_code(self) -> str:
         """
@@ -64,26 +67,16 @@ class CodeManager:
         """
         Проверка ограничения по IP с учетом количества попыток.
 
+        Скользящее окно: не больше max_attempts попыток за последние
+        limit_seconds; проверка и учёт попытки — один атомарный вызов Lua.
+
         :param ip_key: Ключ для IP в Redis.
-        :param limit_seconds: Время блокировки в секундах (по умолчанию 5 минут).
+        :param limit_seconds: Длина окна в секундах (по умолчанию 5 минут).
         :param max_attempts: Максимальное количество попыток (по умолчанию 1).
         :return: True, если ограничение активно, иначе False.
         """
-        attempts = self.redis.incr(ip_key)
-
-        if attempts > max_attempts:  # pyright: ignore[reportOperatorIssue]
-            ttl = self.redis.ttl(ip_key)
-            # ttl:
-            #  -1 — нет времени жизни
-            #  -2 — ключ не существует
-            if ttl == -1:
-                self.redis.expire(ip_key, limit_seconds)
-            return True
-
-        if attempts == 1:
-            self.redis.expire(ip_key, limit_seconds)
-
-        return False
+        limit = SlidingWindow(limit=max_attempts, window=limit_seconds)
+        return not self.limiter.hit(ip_key, limit).allowed
 
     def verify_code(self, key: str, code: str) -> bool:
         """
@@ -98,3 +91,70 @@ class CodeManager:
             self.delete_code(key)
             return True
         return False
+
+
+class AsyncCodeManager:
+    """
+    Менеджер одноразовых кодов для async-view поверх AsyncRedisClient:
+    те же ключи и лимиты, что у CodeManager, без ухода в пул потоков.
+
+    Клиент создан с decode_responses=True — значения приходят строками.
+    """
+
+    generate_code = CodeManager.generate_code
+
+    def __init__(self, redis: AsyncRedis, limiter: AsyncRateLimiter) -> None:
+        self.redis = redis
+        self.limiter = limiter
+
+    @classmethod
+    async def create(cls) -> AsyncCodeManager:
+        limiter = await get_async_rate_limiter()
+        return cls(limiter.redis, limiter)
+
+    async def set_code(self, key: str, code: str, expiry: int = 300) -> None:
+        await self.redis.set(key, code, ex=expiry)
+
+    async def get_code(self, key: str) -> Optional[str]:
+        return await self.redis.get(key)
+
+    async def delete_code(self, key: str) -> None:
+        await self.redis.delete(key)
+
+    async def is_request_limited(
+        self,
+        ip_key: str,
+        limit_seconds: int = 300,
+        max_attempts: int = 1,
+    ) -> bool:
+        """
+        То же скользящее окно, что у CodeManager.is_request_limited.
+        """
+        limit = SlidingWindow(limit=max_attempts, window=limit_seconds)
+        return not (await self.limiter.hit(ip_key, limit)).allowed
+
+    async def verify_code_limited(
+        self,
+        ip_key: str,
+        key: str,
+        code: str,
+        limit_seconds: int = 300,
+        max_attempts: int = 5,
+    ) -> tuple[bool, bool]:
+        """
+        Учёт попытки и проверка кода за один обмен с Redis: скрипт лимитера
+        и GET кода идут одним pipeline. Верный код гасится DEL — из параллельных
+        попыток с одним кодом успешна только та, что его удалила.
+
+        :return: (лимит превышен, код верный).
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            await self.limiter.queue_hit(pipe, ip_key, SlidingWindow(limit=max_attempts, window=limit_seconds))
+            pipe.get(key)
+            reply, stored = await pipe.execute()
+
+        if not RateLimitResult.from_reply(reply).allowed:
+            return True, False
+        if not stored or stored != code:
+            return False, False
+        return False, bool(await self.redis.delete(key))
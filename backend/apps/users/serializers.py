@@ -1,4 +1,13 @@
+from __future__ import annotations
+
+from typing import Any
+
+from apps.users.cache import get_user
+from apps.users.tokens import VersionedRefreshToken, token_user_id, token_version
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.settings import api_settings
 
 
 class RequestCodeSerializer(serializers.Serializer):
@@ -8,3 +17,39 @@ class RequestCodeSerializer(serializers.Serializer):
 class VerifyCodeSerializer(serializers.Serializer):
     email = serializers.EmailField()
     code = serializers.CharField(max_length=6)
+
+
+class TokenRefreshSerializer(serializers.Serializer):
+    """
+    Обмен refresh на access (и новый refresh при ротации) без таблиц
+    token_blacklist: пользователь — из снимка apps.users.cache, отзыв
+    старого refresh — jti в Redis.
+    """
+
+    refresh = serializers.CharField()
+    access = serializers.CharField(read_only=True)
+
+    default_error_messages = {"no_active_account": _("No active account found for the given token.")}
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, str]:
+        refresh = VersionedRefreshToken(attrs["refresh"])
+        try:
+            user_id = token_user_id(refresh)
+        except (KeyError, ValueError) as exc:
+            raise TokenError(_("Token contained no recognizable user identification")) from exc
+
+        # неактивный пользователь и отозванная версия токенов — как отсутствующий
+        if get_user(user_id, token_version(refresh)) is None:
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and not refresh.blacklist():
+                raise TokenError(_("Token is blacklisted"))
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+
+        return data
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from functools import partial
+from typing import Any
+
+from apps.users.cache import forget_user
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender: Any, instance: Any, **kwargs: Any) -> None:
+    """
+    Снимок для JWT-аутентификации перечитывается после изменения пользователя.
+    """
+    transaction.on_commit(partial(forget_user, instance.pk, instance.token_version))
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from typing import Any
+
+from apps.users.blacklist import blacklist_jti, is_blacklisted
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken, Token
+
+# Клейм с User.token_version; refresh копирует его в каждый выпущенный access
+TOKEN_VERSION_CLAIM = "ver"
+# Профиль в access-токене, выданном при входе (см. apps.users.cache.claims_user)
+PROFILE_CLAIMS = ("email", "display_name", "is_staff")
+
+
+class VersionedRefreshToken(RefreshToken):
+    """
+    Refresh-токен с версией токенов пользователя: после User.revoke_tokens()
+    он и выпущенные из него access-токены перестают приниматься.
+
+    Чёрный список — jti в Redis (apps.users.blacklist) вместо таблиц
+    token_blacklist: выпуск токена ничего не пишет, отзыв — один SET.
+    Таблицы лишь читаются при проверке, пока не перенесены в Redis.
+    Методы BlacklistMixin с записью в таблицы здесь обходятся.
+    """
+
+    @classmethod
+    def for_user(cls, user: Any) -> "VersionedRefreshToken":  # pyright: ignore[reportIncompatibleMethodOverride]
+        token = super(BlacklistMixin, cls).for_user(user)  # без OutstandingToken
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token  # pyright: ignore[reportReturnType]
+
+    def verify(self, *args: Any, **kwargs: Any) -> None:
+        self.check_blacklist()
+        super(BlacklistMixin, self).verify(*args, **kwargs)
+
+    def check_blacklist(self) -> None:
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self) -> bool:  # pyright: ignore[reportIncompatibleMethodOverride]
+        """
+        :return: False, если токен уже отозван (например, параллельной ротацией).
+        """
+        return blacklist_jti(self.payload[api_settings.JTI_CLAIM], self.payload["exp"])
+
+    def outstand(self) -> None:  # pyright: ignore[reportIncompatibleMethodOverride]
+        return None
+
+
+def add_profile_claims(token: Token, user: Any) -> None:
+    token["email"] = user.email
+    token["display_name"] = getattr(user, "display_name", "") or user.email
+    token["is_staff"] = user.is_staff
+
+
+def token_user_id(token: Token) -> int:
+    return int(token[api_settings.USER_ID_CLAIM])
+
+
+def token_version(token: Token) -> int:
+    # токены, выпущенные до появления клейма, считаются версией 0
+    return int(token.get(TOKEN_VERSION_CLAIM, 0))
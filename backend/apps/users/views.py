@@ -2,33 +2,35 @@ from __future__ import annotations
 
 from typing import Any, cast
 
-from apps.users.redis_code import CodeManager
+from apps.users.redis_code import AsyncCodeManager
+from apps.users.tokens import VersionedRefreshToken, add_profile_claims
 from apps.users.utils import send_activation_email
 from apps.utils.utilities import get_client_ip
+from apps.utils.views import AsyncAPIView
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from rest_framework import permissions, status
+from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from .serializers import RequestCodeSerializer, VerifyCodeSerializer
 
 User = get_user_model()
 
 
-class RequestCodeAPIView(APIView):
+class RequestCodeAPIView(AsyncAPIView):
     """
     POST /api/auth/request-code/
 
     { "email": "user@example.com" }
 
     Отправляет одноразовый код на email с учётом лимитов по IP.
+    Async-view: Redis и постановка письма в taskiq — без пула потоков.
     """
 
-    permission_classes = [permissions.AllowAny]
+    serializer_class = RequestCodeSerializer
 
-    def post(self, request, *args: Any, **kwargs: Any) -> Response:
+    async def post(self, request, *args: Any, **kwargs: Any) -> Response:
         serializer: RequestCodeSerializer = RequestCodeSerializer(data=request.data)  # pyright: ignore[reportAssignmentType]
         serializer.is_valid(raise_exception=True)
 
@@ -43,23 +45,23 @@ class RequestCodeAPIView(APIView):
             )
 
         email = email_raw.lower()
-        code_manager = CodeManager()
+        code_manager = await AsyncCodeManager.create()
 
         ip = get_client_ip(request) or "unknown"
         ip_key = f"request_code_ip:{ip}"
         redis_key = f"login_code:{email}"
 
         # Лимит: не более 3 запросов кода за 5 минут с одного IP
-        if code_manager.is_request_limited(ip_key, limit_seconds=300, max_attempts=3):
+        if await code_manager.is_request_limited(ip_key, limit_seconds=300, max_attempts=3):
             return Response(
                 {"detail": "Повторный запрос кода возможен не ранее чем через 5 минут."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS,
             )
 
         code = code_manager.generate_code()
-        code_manager.set_code(redis_key, code)
+        await code_manager.set_code(redis_key, code)
 
-        send_activation_email(email=email, code=code)
+        await send_activation_email(email=email, code=code)
 
         return Response(
             {"detail": "Код отправлен на указанный email."},
@@ -67,7 +69,7 @@ class RequestCodeAPIView(APIView):
         )
 
 
-class VerifyCodeAPIView(APIView):
+class VerifyCodeAPIView(AsyncAPIView):
     """
     POST /api/auth/verify-code/
 
@@ -78,9 +80,11 @@ class VerifyCodeAPIView(APIView):
 
     Проверяет одноразовый код, создаёт/обновляет пользователя
     и возвращает пару JWT-токенов (access + refresh).
+    Лимит попыток и код проверяются одним pipeline в Redis; работа с БД
+    (пользователь) — одним переходом в поток.
     """
 
-    permission_classes = [permissions.AllowAny]
+    serializer_class = VerifyCodeSerializer
 
     def foul_message(self) -> str:
         login_url = f"http://{settings.DOMAIN}/login/"
@@ -101,7 +105,28 @@ class VerifyCodeAPIView(APIView):
             user.save(update_fields=["email_confirmed"])
         return user
 
-    def post(self, request, *args: Any, **kwargs: Any) -> Response:
+    def _login(self, email: str) -> dict[str, Any]:
+        # Код корректен → создаём/обновляем пользователя
+        user = self._create_or_update_user(email)
+
+        # Генерируем JWT-токены
+        refresh = VersionedRefreshToken.for_user(user)
+        access = refresh.access_token
+
+        # Профиль в клеймах: первые запросы после входа аутентифицируются без кеша и БД
+        add_profile_claims(access, user)
+
+        return {
+            "access": str(access),
+            "refresh": str(refresh),
+            "user": {
+                "id": user.id,  # pyright: ignore[reportAttributeAccessIssue]
+                "email": user.email,  # pyright: ignore[reportAttributeAccessIssue]
+                "display_name": getattr(user, "display_name", "") or user.email,  # pyright: ignore[reportAttributeAccessIssue]
+            },
+        }
+
+    async def post(self, request, *args: Any, **kwargs: Any) -> Response:
         serializer: VerifyCodeSerializer = VerifyCodeSerializer(data=request.data)  # pyright: ignore[reportAssignmentType]
         serializer.is_valid(raise_exception=True)
 
@@ -119,17 +144,20 @@ class VerifyCodeAPIView(APIView):
         email = email_raw.lower()
         code = code_raw.strip()
 
-        code_manager = CodeManager()
+        code_manager = await AsyncCodeManager.create()
         ip = get_client_ip(request) or "unknown"
         ip_key = f"verify_code_ip:{ip}"
         redis_key = f"login_code:{email}"
 
         # Лимит попыток ввода кода: например, 5 за 5 минут
-        if code_manager.is_request_limited(
+        limited, is_valid_code = await code_manager.verify_code_limited(
             ip_key,
+            redis_key,
+            code,
             limit_seconds=300,
             max_attempts=5,
-        ):
+        )
+        if limited:
             return Response(
                 {
                     "detail": self.foul_message(),
@@ -139,7 +167,6 @@ class VerifyCodeAPIView(APIView):
             )
 
         # Проверка одноразового кода
-        is_valid_code = code_manager.verify_code(redis_key, code)
         if not is_valid_code:
             return Response(
                 {
@@ -149,25 +176,5 @@ class VerifyCodeAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Код корректен → создаём/обновляем пользователя
-        user = self._create_or_update_user(email)
-
-        # Генерируем JWT-токены
-        refresh = RefreshToken.for_user(user)
-        access = refresh.access_token
-
-        # Дополнительные клеймы (опционально)
-        access["email"] = user.email  # pyright: ignore[reportAttributeAccessIssue]
-        access["display_name"] = getattr(user, "display_name", "") or user.email  # pyright: ignore[reportAttributeAccessIssue]
-
-        data: dict[str, Any] = {
-            "access": str(access),
-            "refresh": str(refresh),
-            "user": {
-                "id": user.id,  # pyright: ignore[reportAttributeAccessIssue]
-                "email": user.email,  # pyright: ignore[reportAttributeAccessIssue]
-                "display_name": getattr(user, "display_name", "") or user.email,  # pyright: ignore[reportAttributeAccessIssue]
-            },
-        }
-
+        data = await sync_to_async(self._login)(email)
         return Response(data, status=status.HTTP_200_OK)
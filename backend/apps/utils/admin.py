@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import IntegerField, QuerySet, Subquery
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+
+# Ниже порога оценке планировщика не верим: на маленьких выборках точный COUNT дешёвый,
+# а погрешность статистики заметна
+ESTIMATE_THRESHOLD = 10_000
+
+
+def estimate_count(queryset: QuerySet) -> int | None:
+    """
+    Оценка числа строк по статистике PostgreSQL вместо COUNT(*):
+    без фильтров — reltuples таблицы (с партициями), с фильтрами — Plan Rows из EXPLAIN.
+    На других СУБД — None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            # reltuples = -1 у ещё не проанализированных таблиц, 0 — у родителя партиций
+            cursor.execute(
+                """
+                SELECT coalesce(sum(greatest(c.reltuples, 0)), 0)::bigint FROM pg_class c
+                WHERE c.oid = %s::regclass
+                   OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)
+                """,
+                [queryset.model._meta.db_table] * 2,
+            )
+            return cursor.fetchone()[0]
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор changelist без COUNT(*) по большим таблицам: число страниц
+    приблизительное, зато страница открывается за время одного LIMIT-запроса.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        if isinstance(self.object_list, QuerySet):
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class SubqueryCount(Subquery):
+    """
+    Коррелированный COUNT(*) для list_display: считается только для строк страницы,
+    без JOIN и GROUP BY по всей таблице.
+
+        SubqueryCount(ChatRoomParticipant.objects.filter(room=OuterRef("pk")))
+    """
+
+    template = "(SELECT count(*) FROM (%(subquery)s) _count)"
+    output_field = IntegerField()
+
+    def __init__(self, queryset: QuerySet, **extra: Any) -> None:
+        super().__init__(queryset.order_by().values("pk"), **extra)
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Фильтр по внешнему ключу с поиском через autocomplete админки вместо списка
+    всех связанных объектов в сайдбаре. У ModelAdmin связанной модели должны быть
+    search_fields, как и для autocomplete_fields.
+
+        list_filter = (("room", AutocompleteFilter),)
+    """
+
+    template = "admin/utils/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f"{field_path}__{field.target_field.attname}__exact"
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.formfield = field.formfield(widget=AutocompleteSelect(field, model_admin.admin_site), required=False)
+
+    def expected_parameters(self) -> list[str]:
+        return [self.lookup_kwarg]
+
+    def get_facet_counts(self, pk_attname, filtered_qs) -> dict:
+        return {}
+
+    def choices(self, changelist):
+        value = self.used_parameters.get(self.lookup_kwarg)
+        yield {
+            "selected": bool(value),
+            "lookup": self.lookup_kwarg,
+            "query_string": changelist.get_query_string(remove=[self.lookup_kwarg]),
+            "widget": self.formfield.widget.render(
+                self.lookup_kwarg,
+                value[-1] if value else None,
+                attrs={"id": f"filter_{self.lookup_kwarg}", "style": "width: 100%"},
+            ),
+        }
+
+
+class LimitedInlineFormSet(BaseInlineFormSet):
+    """
+    Только первые limit объектов по ordering инлайна.
+    """
+
+    limit = 20
+
+    def get_queryset(self) -> QuerySet:
+        if not hasattr(self, "_queryset"):
+            self._queryset = super().get_queryset()[: self.limit]
+        return self._queryset
+
+
+class LimitedInlineMixin:
+    """
+    Инлайн для связей без верхней границы (сообщения, участники комнаты):
+    показывает limit объектов, остальные — в changelist связанной модели.
+    """
+
+    formset = LimitedInlineFormSet
+    limit = 20
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)  # pyright: ignore[reportAttributeAccessIssue]
+        formset.limit = self.limit
+        return formset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Базовый ModelAdmin для таблиц на миллионы строк:
+    - оценка числа строк вместо COUNT(*) и без второго COUNT по всей таблице,
+    - без подсчёта фасетов у фильтров,
+    - статика для AutocompleteFilter в list_filter.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    @property
+    def media(self) -> forms.Media:
+        media = super().media
+        if any(isinstance(item, tuple) and item[1] is AutocompleteFilter for item in self.list_filter):
+            media += AutocompleteSelect(None, self.admin_site).media
+            media += forms.Media(js=["utils/js/autocomplete_filter.js"])
+        return media
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import Any, Sequence
+
+from django.db import connections
+from django.db.models import QuerySet
+
+
+def keyset_filter(queryset: QuerySet, fields: Sequence[str], values: Sequence[Any], op: str) -> QuerySet:
+    """
+    Keyset-условие вида ``WHERE (f1, f2) < (v1, v2)``.
+
+    Сравнение кортежей PostgreSQL целиком отдаёт составному индексу — в отличие от
+    развёрнутого ``f1 < v1 OR (f1 = v1 AND f2 < v2)``, поэтому глубина страницы
+    не влияет на время ответа. Избыточное ``f1 <= v1`` рядом нужно для отсечения
+    партиций: сравнение кортежей планировщик к ключу партиционирования не применяет.
+    """
+    if op not in ("<", ">", "<=", ">="):
+        raise ValueError(f"Unsupported keyset operator: {op}")
+
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    opts = queryset.model._meta
+    table = qn(opts.db_table)
+
+    columns, params = [], []
+    for name, value in zip(fields, values, strict=True):
+        field = opts.get_field(name)
+        columns.append(f"{table}.{qn(field.column)}")  # pyright: ignore[reportAttributeAccessIssue]
+        params.append(field.get_db_prep_value(value, connection))  # pyright: ignore[reportAttributeAccessIssue]
+
+    placeholders = ", ".join(["%s"] * len(params))
+    bound = "<=" if op.startswith("<") else ">="
+    return queryset.extra(
+        where=[f"({', '.join(columns)}) {op} ({placeholders})", f"{columns[0]} {bound} %s"],
+        params=[*params, params[0]],
+    )
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from typing import Any
+
+from django.conf import settings
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.client import Pipeline as AsyncPipeline
+
+# Журнал попыток в ZSET: точное «не больше limit за последние window мс».
+# Время берётся у Redis (TIME), чтобы часы воркеров не влияли на решение.
+SLIDING_WINDOW_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, limit - count - 1, 0}
+end
+
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, 0, tonumber(oldest[2]) + window - now}
+"""
+
+# Token bucket в HASH: O(1) памяти на ключ, допускает всплески до capacity.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate / 1000)
+
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry = math.ceil((cost - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate))
+return {allowed, math.floor(tokens), retry}
+"""
+
+
+@dataclass(frozen=True)
+class SlidingWindow:
+    """Не больше ``limit`` попыток за последние ``window`` секунд."""
+
+    limit: int
+    window: float
+
+    def args(self, cost: int) -> list[Any]:
+        return [int(self.window * 1000), self.limit, uuid.uuid4().hex]
+
+
+@dataclass(frozen=True)
+class TokenBucket:
+    """Пополнение ``rate`` токенов в секунду, запас не больше ``capacity``."""
+
+    rate: float
+    capacity: int
+
+    def args(self, cost: int) -> list[Any]:
+        return [self.rate, self.capacity, cost]
+
+    @classmethod
+    def per(cls, num_requests: int, duration: float) -> "TokenBucket":
+        """Квота в стиле DRF: ``num_requests`` за ``duration`` секунд."""
+        return cls(rate=num_requests / duration, capacity=num_requests)
+
+
+RateLimit = SlidingWindow | TokenBucket
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    remaining: int
+    retry_after: float  # секунды до следующей разрешённой попытки
+
+    def __bool__(self) -> bool:
+        return self.allowed
+
+    @classmethod
+    def from_reply(cls, raw: list[Any]) -> "RateLimitResult":
+        """Разбор ответа скрипта: {allowed, remaining, retry_ms}."""
+        allowed, remaining, retry_ms = raw
+        return cls(allowed=bool(int(allowed)), remaining=int(remaining), retry_after=int(retry_ms) / 1000)
+
+
+class RateLimiter:
+    """
+    Синхронный лимитер (settings.REDIS_CLIENT): одно решение — один EVALSHA.
+    """
+
+    def __init__(self, redis: Redis | None = None) -> None:
+        self.redis = redis or settings.REDIS_CLIENT
+        self._scripts = {
+            SlidingWindow: self.redis.register_script(SLIDING_WINDOW_SCRIPT),
+            TokenBucket: self.redis.register_script(TOKEN_BUCKET_SCRIPT),
+        }
+
+    def hit(self, key: str, limit: RateLimit, cost: int = 1) -> RateLimitResult:
+        script = self._scripts[type(limit)]
+        return RateLimitResult.from_reply(script(keys=[key], args=limit.args(cost)))  # pyright: ignore[reportArgumentType]
+
+    def reset(self, key: str) -> None:
+        self.redis.delete(key)
+
+
+class AsyncRateLimiter:
+    """
+    Асинхронный лимитер поверх AsyncRedisClient с теми же скриптами.
+    """
+
+    def __init__(self, redis: AsyncRedis) -> None:
+        self.redis = redis
+        self._scripts = {
+            SlidingWindow: self.redis.register_script(SLIDING_WINDOW_SCRIPT),
+            TokenBucket: self.redis.register_script(TOKEN_BUCKET_SCRIPT),
+        }
+
+    async def hit(self, key: str, limit: RateLimit, cost: int = 1) -> RateLimitResult:
+        script = self._scripts[type(limit)]
+        return RateLimitResult.from_reply(await script(keys=[key], args=limit.args(cost)))  # pyright: ignore[reportArgumentType]
+
+    async def queue_hit(self, pipe: AsyncPipeline, key: str, limit: RateLimit, cost: int = 1) -> None:
+        """
+        Решение в составе pipeline, вместе с другими командами запроса; ответ
+        из pipe.execute() разбирается через RateLimitResult.from_reply.
+        """
+        script = self._scripts[type(limit)]
+        await script(keys=[key], args=limit.args(cost), client=pipe)  # pyright: ignore[reportArgumentType]
+
+    async def reset(self, key: str) -> None:
+        await self.redis.delete(key)
+
+
+_sync_limiter: RateLimiter | None = None
+_async_limiters: dict[int, AsyncRateLimiter] = {}
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _sync_limiter
+    if _sync_limiter is None or _sync_limiter.redis is not settings.REDIS_CLIENT:
+        _sync_limiter = RateLimiter()
+    return _sync_limiter
+
+
+async def get_async_rate_limiter() -> AsyncRateLimiter:
+    from config.async_redis import AsyncRedisClient
+
+    redis = await AsyncRedisClient.initialize()
+    limiter = _async_limiters.get(id(redis))
+    if limiter is None or limiter.redis is not redis:
+        _async_limiters.clear()
+        limiter = _async_limiters[id(redis)] = AsyncRateLimiter(redis)
+    return limiter
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import io
+import json
+import logging
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    Политика хранения для одной модели.
+
+    - ``model`` — ``"app_label.ModelName"``, резолвится лениво;
+    - ``date_field`` — поле, от которого считается возраст строки;
+    - ``days`` — сколько дней строка живёт после ``date_field``;
+    - ``filters`` — дополнительные условия (например, только закрытые жалобы);
+    - ``archive`` — перед удалением выгрузить строки в ``DataBaseStorage``.
+    """
+
+    label: str
+    model: str
+    date_field: str
+    days: int
+    filters: dict[str, Any] = field(default_factory=dict)
+    archive: bool = False
+
+    def get_model(self) -> type[models.Model]:
+        return apps.get_model(self.model)
+
+    def queryset(self, now: datetime) -> models.QuerySet:
+        cutoff = now - timedelta(days=self.days)
+        model = self.get_model()
+        return model._base_manager.filter(  # pyright: ignore[reportAttributeAccessIssue]
+            **self.filters,
+            **{f"{self.date_field}__lt": cutoff},
+        )
+
+
+@dataclass
+class RetentionResult:
+    label: str
+    deleted: int = 0
+    archived: int = 0
+    archive_name: str | None = None
+
+
+def get_policies() -> list[RetentionPolicy]:
+    """
+    Политики из ``settings.RETENTION_DAYS``. Ключ отсутствует или 0 — политика выключена,
+    кроме JWT-токенов: истёкшие токены бесполезны, для них 0 означает «сразу после expires_at».
+
+    Сообщения чата в партиционированной таблице удаляются целыми партициями
+    (apps.messaging.partitions.archive_old_partitions) по тому же сроку.
+    """
+    from apps.messaging.partitions import partitioning_enabled
+
+    days = getattr(settings, "RETENTION_DAYS", {})
+    policies = [
+        RetentionPolicy(
+            label="activity",
+            model="social.Activity",
+            date_field="created_at",
+            days=days.get("activity", 0),
+        ),
+        RetentionPolicy(
+            label="chat_message",
+            model="messaging.ChatMessage",
+            date_field="created_at",
+            days=days.get("chat_message", 0),
+            archive=True,
+        ),
+        RetentionPolicy(
+            label="complaint",
+            model="complaints.Complaint",
+            date_field="resolved_at",
+            days=days.get("complaint", 0),
+            filters={"status__in": ("resolved", "dismissed")},
+            archive=True,
+        ),
+    ]
+    policies = [policy for policy in policies if policy.days > 0]
+    if partitioning_enabled():
+        policies = [policy for policy in policies if policy.label != "chat_message"]
+
+    if apps.is_installed("rest_framework_simplejwt.token_blacklist"):
+        # BlacklistedToken удаляется каскадом вместе с OutstandingToken
+        policies.append(
+            RetentionPolicy(
+                label="jwt_token",
+                model="token_blacklist.OutstandingToken",
+                date_field="expires_at",
+                days=days.get("jwt_token", 0),
+            )
+        )
+    return policies
+
+
+def _next_chunk(queryset: models.QuerySet, last_pk: Any, size: int) -> list[Any]:
+    """
+    Следующая пачка первичных ключей по возрастанию — keyset, без OFFSET.
+    """
+    if last_pk is not None:
+        queryset = queryset.filter(pk__gt=last_pk)
+    return list(queryset.order_by("pk").values_list("pk", flat=True)[:size])
+
+
+def _delete_chunk(model: type[models.Model], pks: list[Any]) -> int:
+    with transaction.atomic():
+        deleted, _ = model._base_manager.filter(pk__in=pks).delete()  # pyright: ignore[reportAttributeAccessIssue]
+    return deleted
+
+
+def _dump_chunk(model: type[models.Model], pks: list[Any], stream: io.TextIOBase) -> None:
+    rows = model._base_manager.filter(pk__in=pks).order_by("pk").values()  # pyright: ignore[reportAttributeAccessIssue]
+    for row in rows:
+        stream.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+        stream.write("\n")
+
+
+def _save_archive(policy: RetentionPolicy, raw: Any, now: datetime) -> str:
+    raw.seek(0)
+    name = f"retention/{policy.label}/{now:%Y/%m/%d}/{policy.label}-{now:%Y%m%dT%H%M%S}.jsonl.gz"
+    return storages["dbbackup"].save(name, File(raw))
+
+
+async def run_policy(
+    policy: RetentionPolicy,
+    *,
+    now: datetime | None = None,
+    batch_size: int | None = None,
+    pause: float | None = None,
+    max_rows: int | None = None,
+) -> RetentionResult:
+    """
+    Прогон одной политики маленькими пачками по возрастанию PK.
+
+    Каждая пачка — отдельная короткая транзакция, между пачками — пауза,
+    чтобы не держать долгих блокировок и не раздувать WAL.
+    Для архивируемых моделей сначала читаем пачки в gzip-файл, сохраняем его
+    в хранилище и только после этого удаляем ровно те PK, что попали в архив.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    pause = settings.RETENTION_BATCH_PAUSE if pause is None else pause
+    max_rows = max_rows or settings.RETENTION_MAX_ROWS_PER_RUN
+
+    model = policy.get_model()
+    queryset = policy.queryset(now)
+    result = RetentionResult(label=policy.label)
+
+    if not policy.archive:
+        last_pk = None
+        while result.deleted < max_rows:
+            pks = await sync_to_async(_next_chunk)(queryset, last_pk, batch_size)
+            if not pks:
+                break
+            result.deleted += await sync_to_async(_delete_chunk)(model, pks)
+            last_pk = pks[-1]
+            await asyncio.sleep(pause)
+        return result
+
+    chunks: list[list[Any]] = []
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz, io.TextIOWrapper(gz, encoding="utf-8") as stream:
+            last_pk = None
+            while result.archived < max_rows:
+                pks = await sync_to_async(_next_chunk)(queryset, last_pk, batch_size)
+                if not pks:
+                    break
+                await sync_to_async(_dump_chunk)(model, pks, stream)
+                chunks.append(pks)
+                result.archived += len(pks)
+                last_pk = pks[-1]
+                await asyncio.sleep(pause)
+
+        if not chunks:
+            return result
+        result.archive_name = await sync_to_async(_save_archive)(policy, raw, now)
+
+    for pks in chunks:
+        result.deleted += await sync_to_async(_delete_chunk)(model, pks)
+        await asyncio.sleep(pause)
+    return result
+
+
+async def run_retention(**kwargs: Any) -> list[RetentionResult]:
+    results = []
+    for policy in await sync_to_async(get_policies)():
+        try:
+            result = await run_policy(policy, **kwargs)
+        except Exception:
+            logger.exception("Retention policy %s failed", policy.label)
+            continue
+        logger.info(
+            "Retention %s: archived=%s deleted=%s archive=%s",
+            result.label,
+            result.archived,
+            result.deleted,
+            result.archive_name,
+        )
+        results.append(result)
+    return results
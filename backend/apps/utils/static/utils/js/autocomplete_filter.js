@@ -0,0 +1,12 @@
+'use strict';
+{
+    // Выбор в AutocompleteFilter сразу применяет фильтр: перезагрузка changelist с параметром
+    django.jQuery(document).on('change', '.autocomplete-filter select', function() {
+        const box = this.closest('.autocomplete-filter');
+        const params = new URLSearchParams(box.dataset.queryString);
+        if (this.value) {
+            params.set(box.dataset.lookup, this.value);
+        }
+        window.location.search = params.toString();
+    });
+}
@@ -1,6 +1,7 @@
 import logging
 
 import aiosmtplib
+from apps.utils.retention import run_retention
 from asgiref.sync import sync_to_async
 from config.taskiq_app import taskiq_broker
 from django.conf import settings
@@ -69,6 +70,12 @@ async def backup():
     logger.info('Database backup has been created')
 
 
+@taskiq_broker.task(schedule=[{"cron": "15 3 * * *"}])
+async def purge_expired_data():
+    """Чистка и архивация устаревших строк по политикам хранения."""
+    await run_retention()
+
+
 async def send_email_msg_attachments(
     to_emails: str | list[str],
     context: dict,
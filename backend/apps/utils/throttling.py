@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Any
+
+from apps.utils.ratelimit import RateLimitResult, TokenBucket, get_async_rate_limiter, get_rate_limiter
+from django.http import HttpRequest
+from rest_framework.request import Request
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+
+class RedisRateThrottleMixin:
+    """
+    Троттлинг DRF поверх общего Lua-лимитера вместо кеша Django.
+
+    Стандартный SimpleRateThrottle хранит историю списком в кеше и делает
+    get + set без атомарности; здесь квота «N за период» — это token bucket
+    в одном HASH, решение принимается одним вызовом скрипта.
+    """
+
+    _wait: float | None = None
+
+    def allow_request(self: Any, request: Request, view: Any) -> bool:
+        if self.rate is None:
+            return True
+
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        result = get_rate_limiter().hit(key, TokenBucket.per(self.num_requests, self.duration))
+        self._wait = result.retry_after or None
+        return result.allowed
+
+    def wait(self) -> float | None:
+        return self._wait
+
+
+class RedisAnonRateThrottle(RedisRateThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class RedisUserRateThrottle(RedisRateThrottleMixin, UserRateThrottle):
+    pass
+
+
+class AsyncAnonRateThrottle(AnonRateThrottle):
+    """
+    Anon-квота RedisAnonRateThrottle для нативных async-view (apps.utils.views.AsyncAPIView):
+    тот же ключ и token bucket, но через AsyncRateLimiter. request.user не читается —
+    в async-контексте это синхронный запрос сессии в БД.
+    """
+
+    async def ahit(self, request: HttpRequest) -> RateLimitResult | None:
+        if self.rate is None:
+            return None
+        key = self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+        limiter = await get_async_rate_limiter()
+        return await limiter.hit(key, TokenBucket.per(self.num_requests, self.duration))  # pyright: ignore[reportArgumentType]
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from inspect import isawaitable
+from typing import Any
+
+from apps.utils.throttling import AsyncAnonRateThrottle
+from rest_framework import permissions
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView с async-обработчиками для горячих публичных endpoint’ов.
+
+    Обычный APIView под ASGI целиком выполняется в пуле потоков (thread_sensitive —
+    по сути в одном потоке на процесс); здесь dispatch — корутина, и обработчик
+    остаётся в event loop. Всё остальное — как у DRF: Request и парсеры,
+    согласование формата и рендереры, обработчик исключений, схема drf_spectacular.
+    Без аутентификации (request.user в async-контексте — синхронный запрос в БД),
+    anon-квота — общий token bucket через AsyncRateLimiter.
+    Обработчики методов должны быть async def.
+    """
+
+    authentication_classes = ()
+    permission_classes = (permissions.AllowAny,)
+    throttle_classes = (AsyncAnonRateThrottle,)
+
+    async def check_async_throttles(self, request: Request) -> None:
+        for throttle_class in self.throttle_classes:
+            result = await throttle_class().ahit(request)  # pyright: ignore[reportArgumentType]
+            if result is not None and not result.allowed:
+                self.throttled(request, result.retry_after)
+
+    async def dispatch(self, request: Any, *args: Any, **kwargs: Any) -> Response:  # pyright: ignore[reportIncompatibleMethodOverride]
+        """
+        APIView.dispatch, но с ожиданием троттлинга и обработчика.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+            await self.check_async_throttles(request)
+
+            method = request.method.lower()
+            handler = getattr(self, method, self.http_method_not_allowed) if method in self.http_method_names else self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    def check_throttles(self, request: Request) -> None:
+        # квоты проверяет check_async_throttles
+        return None
@@ -0,0 +1,113 @@
+"""
+Пропускная способность входа по коду: запросов/с к auth-request-code и auth-verify-code.
+
+Запросы идут в процессе через config.asgi.application (httpx.ASGITransport) —
+без сети, но через весь HTTP-стек Django под ASGI. Письма не отправляются:
+send_activation_email на время прогона заменяется пустышкой. Каждый запрос
+приходит с отдельного IP из 198.18.0.0/15 (диапазон для бенчмарков), чтобы
+лимиты по IP не подменяли замер отказами 429; ключи этих IP удаляются после прогона.
+
+verify отправляет заведомо неверный код: замеряется путь лимитер + Redis без
+создания пользователей в БД.
+
+Нужны Redis и БД из настроек (например, USE_SQLITE=1 после migrate).
+
+    cd backend && python -m bench.auth_codes --requests 5000 --concurrency 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import inspect
+import logging
+import time
+
+from bench.utils import format_ms, percentiles, setup_django
+
+IP_MATCH = "*198.1[89].*"
+
+
+def _ip(number: int) -> str:
+    return f"198.{18 + (number >> 16 & 1)}.{number >> 8 & 255}.{number & 255}"
+
+
+def _silence_email() -> None:
+    from apps.users import views
+
+    original = views.send_activation_email
+    if inspect.iscoroutinefunction(original):
+        async def send_activation_email(*, email: str, code: str) -> None:
+            return None
+    else:
+        def send_activation_email(*, email: str, code: str) -> None:  # type: ignore[misc]
+            return None
+    views.send_activation_email = send_activation_email
+
+
+async def _run(endpoint: str, args: argparse.Namespace) -> None:
+    import httpx
+    from config.asgi import application
+    from django.urls import reverse
+
+    url = reverse(f"auth-{endpoint}-code")
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=application), base_url="http://localhost") as client:
+        async def call(number: int) -> None:
+            payload = {"email": f"bench{number}@bench.local", "code": "000000"}
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(url, json=payload, headers={"X-Forwarded-For": _ip(number)})
+                latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        # прогрев: скрипты Redis, пулы соединений, импорт view
+        await asyncio.gather(*(call(args.requests + number) for number in range(args.concurrency)))
+        latencies.clear()
+        statuses.clear()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(call(number) for number in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{endpoint:<8} {args.requests / elapsed:>8.0f} req/s  statuses={statuses}  {format_ms(percentiles(latencies))}")
+
+
+async def _run_all(args: argparse.Namespace) -> None:
+    # один event loop на все прогоны: асинхронный клиент Redis привязан к циклу, в котором создан
+    for endpoint in args.endpoint:
+        await _run(endpoint, args)
+        await asyncio.to_thread(_cleanup)
+
+
+def _cleanup() -> None:
+    from django.conf import settings
+
+    redis = settings.REDIS_CLIENT
+    for pattern in (IP_MATCH, "login_code:bench*@bench.local"):
+        keys = list(redis.scan_iter(match=pattern, count=1000))
+        if keys:
+            redis.delete(*keys)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--endpoint", choices=("request", "verify"), nargs="+", default=["request", "verify"])
+    args = parser.parse_args()
+
+    setup_django()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    _silence_email()
+    _cleanup()
+    try:
+        asyncio.run(_run_all(args))
+    finally:
+        _cleanup()
+
+
+if __name__ == "__main__":
+    main()
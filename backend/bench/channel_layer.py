@@ -0,0 +1,116 @@
+"""
+Нагрузочный тест channel layer: задержка доставки group_send между воркерами.
+
+Каждый процесс-«воркер» открывает свою долю из --sockets каналов (как ChatConsumer
+на соединение) и подписывает их на группы комнат; отдельный процесс-отправитель
+шлёт сообщения в случайные комнаты. Задержка — время от group_send до receive
+в другом процессе.
+
+    cd backend && python -m bench.channel_layer --sockets 10000 --workers 4 --rooms 500
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing as mp
+import random
+import time
+
+from bench.utils import format_ms, percentiles, setup_django
+
+
+async def _worker(index: int, args: argparse.Namespace, ready, start, results) -> None:
+    from channels.layers import get_channel_layer
+
+    layer = get_channel_layer()
+    latencies: list[float] = []
+    sockets = range(index, args.sockets, args.workers)
+
+    channels: list[tuple[str, str]] = []
+    for socket in sockets:
+        group, channel = f"chat_room_bench_{socket % args.rooms}", await layer.new_channel()
+        await layer.group_add(group, channel)
+        channels.append((group, channel))
+
+    async def listen(channel: str) -> None:
+        while True:
+            message = await layer.receive(channel)
+            if message["type"] == "bench.stop":
+                return
+            latencies.append(time.time() - message["ts"])
+
+    listeners = [asyncio.create_task(listen(channel)) for _, channel in channels]
+    ready.release()
+    await asyncio.get_running_loop().run_in_executor(None, start.wait)
+
+    try:
+        await asyncio.wait_for(asyncio.gather(*listeners), timeout=args.timeout)
+    except asyncio.TimeoutError:
+        pass
+    for group, channel in channels:
+        await layer.group_discard(group, channel)
+    results.put((index, len(channels), latencies))
+
+
+async def _sender(args: argparse.Namespace) -> float:
+    from channels.layers import get_channel_layer
+
+    layer = get_channel_layer()
+    interval = 1 / args.rate
+    started = time.perf_counter()
+    for _ in range(args.messages):
+        room = random.randrange(args.rooms)
+        await layer.group_send(f"chat_room_bench_{room}", {"type": "bench.message", "ts": time.time()})
+        await asyncio.sleep(interval)
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(1)
+    for room in range(args.rooms):
+        await layer.group_send(f"chat_room_bench_{room}", {"type": "bench.stop"})
+    return elapsed
+
+
+def _run_worker(index, args, ready, start, results) -> None:
+    setup_django()
+    asyncio.run(_worker(index, args, ready, start, results))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=2_000)
+    parser.add_argument("--rate", type=float, default=200, help="сообщений в секунду от отправителя")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    ready = ctx.Semaphore(0)
+    start = ctx.Event()
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_run_worker, args=(i, args, ready, start, results)) for i in range(args.workers)]
+    for process in workers:
+        process.start()
+    for _ in workers:
+        ready.acquire()
+
+    setup_django()
+    start.set()
+    elapsed = asyncio.run(_sender(args))
+
+    latencies: list[float] = []
+    sockets = 0
+    for _ in workers:
+        _, count, worker_latencies = results.get()
+        sockets += count
+        latencies.extend(worker_latencies)
+    for process in workers:
+        process.join()
+
+    print(f"sockets={sockets} workers={args.workers} rooms={args.rooms}")
+    print(f"sent={args.messages} in {elapsed:.2f}s, delivered={len(latencies)}")
+    print(f"latency {format_ms(percentiles(latencies))}")
+
+
+if __name__ == "__main__":
+    main()
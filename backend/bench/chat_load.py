@@ -0,0 +1,172 @@
+"""
+Нагрузочный стенд чата: сколько сокетов и сообщений в секунду держит один воркер.
+
+В процессе поднимается config.asgi.application (с JWTAuthMiddlewareStack), и --clients
+клиентов подключаются к ws/chat/<room_id>/ через WebsocketCommunicator — без сети,
+но через весь стек: access-токен (Authorization: Bearer) → ChatConsumer → channel
+layer → Redis → БД. Пользователи и --rooms групповых комнат создаются на время
+прогона и удаляются после него; токены выпускаются без записи в БД.
+
+Каждый клиент раз в --interval секунд (по умолчанию — лимит ChatConsumer для
+авторизованных) шлёт сообщение с отметкой времени; задержка считается у всех
+получателей комнаты. Отчёт: скорость подключения, сообщений/с на вход и кадров/с
+на выход, перцентили задержки, прирост RSS на соединение.
+
+Нужны Redis и БД из настроек (например, USE_SQLITE=1 после migrate);
+--layer memory заменяет channels_redis на InMemoryChannelLayer.
+
+    cd backend && python -m bench.chat_load --clients 1000 --rooms 50 --duration 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from bench.utils import format_ms, percentiles, rss_bytes, setup_django
+
+PREFIX = "bench:"
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.latencies: list[float] = []
+
+
+def _create_fixtures(clients: int, rooms: int) -> tuple[list[tuple[str, str]], list, list]:
+    """
+    :return: пары (room_id, access-токен) на клиента, id пользователей и комнат для очистки.
+    """
+    from apps.messaging.models import ChatRoom, ChatRoomParticipant
+    from apps.users.tokens import VersionedRefreshToken
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    run = uuid.uuid4().hex[:8]
+    users = User.objects.bulk_create(
+        User(email=f"load-{run}-{i}@bench.local", display_name=f"load{i}") for i in range(clients)
+    )
+    if users and users[0].pk is None:
+        # бэкенды без RETURNING
+        users = list(User.objects.filter(email__startswith=f"load-{run}-").order_by("pk"))
+    room_list = ChatRoom.objects.bulk_create(
+        ChatRoom(type=ChatRoom.RoomType.GROUP, name=f"load-{run}-{i}") for i in range(rooms)
+    )
+    ChatRoomParticipant.objects.bulk_create(
+        ChatRoomParticipant(room=room_list[i % rooms], user=user) for i, user in enumerate(users)
+    )
+
+    pairs = [
+        (str(room_list[i % rooms].pk), str(VersionedRefreshToken.for_user(user).access_token))
+        for i, user in enumerate(users)
+    ]
+    return pairs, [user.pk for user in users], [room.pk for room in room_list]
+
+
+def _drop_fixtures(user_ids: list, room_ids: list) -> None:
+    from apps.messaging.models import ChatRoom
+    from django.contrib.auth import get_user_model
+
+    ChatRoom.objects.filter(pk__in=room_ids).delete()
+    get_user_model().objects.filter(pk__in=user_ids).delete()
+
+
+async def _read(communicator, stats: _Stats) -> None:
+    while True:
+        output = await communicator.output_queue.get()
+        if output.get("type") != "websocket.send" or output.get("text") is None:
+            continue
+        frame = json.loads(output["text"])
+        if frame.get("error"):
+            stats.errors += 1
+            continue
+        message = frame.get("message") or ""
+        if message.startswith(PREFIX):
+            stats.received += 1
+            stats.latencies.append(time.perf_counter() - float(message[len(PREFIX):]))
+
+
+async def _talk(communicator, stats: _Stats, interval: float, until: float) -> None:
+    await asyncio.sleep(random.uniform(0, interval))
+    while time.perf_counter() < until:
+        await communicator.send_to(text_data=json.dumps({"message": f"{PREFIX}{time.perf_counter()}"}))
+        stats.sent += 1
+        await asyncio.sleep(interval)
+
+
+async def _run(args: argparse.Namespace, pairs: list[tuple[str, str]]) -> None:
+    from channels.testing import WebsocketCommunicator
+    from config.asgi import application
+
+    stats = _Stats()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    communicators: list = []
+
+    async def connect(room_id: str, token: str) -> None:
+        communicator = WebsocketCommunicator(
+            application, f"/ws/chat/{room_id}/", headers=[(b"authorization", f"Bearer {token}".encode())]
+        )
+        async with semaphore:
+            connected, code = await communicator.connect(timeout=30)
+        if not connected:
+            raise RuntimeError(f"connect rejected with code {code}")
+        communicators.append(communicator)
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(room_id, token) for room_id, token in pairs))
+    connect_time = time.perf_counter() - started
+    rss_connected = rss_bytes()
+
+    readers = [asyncio.create_task(_read(communicator, stats)) for communicator in communicators]
+    started = time.perf_counter()
+    until = started + args.duration
+    await asyncio.gather(*(_talk(communicator, stats, args.interval, until) for communicator in communicators))
+    await asyncio.sleep(args.drain)
+    elapsed = time.perf_counter() - started
+
+    for reader in readers:
+        reader.cancel()
+    for communicator in communicators:
+        await communicator.disconnect()
+
+    clients = len(communicators)
+    print(f"clients={clients} rooms={args.rooms} layer={args.layer} duration={args.duration}s")
+    print(f"connect: {clients / connect_time:.0f}/s ({connect_time:.2f}s total)")
+    print(f"messages: in={stats.sent / args.duration:.0f}/s out={stats.received / elapsed:.0f} frames/s errors={stats.errors}")
+    print(f"latency {format_ms(percentiles(stats.latencies))} max={max(stats.latencies, default=0) * 1000:.2f}ms")
+    print(f"rss: +{(rss_connected - rss_before) / max(clients, 1) / 1024:.1f} KiB/connection ({rss_connected / 2**20:.0f} MiB total)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1_000)
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20, help="секунд трафика")
+    parser.add_argument("--interval", type=float, default=2.0, help="пауза между сообщениями клиента, с")
+    parser.add_argument("--concurrency", type=int, default=100, help="одновременных подключений")
+    parser.add_argument("--drain", type=float, default=2.0, help="ожидание хвоста доставки, с")
+    parser.add_argument("--layer", choices=("redis", "memory"), default="redis")
+    args = parser.parse_args()
+
+    setup_django()
+    if args.layer == "memory":
+        from django.conf import settings
+
+        settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+    pairs, user_ids, room_ids = _create_fixtures(args.clients, args.rooms)
+    try:
+        asyncio.run(_run(args, pairs))
+    finally:
+        _drop_fixtures(user_ids, room_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Микробенчмарк CPU на рассылку одного сообщения в группу.
+
+Было: каждый из --members consumer’ов сам собирает кадр и делает json.dumps.
+Стало: кадр кодируется один раз при group_send (JSON и MessagePack), получатели
+берут готовые байты. Считается процессорное время на сообщение и размер кадра.
+
+    cd backend && python -m bench.fanout --members 500 --messages 2000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+from bench.utils import setup_django
+
+
+def _event(i: int) -> dict:
+    return {
+        "type": "chat.message",
+        "id": 10_000 + i,
+        "seq": i,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "message": "Привет! Это обычное сообщение средней длины в групповом чате №%d." % i,
+        "display_name": "Пользователь",
+        "is_stream": False,
+        "is_start": False,
+        "is_end": False,
+    }
+
+
+def _per_recipient(events: list[dict], members: int) -> None:
+    from apps.messaging.frames import message_frame
+
+    for event in events:
+        for _ in range(members):
+            json.dumps(message_frame(event))
+
+
+def _encode_once(events: list[dict], members: int) -> None:
+    from apps.messaging.frames import JSON, message_frame, with_frames
+
+    for event in events:
+        sent = with_frames(event, message_frame(event))
+        for _ in range(members):
+            sent["frames"][JSON]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=2_000)
+    args = parser.parse_args()
+
+    setup_django()
+    from apps.messaging.frames import JSON, MSGPACK, encode, message_frame
+
+    events = [_event(i) for i in range(args.messages)]
+    print(f"members={args.members} messages={args.messages}")
+    for name, run in (("per_recipient", _per_recipient), ("encode_once", _encode_once)):
+        started = time.process_time()
+        run(events, args.members)
+        cpu = time.process_time() - started
+        print(f"{name:<14} cpu/message={cpu / args.messages * 1e6:9.1f}us")
+
+    frame = message_frame(events[0])
+    print(f"frame size: json={len(encode(frame, JSON).encode())}B msgpack={len(encode(frame, MSGPACK))}B "
+          f"(was {len(json.dumps(frame).encode())}B)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Задержка доставки в большую группу: group_send против локальной рассылки.
+
+group    — --members каналов channels_redis в одной группе, как у ChatConsumer
+           на соединение; отправитель делает group_send.
+pubsub   — те же получатели подписаны через LocalFanout: одно событие в топик
+           Redis pub/sub на воркер, раздача обработчикам внутри процесса.
+
+Для каждого сообщения считается задержка до каждого получателя и до последнего
+из них («доставка всей группе»). Нужен локальный Redis из настроек.
+
+    cd backend && python -m bench.large_group --members 100 1000 10000 --messages 50
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from bench.utils import format_ms, percentiles, setup_django
+
+
+class _Recipient:
+    """Получатель с обработчиком chat_message, как у consumer’а."""
+
+    def __init__(self, received: dict[int, list[float]]) -> None:
+        self.received = received
+
+    async def chat_message(self, event: dict) -> None:
+        self.received.setdefault(event["seq"], []).append(time.perf_counter() - event["ts"])
+
+
+def _event(seq: int) -> dict:
+    from apps.messaging.frames import message_frame, with_frames
+
+    event = {
+        "type": "chat.message",
+        "room_id": "bench",
+        "seq": seq,
+        "message": "Сообщение в большую группу №%d" % seq,
+        "display_name": "Пользователь",
+    }
+    event = with_frames(event, message_frame(event))
+    event["ts"] = time.perf_counter()
+    return event
+
+
+async def _wait_all(received: dict[int, list[float]], messages: int, members: int, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while sum(len(latencies) for latencies in received.values()) < messages * members:
+        if time.perf_counter() > deadline:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def _group(members: int, messages: int, timeout: float) -> dict[int, list[float]]:
+    from channels.layers import get_channel_layer
+
+    layer = get_channel_layer()
+    group = f"chat_room_bench_{uuid.uuid4().hex}"
+    received: dict[int, list[float]] = {}
+    channels = [await layer.new_channel() for _ in range(members)]  # pyright: ignore[reportOptionalMemberAccess]
+    for channel in channels:
+        await layer.group_add(group, channel)  # pyright: ignore[reportOptionalMemberAccess]
+
+    async def listen(channel: str, recipient: _Recipient) -> None:
+        while True:
+            await recipient.chat_message(await layer.receive(channel))  # pyright: ignore[reportOptionalMemberAccess]
+
+    listeners = [asyncio.create_task(listen(channel, _Recipient(received))) for channel in channels]
+    for seq in range(messages):
+        await layer.group_send(group, _event(seq))  # pyright: ignore[reportOptionalMemberAccess]
+        await _wait_all(received, seq + 1, members, timeout)
+
+    for task in listeners:
+        task.cancel()
+    for channel in channels:
+        await layer.group_discard(group, channel)  # pyright: ignore[reportOptionalMemberAccess]
+    return received
+
+
+async def _pubsub(members: int, messages: int, timeout: float) -> dict[int, list[float]]:
+    from apps.messaging.fanout import local_fanout, publish_local
+
+    room = f"bench-{uuid.uuid4().hex}"
+    received: dict[int, list[float]] = {}
+    recipients = [_Recipient(received) for _ in range(members)]
+    for recipient in recipients:
+        await local_fanout.subscribe(room, recipient)
+
+    for seq in range(messages):
+        await publish_local(room, _event(seq))
+        await _wait_all(received, seq + 1, members, timeout)
+
+    for recipient in recipients:
+        await local_fanout.unsubscribe(room, recipient)
+    await local_fanout.close()
+    return received
+
+
+def _report(name: str, members: int, received: dict[int, list[float]]) -> None:
+    every = [latency for latencies in received.values() for latency in latencies]
+    last = [max(latencies) for latencies in received.values()]
+    print(f"{name:<7} members={members:<6} delivered={len(every):<8} recipient {format_ms(percentiles(every))}"
+          f" | whole group p99={percentiles(last)['p99'] * 1000:.2f}ms")
+
+
+async def _run(args: argparse.Namespace) -> None:
+    for members in args.members:
+        for name, run in (("group", _group), ("pubsub", _pubsub)):
+            _report(name, members, await run(members, args.messages, args.timeout))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=30, help="ожидание доставки одного сообщения, с")
+    args = parser.parse_args()
+
+    setup_django()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Нагрузочный тест лимитера: решений в секунду и задержка одного решения.
+
+--concurrency корутин бьют в --keys ключей (горячие IP/пользователи). Сравниваются
+Lua-скрипты apps.utils.ratelimit и прежняя схема GET + SET (блокировка чата),
+которая занимает два запроса и под конкуренцией пропускает лишние попытки.
+
+    cd backend && python -m bench.ratelimit --decisions 50000 --concurrency 200 --keys 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable
+
+from bench.utils import format_ms, percentiles, setup_django
+
+
+async def _legacy_lock(redis, key: str) -> bool:
+    if await redis.get(key):
+        return False
+    await redis.set(key, "locked", ex=60)
+    return True
+
+
+async def _run(name: str, decide: Callable[[str], Awaitable[bool]], args: argparse.Namespace) -> None:
+    latencies: list[float] = []
+    allowed = 0
+    per_worker = args.decisions // args.concurrency
+
+    async def worker() -> None:
+        nonlocal allowed
+        for _ in range(per_worker):
+            key = f"bench:ratelimit:{name}:{random.randrange(args.keys)}"
+            started = time.perf_counter()
+            ok = await decide(key)
+            latencies.append(time.perf_counter() - started)
+            allowed += ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{name:<15} {len(latencies) / elapsed:>9.0f} decisions/s  allowed={allowed:<6} {format_ms(percentiles(latencies))}")
+
+
+async def _bench(args: argparse.Namespace) -> None:
+    from apps.utils.ratelimit import SlidingWindow, TokenBucket, get_async_rate_limiter
+    from config.async_redis import AsyncRedisClient
+
+    redis = await AsyncRedisClient.initialize()
+    limiter = await get_async_rate_limiter()
+    window = SlidingWindow(limit=1, window=60)
+    bucket = TokenBucket(rate=1 / 60, capacity=1)
+
+    async def sliding(key: str) -> bool:
+        return (await limiter.hit(key, window)).allowed
+
+    async def token_bucket(key: str) -> bool:
+        return (await limiter.hit(key, bucket)).allowed
+
+    print(f"decisions={args.decisions} concurrency={args.concurrency} keys={args.keys} (ожидаемо allowed={args.keys})")
+    for name, decide in (
+        ("legacy_get_set", lambda key: _legacy_lock(redis, key)),
+        ("sliding_window", sliding),
+        ("token_bucket", token_bucket),
+    ):
+        await redis.delete(*[f"bench:ratelimit:{name}:{i}" for i in range(args.keys)])
+        await _run(name, decide, args)
+        await redis.delete(*[f"bench:ratelimit:{name}:{i}" for i in range(args.keys)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decisions", type=int, default=50_000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--keys", type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    asyncio.run(_bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import os
+import resource
+import statistics
+from typing import Iterable
+
+
+def setup_django() -> None:
+    """
+    Инициализация Django для запуска бенчмарков как обычных скриптов:
+
+        cd backend && python -m bench.<name> --help
+    """
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+
+
+def percentiles(values: Iterable[float], points: Iterable[int] = (50, 95, 99)) -> dict[str, float]:
+    data = sorted(values)
+    if not data:
+        return {f"p{point}": 0.0 for point in points}
+    if len(data) == 1:
+        return {f"p{point}": data[0] for point in points}
+    cuts = statistics.quantiles(data, n=100, method="inclusive")
+    return {f"p{point}": cuts[point - 1] for point in points}
+
+
+def format_ms(stats: dict[str, float]) -> str:
+    return " ".join(f"{name}={value * 1000:.2f}ms" for name, value in stats.items())
+
+
+def rss_bytes() -> int:
+    """
+    Текущий RSS процесса (Linux: /proc/self/statm); иначе — пиковый по getrusage.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -2,7 +2,6 @@ import logging
 import os
 
 from asgiref.compatibility import guarantee_single_callable
-from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from config.taskiq_app import scheduler, taskiq_broker
 from django.core.asgi import get_asgi_application
@@ -22,6 +21,10 @@ async def startup():
 
 async def shutdown():
     """Действия при завершении приложения."""
+    from apps.messaging.persistence import message_buffer
+
+    await message_buffer.close()
+    logger.info("Буфер сообщений чата записан.")
     if taskiq_broker.is_worker_process:
         await scheduler.shutdown()
     logger.info("Taskiq is shutdown.")
@@ -29,6 +32,7 @@ async def shutdown():
 
 def get_application():
     from apps.messaging.routing import websocket_urlpatterns
+    from apps.users.middleware import JWTAuthMiddlewareStack
 
     class LifespanMiddleware:
         def __init__(self, app):
@@ -69,7 +73,7 @@ def get_application():
 
     return LifespanMiddleware(ProtocolTypeRouter({
         'http': application,
-        'websocket': AuthMiddlewareStack(
+        'websocket': JWTAuthMiddlewareStack(
             URLRouter(
                 websocket_urlpatterns
             )
@@ -230,7 +230,7 @@ S3_CLIENT = boto3.client(
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.users.authentication.CachedJWTAuthentication",
         "rest_framework.authentication.BasicAuthentication",  # убрать в проде
     ],
     "DEFAULT_PERMISSION_CLASSES": (
@@ -248,6 +248,10 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "PAGE_SIZE": 20,
+    "DEFAULT_THROTTLE_CLASSES": (
+        "apps.utils.throttling.RedisAnonRateThrottle",
+        "apps.utils.throttling.RedisUserRateThrottle",
+    ),
     "DEFAULT_THROTTLE_RATES": {
         "anon": "100/day",
         "user": "1000/day",
@@ -265,7 +269,19 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
+
+    # чёрный список refresh — в Redis (apps.users.blacklist); таблицы token_blacklist только читаются,
+    # пока включён AUTH_JWT_BLACKLIST_DB_FALLBACK
+    "TOKEN_REFRESH_SERIALIZER": "apps.users.serializers.TokenRefreshSerializer",
 }
+# Снимок пользователя для аутентификации по JWT (DRF и сокеты): секунд в Redis,
+# секунд и записей в LRU процесса перед Redis
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 60))
+AUTH_USER_LOCAL_CACHE_TTL = float(os.getenv("AUTH_USER_LOCAL_CACHE_TTL", 5))
+AUTH_USER_LOCAL_CACHE_SIZE = int(os.getenv("AUTH_USER_LOCAL_CACHE_SIZE", 10_000))
+# Проверять отозванные refresh ещё и в таблицах token_blacklist (запрос в БД на каждый refresh);
+# выключить (0) после python manage.py import_jwt_blacklist — дальше только Redis EXISTS
+AUTH_JWT_BLACKLIST_DB_FALLBACK = os.getenv("AUTH_JWT_BLACKLIST_DB_FALLBACK", "1") == "1"
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "Мир Странствий API",
@@ -293,6 +309,77 @@ pool = redis.ConnectionPool(
 )
 REDIS_CLIENT = redis.Redis(connection_pool=pool)
 
+# CHANNELS
+# Несколько Redis через запятую: channels_redis шардирует группы (chat_room_<id>) и каналы
+# консистентным хешем по имени, так что комнаты распределяются между инстансами.
+CHANNEL_REDIS_HOSTS = [
+    url.strip()
+    for url in os.getenv("CHANNEL_REDIS_HOSTS", f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/2").split(",")
+    if url.strip()
+]
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {
+            "hosts": CHANNEL_REDIS_HOSTS,
+            "prefix": "world",
+            # общий лимит очереди канала (служебные каналы, воркеры taskiq)
+            "capacity": int(os.getenv("CHANNEL_LAYER_CAPACITY", 1000)),
+            "channel_capacity": {
+                # каналы websocket-соединений: клиент, который перестал читать,
+                # не должен копить тысячи кадров — лишнее отбрасывается
+                "specific.*": int(os.getenv("CHANNEL_LAYER_SOCKET_CAPACITY", 200)),
+            },
+            # чат — real-time: кадр старше 10 секунд доставлять уже бессмысленно
+            "expiry": int(os.getenv("CHANNEL_LAYER_EXPIRY", 10)),
+            "group_expiry": int(os.getenv("CHANNEL_LAYER_GROUP_EXPIRY", 86400)),
+        },
+    },
+}
+
+# CHAT
+# TTL кеша метаданных/участников комнаты в Redis (сбрасывается сигналами при изменениях)
+CHAT_ROOM_CACHE_TTL = int(os.getenv("CHAT_ROOM_CACHE_TTL", 3600))
+# Отложенная запись сообщений (только PostgreSQL): рассылка до INSERT, запись пачками
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "0") == "1"
+CHAT_WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("CHAT_WRITE_BEHIND_FLUSH_INTERVAL", 0.05))
+CHAT_WRITE_BEHIND_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BEHIND_BATCH_SIZE", 200))
+CHAT_MESSAGE_ID_BLOCK = int(os.getenv("CHAT_MESSAGE_ID_BLOCK", 100))
+# Догрузка пропущенного после переподключения (?since=<seq>)
+CHAT_REPLAY_BUFFER_SIZE = int(os.getenv("CHAT_REPLAY_BUFFER_SIZE", 200))
+CHAT_REPLAY_BUFFER_TTL = int(os.getenv("CHAT_REPLAY_BUFFER_TTL", 86400))
+CHAT_REPLAY_MAX_EVENTS = int(os.getenv("CHAT_REPLAY_MAX_EVENTS", 500))
+# Номер, выданный, но ещё не попавший в буфер, дольше стольких секунд считается потерянным
+CHAT_REPLAY_PENDING_TIMEOUT = float(os.getenv("CHAT_REPLAY_PENDING_TIMEOUT", 10))
+# Присутствие и «печатает»: сигнал живости не чаще HEARTBEAT, запись живёт TTL секунд
+CHAT_PRESENCE_TTL = int(os.getenv("CHAT_PRESENCE_TTL", 90))
+CHAT_PRESENCE_HEARTBEAT = int(os.getenv("CHAT_PRESENCE_HEARTBEAT", 30))
+CHAT_PRESENCE_BATCH_INTERVAL = float(os.getenv("CHAT_PRESENCE_BATCH_INTERVAL", 0.25))
+CHAT_TYPING_TIMEOUT = float(os.getenv("CHAT_TYPING_TIMEOUT", 5))
+# Общий сокет пользователя (ws/chat/): предел одновременных подписок на комнаты
+CHAT_MUX_MAX_ROOMS = int(os.getenv("CHAT_MUX_MAX_ROOMS", 500))
+# Исходящая очередь сокета: при переполнении "close" — закрыть с кодом 4008, "drop" — выбросить самый старый кадр
+CHAT_SEND_QUEUE_SIZE = int(os.getenv("CHAT_SEND_QUEUE_SIZE", 256))
+CHAT_SEND_QUEUE_POLICY = os.getenv("CHAT_SEND_QUEUE_POLICY", "close")
+# Большие комнаты (от THRESHOLD участников, 0 — выключено): вместо group_send на каждый канал —
+# один топик Redis pub/sub на комнату, воркер раздаёт событие своим сокетам сам
+CHAT_LARGE_ROOM_THRESHOLD = int(os.getenv("CHAT_LARGE_ROOM_THRESHOLD", 1000))
+# Бот: сообщение с префиксом TRIGGER уходит в taskiq, ответ стримится в комнату кусками
+# не чаще FLUSH_INTERVAL секунд или по FLUSH_CHARS символов; GENERATOR — "fake" или "openai".
+# Пустой TRIGGER (по умолчанию) — бот выключен
+CHAT_BOT_TRIGGER = os.getenv("CHAT_BOT_TRIGGER", "")
+CHAT_BOT_GENERATOR = os.getenv("CHAT_BOT_GENERATOR", "fake")
+CHAT_BOT_EMAIL = os.getenv("CHAT_BOT_EMAIL", "bot@localhost")
+CHAT_BOT_DISPLAY_NAME = os.getenv("CHAT_BOT_DISPLAY_NAME", "Бот")
+CHAT_BOT_FLUSH_INTERVAL = float(os.getenv("CHAT_BOT_FLUSH_INTERVAL", 0.05))
+CHAT_BOT_FLUSH_CHARS = int(os.getenv("CHAT_BOT_FLUSH_CHARS", 64))
+CHAT_BOT_API_BASE_URL = os.getenv("CHAT_BOT_API_BASE_URL") or None
+CHAT_BOT_API_KEY = os.getenv("CHAT_BOT_API_KEY")
+CHAT_BOT_MODEL = os.getenv("CHAT_BOT_MODEL", "gpt-4o-mini")
+# Помесячные партиции ChatMessage (PostgreSQL): AHEAD месяцев создаются заранее,
+# партиции старше RETENTION_DAYS["chat_message"] отсоединяются и выгружаются в хранилище dbbackup
+CHAT_PARTITION_MONTHS_AHEAD = int(os.getenv("CHAT_PARTITION_MONTHS_AHEAD", 3))
+
 # CACHE BACKEND
 CACHES = {
     'default': {
@@ -304,6 +391,22 @@ CACHES = {
     }
 }
 
+# RETENTION
+# Сколько дней хранить строки; 0 — политика выключена (для jwt_token — удалять сразу после истечения).
+# Удаление пользовательских данных необратимо, поэтому по умолчанию всё выключено — включается явно
+# через окружение (например, RETENTION_ACTIVITY_DAYS=180, RETENTION_COMPLAINT_DAYS=365).
+# chat_message на партиционированной таблице соблюдает maintain_chat_partitions целыми месяцами,
+# построчная политика — только без партиций.
+RETENTION_DAYS = {
+    "activity": int(os.getenv("RETENTION_ACTIVITY_DAYS", 0)),
+    "chat_message": int(os.getenv("RETENTION_CHAT_MESSAGE_DAYS", 0)),
+    "complaint": int(os.getenv("RETENTION_COMPLAINT_DAYS", 0)),
+    "jwt_token": int(os.getenv("RETENTION_JWT_TOKEN_DAYS", 0)),
+}
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 1000))
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", 0.2))
+RETENTION_MAX_ROWS_PER_RUN = int(os.getenv("RETENTION_MAX_ROWS_PER_RUN", 200_000))
+
 DEFENDER_REDIS_URL = REDIS_URL
 DEFENDER_COOLOFF_TIME = 600
 DEFENDER_LOCKOUT_URL = "/block/"
@@ -4,7 +4,7 @@ import os
 
 import django
 from django.conf import settings
-from taskiq import TaskiqScheduler
+from taskiq import TaskiqEvents, TaskiqScheduler, TaskiqState
 from taskiq.schedule_sources import LabelScheduleSource
 from taskiq_redis import ListQueueBroker, ListRedisScheduleSource, RedisAsyncResultBackend
 
@@ -61,6 +61,18 @@ def create_scheduler(queue_name: str, schedule_prefix: str, pool_size: int = 1)
 taskiq_broker, scheduler, redis_source = create_scheduler("taskiq", "schedule", pool_size=10)
 
 
+@taskiq_broker.on_event(TaskiqEvents.WORKER_SHUTDOWN)
+async def flush_chat_messages(state: TaskiqState) -> None:
+    """
+    Дописывает буфер сообщений чата при остановке воркера: ответы бота
+    с включённым CHAT_WRITE_BEHIND копятся в памяти процесса воркера.
+    """
+    from apps.messaging.persistence import message_buffer
+
+    await message_buffer.close()
+    logger.info("Буфер сообщений чата записан.")
+
+
 __all__ = [
     "taskiq_broker",
     "scheduler",
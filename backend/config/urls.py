@@ -16,7 +16,7 @@ urlpatterns = [
     # path("api/", include("apps.places.urls")),
     # path("api/", include("apps.trips.urls")),
     # path("api/", include("apps.reviews.urls")),
-    # path("api/", include("apps.messaging.urls")),
+    path("api/", include("apps.messaging.urls")),
     # path("api/", include("apps.social.urls")),
     # path("api/", include("apps.complaints.urls")),
 
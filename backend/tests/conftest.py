@@ -1,11 +1,24 @@
 from __future__ import annotations
 
-from typing import Generator
+from typing import Any, AsyncGenerator, Callable, Generator
 
 import pytest
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 
+from apps.messaging.models import ChatRoom, ChatRoomParticipant
+from apps.messaging.presence import PresenceBatcher
+from apps.messaging.presence import presence_batcher as global_presence_batcher
+from apps.messaging.routing import websocket_urlpatterns
+from apps.users.cache import local_snapshots
+from config.async_redis import AsyncRedisClient
+
+User = get_user_model()
+
 
 @pytest.fixture
 def sync_redis_client() -> Generator:
@@ -29,9 +42,110 @@ def sync_redis_client() -> Generator:
         client.flushdb()
 
 
+@pytest.fixture(autouse=True)
+def clear_local_user_snapshots() -> Generator:
+    """
+    LRU снимков пользователей живёт в процессе: id пользователей между тестами повторяются.
+    """
+    local_snapshots.clear()
+    yield
+    local_snapshots.clear()
+
+
 @pytest.fixture
 def api_client() -> APIClient:
     """
     DRF APIClient для запросов к endpoint’ам.
     """
     return APIClient()
+
+
+@pytest.fixture
+async def async_redis_client(sync_redis_client) -> AsyncGenerator:
+    """
+    AsyncRedisClient, привязанный к event loop текущего теста.
+
+    Клиент хранится на уровне класса, а соединения redis.asyncio живут в своём loop,
+    поэтому между тестами его пересоздаём.
+    """
+    AsyncRedisClient._client = None  # pyright: ignore[reportAttributeAccessIssue]
+    client = await AsyncRedisClient.initialize()
+    try:
+        yield client
+    finally:
+        await client.aclose()
+        AsyncRedisClient._client = None  # pyright: ignore[reportAttributeAccessIssue]
+
+
+@pytest.fixture
+def in_memory_channel_layer(settings) -> None:
+    """
+    Channel layer в памяти процесса — для тестов consumer’ов через WebsocketCommunicator.
+    """
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+@pytest.fixture
+async def presence_batcher(async_redis_client) -> AsyncGenerator[PresenceBatcher, None]:
+    """
+    Общий батчер присутствия; отложенные рассылки отменяются до закрытия event loop теста.
+    """
+    yield global_presence_batcher
+    await global_presence_batcher.close()
+
+
+@pytest.fixture
+def create_user() -> Callable:
+    """
+    await create_user("name@example.com") — пользователь с display_name из email.
+    """
+
+    @database_sync_to_async
+    def create(email: str) -> Any:
+        return User.objects.create(email=email, display_name=email.split("@")[0])
+
+    return create
+
+
+@pytest.fixture
+def create_room() -> Callable:
+    """
+    await create_room(*users, name=...) — групповая комната с участниками.
+    """
+
+    @database_sync_to_async
+    def create(*members: Any, name: str = "test") -> ChatRoom:
+        room = ChatRoom.objects.create(type=ChatRoom.RoomType.GROUP, name=name)
+        for member in members:
+            ChatRoomParticipant.objects.create(room=room, user=member)
+        return room
+
+    return create
+
+
+@pytest.fixture
+def create_members(create_user, create_room) -> Callable:
+    """
+    await create_members(*emails, name=...) — новые пользователи в новой комнате: (room, users).
+    """
+
+    async def create(*emails: str, name: str = "test") -> tuple[ChatRoom, list]:
+        users = [await create_user(email) for email in emails]
+        return await create_room(*users, name=name), users
+
+    return create
+
+
+@pytest.fixture
+def make_communicator() -> Callable:
+    """
+    Сокет чата от имени user: ws/chat/<room_id>/ или, без room_id, общий ws/chat/.
+    """
+
+    def make(user: Any, room_id: Any = None, query: str = "", subprotocols: list[str] | None = None) -> WebsocketCommunicator:
+        path = f"/ws/chat/{room_id}/" if room_id is not None else "/ws/chat/"
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), path + query, subprotocols=subprotocols)
+        communicator.scope["user"] = user
+        return communicator
+
+    return make
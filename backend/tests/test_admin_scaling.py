@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.messaging.models import ChatMessage, ChatRoom, ChatRoomParticipant
+from apps.utils.admin import EstimatedCountPaginator, estimate_count
+
+User = get_user_model()
+
+
+def _room(owner, name: str, members: int = 3, messages: int = 0) -> ChatRoom:
+    room = ChatRoom.objects.create(type=ChatRoom.RoomType.GROUP, name=name, owner=owner)
+    users = [User.objects.create(email=f"{name}-{i}@example.com", display_name=f"{name}{i}") for i in range(members)]
+    ChatRoomParticipant.objects.bulk_create(ChatRoomParticipant(room=room, user=user) for user in users)
+    ChatMessage.objects.bulk_create(ChatMessage(room=room, sender=owner, text=f"{name} #{i}") for i in range(messages))
+    return room
+
+
+def _changelist_queries(client, url: str) -> int:
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get(url).status_code == 200
+    return len(queries)
+
+
+@pytest.mark.django_db
+def test_room_changelist_queries_do_not_grow_with_rows(admin_client, admin_user):
+    url = reverse("admin:messaging_chatroom_changelist")
+    _room(admin_user, "first")
+    few = _changelist_queries(admin_client, url)
+    for i in range(5):
+        _room(admin_user, f"more{i}")
+    assert _changelist_queries(admin_client, url) == few
+
+
+@pytest.mark.django_db
+def test_participants_count_is_annotated(admin_client, admin_user):
+    _room(admin_user, "counted", members=4)
+    response = admin_client.get(reverse("admin:messaging_chatroom_changelist"))
+    assert response.context["cl"].result_list[0].participants_total == 4
+
+
+@pytest.mark.django_db
+def test_autocomplete_filter_does_not_list_related_rows(admin_client, admin_user):
+    first = _room(admin_user, "alpha", members=0, messages=2)
+    _room(admin_user, "bravo", members=0, messages=3)
+    url = reverse("admin:messaging_chatmessage_changelist")
+
+    response = admin_client.get(url, {"room__id__exact": str(first.pk)})
+    assert response.status_code == 200
+    assert response.context["cl"].result_count == 2
+    content = response.content.decode()
+    assert 'class="autocomplete-filter"' in content
+    assert "bravo" not in content
+
+
+@pytest.mark.django_db
+def test_message_inline_is_limited(admin_client, admin_user):
+    room = _room(admin_user, "chatty", members=0, messages=30)
+    response = admin_client.get(reverse("admin:messaging_chatroom_change", args=[room.pk]))
+    assert response.status_code == 200
+    assert 'name="messages-TOTAL_FORMS" value="20"' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_paginator_counts_exactly_below_estimate_threshold(admin_user):
+    _room(admin_user, "small", members=0, messages=5)
+    paginator = EstimatedCountPaginator(ChatMessage.objects.order_by("pk"), 2)
+    assert paginator.count == 5
+    if connection.vendor != "postgresql":
+        assert estimate_count(ChatMessage.objects.all()) is None
@@ -5,6 +5,7 @@ from typing import Any
 import pytest
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from drf_spectacular.generators import SchemaGenerator
 from rest_framework_simplejwt.tokens import AccessToken
 
 from apps.users.redis_code import CodeManager
@@ -12,8 +13,8 @@ from apps.users.redis_code import CodeManager
 User = get_user_model()
 
 
-@pytest.mark.django_db
-def test_request_code_success(api_client, sync_redis_client, monkeypatch):
+@pytest.mark.django_db(transaction=True)
+async def test_request_code_success(async_client, async_redis_client, sync_redis_client, monkeypatch):
     """
     Успешный запрос кода:
     - 200 OK
@@ -24,7 +25,7 @@ def test_request_code_success(api_client, sync_redis_client, monkeypatch):
 
     sent_emails: list[dict[str, Any]] = []
 
-    def fake_send_activation_email(*, email: str, code: str) -> None:
+    async def fake_send_activation_email(*, email: str, code: str) -> None:
         sent_emails.append({"email": email, "code": code})
 
     monkeypatch.setattr(auth_views, "send_activation_email", fake_send_activation_email)
@@ -32,10 +33,10 @@ def test_request_code_success(api_client, sync_redis_client, monkeypatch):
     url = reverse("auth-request-code")
     payload = {"email": "TestUser@Example.COM"}
 
-    response = api_client.post(url, payload, format="json", REMOTE_ADDR="1.2.3.4")
+    response = await async_client.post(url, payload, content_type="application/json", REMOTE_ADDR="1.2.3.4")
 
     assert response.status_code == 200
-    assert "Код отправлен" in response.data["detail"]
+    assert "Код отправлен" in response.json()["detail"]
 
     key = "login_code:testuser@example.com"
     stored = sync_redis_client.get(key)
@@ -49,42 +50,68 @@ def test_request_code_success(api_client, sync_redis_client, monkeypatch):
     )
 
 
-@pytest.mark.django_db
-def test_request_code_invalid_payload(api_client, sync_redis_client):
+@pytest.mark.django_db(transaction=True)
+async def test_request_code_invalid_payload(async_client, async_redis_client, sync_redis_client):
     """
     Пустые данные / отсутствие email → 400.
     """
     url = reverse("auth-request-code")
 
-    response = api_client.post(url, {}, format="json")
+    response = await async_client.post(url, {}, content_type="application/json")
     assert response.status_code == 400
-    assert "email" in response.data
+    assert "email" in response.json()
 
 
-@pytest.mark.django_db
-def test_request_code_rate_limit_by_ip(api_client, sync_redis_client, monkeypatch):
+@pytest.mark.django_db(transaction=True)
+async def test_request_code_malformed_json(async_client, async_redis_client, sync_redis_client):
+    """
+    Битый JSON разбирает парсер DRF → 400 с его сообщением.
+    """
+    url = reverse("auth-request-code")
+
+    response = await async_client.post(url, "{", content_type="application/json")
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("JSON parse error")
+
+
+def test_auth_code_endpoints_in_schema():
+    """
+    Async-view остаются APIView: drf_spectacular видит оба endpoint’а.
+    """
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    operations = {path: item for path, item in schema["paths"].items() if path.startswith("/auth/")}
+
+    assert "requestBody" in operations["/auth/request-code/"]["post"]
+    assert "requestBody" in operations["/auth/verify-code/"]["post"]
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_request_code_rate_limit_by_ip(async_client, async_redis_client, sync_redis_client, monkeypatch):
     """
     Превышение лимита запросов кода по IP → 429.
     """
     from apps.users import views as auth_views
 
-    monkeypatch.setattr(auth_views, "send_activation_email", lambda *args, **kwargs: None)
+    async def fake_send_activation_email(*args, **kwargs) -> None:
+        return None
+
+    monkeypatch.setattr(auth_views, "send_activation_email", fake_send_activation_email)
 
     url = reverse("auth-request-code")
     payload = {"email": "user@example.com"}
 
     # max_attempts=3 → первые 3 раз — 200, 4-й — 429
     for i in range(3):
-        resp = api_client.post(url, payload, format="json", REMOTE_ADDR="5.6.7.8")
+        resp = await async_client.post(url, payload, content_type="application/json", REMOTE_ADDR="5.6.7.8")
         assert resp.status_code == 200
 
-    resp4 = api_client.post(url, payload, format="json", REMOTE_ADDR="5.6.7.8")
+    resp4 = await async_client.post(url, payload, content_type="application/json", REMOTE_ADDR="5.6.7.8")
     assert resp4.status_code == 429
-    assert "Повторный запрос кода" in resp4.data["detail"]
+    assert "Повторный запрос кода" in resp4.json()["detail"]
 
 
-@pytest.mark.django_db
-def test_verify_code_success_creates_user_and_returns_tokens(api_client, sync_redis_client):
+@pytest.mark.django_db(transaction=True)
+async def test_verify_code_success_creates_user_and_returns_tokens(async_client, async_redis_client, sync_redis_client):
     """
     Успешная верификация:
     - пользователь создаётся,
@@ -101,11 +128,11 @@ def test_verify_code_success_creates_user_and_returns_tokens(api_client, sync_re
     url = reverse("auth-verify-code")
     payload = {"email": email, "code": "123456"}
 
-    response = api_client.post(url, payload, format="json", REMOTE_ADDR="10.0.0.1")
+    response = await async_client.post(url, payload, content_type="application/json", REMOTE_ADDR="10.0.0.1")
 
     assert response.status_code == 200
 
-    data = response.data
+    data = response.json()
     assert "access" in data
     assert "refresh" in data
     assert "user" in data
@@ -113,7 +140,7 @@ def test_verify_code_success_creates_user_and_returns_tokens(api_client, sync_re
     user_data = data["user"]
     assert user_data["email"] == email
 
-    user = User.objects.get(email=email)
+    user = await User.objects.aget(email=email)
     assert getattr(user, "email_confirmed", False) is True
 
     # Проверяем, что в access-токене есть нужные клеймы
@@ -122,14 +149,14 @@ def test_verify_code_success_creates_user_and_returns_tokens(api_client, sync_re
     assert token.get("display_name") == user.display_name or user.email
 
 
-@pytest.mark.django_db
-def test_verify_code_existing_user_email_confirmed_toggle(api_client, sync_redis_client):
+@pytest.mark.django_db(transaction=True)
+async def test_verify_code_existing_user_email_confirmed_toggle(async_client, async_redis_client, sync_redis_client):
     """
     Если пользователь уже существует с email_confirmed=False,
     verify-code должен выставить email_confirmed=True и не создавать дубликат.
     """
     email = "existing@example.com"
-    user = User.objects.create(
+    user = await User.objects.acreate(
         email=email,
         display_name="Existing",
         email_confirmed=False,
@@ -142,18 +169,18 @@ def test_verify_code_existing_user_email_confirmed_toggle(api_client, sync_redis
     url = reverse("auth-verify-code")
     payload = {"email": email, "code": "123456"}
 
-    response = api_client.post(url, payload, format="json", REMOTE_ADDR="11.11.11.11")
+    response = await async_client.post(url, payload, content_type="application/json", REMOTE_ADDR="11.11.11.11")
 
     assert response.status_code == 200
 
-    user.refresh_from_db()
+    await user.arefresh_from_db()
     assert user.email_confirmed is True
     # Убедимся, что не появился второй пользователь
-    assert User.objects.filter(email=email).count() == 1
+    assert await User.objects.filter(email=email).acount() == 1
 
 
-@pytest.mark.django_db
-def test_verify_code_invalid_code(api_client, sync_redis_client):
+@pytest.mark.django_db(transaction=True)
+async def test_verify_code_invalid_code(async_client, async_redis_client, sync_redis_client):
     """
     Неверный код → 400 + code=invalid_code.
     """
@@ -166,18 +193,18 @@ def test_verify_code_invalid_code(api_client, sync_redis_client):
     url = reverse("auth-verify-code")
     payload = {"email": email, "code": "000000"}
 
-    response = api_client.post(url, payload, format="json", REMOTE_ADDR="12.12.12.12")
+    response = await async_client.post(url, payload, content_type="application/json", REMOTE_ADDR="12.12.12.12")
 
     assert response.status_code == 400
-    assert response.data["code"] == "invalid_code"
-    assert "Неверный или истёкший код" in response.data["detail"]
+    assert response.json()["code"] == "invalid_code"
+    assert "Неверный или истёкший код" in response.json()["detail"]
 
     # Код при этом не должен удаляться
     assert manager.get_code(key) == "123456"
 
 
-@pytest.mark.django_db
-def test_verify_code_missing_redis_code(api_client, sync_redis_client):
+@pytest.mark.django_db(transaction=True)
+async def test_verify_code_missing_redis_code(async_client, async_redis_client, sync_redis_client):
     """
     Код в Redis отсутствует (истёк или не создавался) → 400 invalid_code.
     """
@@ -188,14 +215,14 @@ def test_verify_code_missing_redis_code(api_client, sync_redis_client):
     url = reverse("auth-verify-code")
     payload = {"email": email, "code": "123456"}
 
-    response = api_client.post(url, payload, format="json", REMOTE_ADDR="13.13.13.13")
+    response = await async_client.post(url, payload, content_type="application/json", REMOTE_ADDR="13.13.13.13")
 
     assert response.status_code == 400
-    assert response.data["code"] == "invalid_code"
+    assert response.json()["code"] == "invalid_code"
 
 
-@pytest.mark.django_db
-def test_verify_code_too_many_attempts(api_client, sync_redis_client):
+@pytest.mark.django_db(transaction=True)
+async def test_verify_code_too_many_attempts(async_client, async_redis_client, sync_redis_client):
     """
     Превышение лимита попыток ввода кода → 429 + code=too_many_attempts.
     """
@@ -209,13 +236,13 @@ def test_verify_code_too_many_attempts(api_client, sync_redis_client):
     # на 6-й раз is_request_limited=True → 429.
     statuses: list[int] = []
     for i in range(5):
-        resp = api_client.post(url, payload, format="json", REMOTE_ADDR="14.14.14.14")
+        resp = await async_client.post(url, payload, content_type="application/json", REMOTE_ADDR="14.14.14.14")
         statuses.append(resp.status_code)
         # Должно быть 400 invalid_code
         assert resp.status_code == 400
-        assert resp.data["code"] == "invalid_code"
+        assert resp.json()["code"] == "invalid_code"
 
-    resp6 = api_client.post(url, payload, format="json", REMOTE_ADDR="14.14.14.14")
+    resp6 = await async_client.post(url, payload, content_type="application/json", REMOTE_ADDR="14.14.14.14")
     assert resp6.status_code == 429
-    assert resp6.data["code"] == "too_many_attempts"
-    assert "Превышен лимит попыток" in resp6.data["detail"]
+    assert resp6.json()["code"] == "too_many_attempts"
+    assert "Превышен лимит попыток" in resp6.json()["detail"]
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from apps.users import cache
+from apps.users.authentication import CachedJWTAuthentication
+from apps.users.cache import LocalSnapshotCache, forget_user, get_user, local_snapshots, user_cache_key
+from apps.users.tokens import VersionedRefreshToken, add_profile_claims
+
+User = get_user_model()
+
+pytestmark = [pytest.mark.django_db(transaction=True), pytest.mark.usefixtures("sync_redis_client")]
+
+
+@pytest.fixture
+def user():
+    return User.objects.create(email="cached@example.com", display_name="cached")
+
+
+def access_for(user, claims: bool = False):
+    access = VersionedRefreshToken.for_user(user).access_token
+    if claims:
+        add_profile_claims(access, user)
+    return access
+
+
+def test_user_is_loaded_once(user, django_assert_num_queries):
+    auth = CachedJWTAuthentication()
+    token = access_for(user)
+    with django_assert_num_queries(1):
+        assert auth.get_user(token).pk == user.pk
+    with django_assert_num_queries(0):
+        assert auth.get_user(token).display_name == "cached"
+    # другой процесс: LRU пуст, снимок берётся из Redis
+    local_snapshots.clear()
+    with django_assert_num_queries(0):
+        assert auth.get_user(token).pk == user.pk
+
+
+def test_save_invalidates_snapshot(user):
+    auth = CachedJWTAuthentication()
+    token = access_for(user)
+    auth.get_user(token)
+
+    user.display_name = "renamed"
+    user.save()
+    assert auth.get_user(token).display_name == "renamed"
+
+    user.is_active = False
+    user.save()
+    with pytest.raises(AuthenticationFailed):
+        auth.get_user(token)
+
+
+def test_load_does_not_overwrite_concurrent_invalidation(user, sync_redis_client, monkeypatch):
+    """
+    Сброс снимка между чтением из БД и записью в Redis: устаревший снимок не записывается.
+    """
+    load_snapshot = cache._load_snapshot
+
+    def racing_load(user_id):
+        snapshot = load_snapshot(user_id)
+        # on_commit деактивации пришёлся на загрузку
+        User.objects.filter(pk=user_id).update(is_active=False)
+        forget_user(user_id, user.token_version)
+        return snapshot
+
+    monkeypatch.setattr(cache, "_load_snapshot", racing_load)
+    assert get_user(user.pk, user.token_version).pk == user.pk
+    assert not sync_redis_client.exists(user_cache_key(user.pk, user.token_version))
+
+    monkeypatch.setattr(cache, "_load_snapshot", load_snapshot)
+    assert get_user(user.pk, user.token_version) is None
+    assert sync_redis_client.exists(user_cache_key(user.pk, user.token_version))
+
+
+def test_revoked_token_is_rejected(user):
+    auth = CachedJWTAuthentication()
+    token = access_for(user)
+    auth.get_user(token)
+
+    user.revoke_tokens()
+    with pytest.raises(AuthenticationFailed):
+        auth.get_user(token)
+    assert auth.get_user(access_for(user)).pk == user.pk
+
+
+def test_fresh_login_claims_are_trusted(user, settings, django_assert_num_queries):
+    auth = CachedJWTAuthentication()
+    token = access_for(user, claims=True)
+    with django_assert_num_queries(0):
+        assert auth.get_user(token).email == "cached@example.com"
+
+    # старше окна доверия — снимок из БД, а не клеймы
+    token["iat"] = int(time.time() - settings.AUTH_USER_LOCAL_CACHE_TTL - 1)
+    user.display_name = "renamed"
+    user.save()
+    assert auth.get_user(token).display_name == "renamed"
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalSnapshotCache(maxsize=2, ttl=60)
+    cache.set((1, 0), {"id": 1})
+    cache.set((2, 0), {"id": 2})
+    cache.get((1, 0))
+    cache.set((3, 0), {"id": 3})
+    assert list(cache._entries) == [(1, 0), (3, 0)]
+
+
+def test_bearer_request_is_authenticated(api_client, user):
+    url = reverse("chat-inbox")
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_for(user)}")
+    assert api_client.get(url).status_code == 200
+
+    user.revoke_tokens()
+    # 403, а не 401: первой в DEFAULT_AUTHENTICATION_CLASSES стоит SessionAuthentication
+    assert api_client.get(url).status_code == 403
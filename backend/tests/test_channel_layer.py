@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from channels.layers import channel_layers
+from django.conf import settings
+
+
+@pytest.fixture
+async def redis_layers():
+    """
+    Два независимых экземпляра channel layer — как два воркера uvicorn.
+    """
+    first = channel_layers.make_backend("default")
+    second = channel_layers.make_backend("default")
+    try:
+        await first.connection(0).ping()
+    except Exception as exc:  # pragma: no cover - зависит от окружения
+        pytest.skip(f"Redis для channel layer недоступен: {exc!r}")
+    try:
+        yield first, second
+    finally:
+        await first.flush()
+        await second.flush()
+
+
+def test_channel_layer_is_redis_sharded():
+    config = settings.CHANNEL_LAYERS["default"]
+    assert config["BACKEND"] == "channels_redis.core.RedisChannelLayer"
+    assert config["CONFIG"]["hosts"] == settings.CHANNEL_REDIS_HOSTS
+    assert "specific.*" in config["CONFIG"]["channel_capacity"]
+
+
+async def test_group_send_is_delivered_across_workers(redis_layers):
+    """
+    Сокет подписан на группу комнаты в одном воркере, сообщение отправлено из другого.
+    """
+    worker_a, worker_b = redis_layers
+    group = "chat_room_test-cross-worker"
+
+    channel = await worker_a.new_channel()
+    await worker_a.group_add(group, channel)
+
+    await worker_b.group_send(group, {"type": "chat.message", "message": "hello"})
+
+    message = await asyncio.wait_for(worker_a.receive(channel), timeout=5)
+    assert message == {"type": "chat.message", "message": "hello"}
+
+    await worker_a.group_discard(group, channel)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+import pytest
+import respx
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+
+from apps.messaging import consumers
+from apps.messaging.bot import FakeReplyGenerator, OpenAIReplyGenerator, coalesce, stream_bot_reply
+from apps.messaging.models import ChatMessage
+from apps.messaging.services import room_group_name
+
+
+async def tokens(*items: str, delay: float = 0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def collect(iterator) -> list[str]:
+    return [chunk async for chunk in iterator]
+
+
+async def test_coalesce_flushes_by_size() -> None:
+    chunks = await collect(coalesce(tokens("ab", "cd", "ef", "g"), interval=10, max_chars=4))
+    assert chunks == ["abcd", "efg"]
+
+
+async def test_coalesce_flushes_by_time_when_generator_stalls() -> None:
+    async def stalled():
+        yield "a"
+        yield "b"
+        await asyncio.sleep(0.2)
+        yield "c"
+
+    chunks = await collect(coalesce(stalled(), interval=0.05, max_chars=100))
+    assert chunks == ["ab", "c"]
+
+
+@respx.mock
+async def test_openai_generator_streams_deltas(settings) -> None:
+    settings.CHAT_BOT_API_KEY = "test"
+    settings.CHAT_BOT_API_BASE_URL = "http://llm.test/v1"
+    deltas = [{"role": "assistant"}, {"content": "При"}, {"content": "вет"}, {}]
+    body = "".join(
+        f"data: {json.dumps({'id': '1', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'm', 'choices': [{'index': 0, 'delta': delta}]})}\n\n"
+        for delta in deltas
+    )
+    route = respx.post("http://llm.test/v1/chat/completions").mock(
+        return_value=httpx.Response(200, text=body + "data: [DONE]\n\n", headers={"content-type": "text/event-stream"})
+    )
+
+    assert await collect(OpenAIReplyGenerator().stream("привет")) == ["При", "вет"]
+    assert json.loads(route.calls.last.request.content)["stream"] is True
+
+
+async def receive_frames(layer, channel: str) -> list[dict]:
+    frames = []
+    while True:
+        event = await asyncio.wait_for(layer.receive(channel), timeout=1)
+        frames.append(json.loads(event["frames"]["json"]))
+        if frames[-1]["is_end"]:
+            return frames
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("in_memory_channel_layer")
+async def test_stream_bot_reply_persists_once_at_end(async_redis_client, settings, create_members) -> None:
+    settings.CHAT_BOT_FLUSH_CHARS = 10
+    room, _ = await create_members("asker@example.com", name="bot")
+    layer = get_channel_layer()
+    channel = await layer.new_channel()  # pyright: ignore[reportOptionalMemberAccess]
+    await layer.group_add(room_group_name(room.pk), channel)  # pyright: ignore[reportOptionalMemberAccess]
+
+    event = await stream_bot_reply(room.pk, "раз два три четыре", FakeReplyGenerator())
+    frames = await receive_frames(layer, channel)
+
+    chunks, end = frames[:-1], frames[-1]
+    assert len(chunks) > 1
+    assert chunks[0]["is_start"] and not any(frame["is_start"] for frame in chunks[1:])
+    assert all(frame["is_stream"] and frame["seq"] is None for frame in chunks)
+    assert len({frame["stream_id"] for frame in frames}) == 1
+    assert "".join(frame["message"] for frame in chunks) == "Вы написали: раз два три четыре"
+
+    assert event is not None
+    assert end["id"] == event["id"] and end["seq"] == event["seq"] == 1
+    messages = await database_sync_to_async(list)(ChatMessage.objects.filter(room=room).values_list("text", flat=True))
+    assert messages == ["Вы написали: раз два три четыре"]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("in_memory_channel_layer")
+async def test_trigger_enqueues_bot_reply(async_redis_client, monkeypatch, settings, create_members) -> None:
+    settings.CHAT_BOT_TRIGGER = "/bot"
+    room, (user,) = await create_members("asker@example.com", name="bot")
+    enqueued = []
+
+    async def kiq(*args):
+        enqueued.append(args)
+
+    monkeypatch.setattr(consumers.bot_reply, "kiq", kiq)
+    consumer = consumers.ChatConsumer()
+    consumer.scope = {}
+    consumer.bind_user(user)
+    consumer.channel_layer = get_channel_layer()
+
+    await consumer.send_message(str(room.pk), "/bot  привет")
+    assert enqueued == [(str(room.pk), "привет")]
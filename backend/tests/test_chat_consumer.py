@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from channels.db import database_sync_to_async
+
+from apps.messaging import cache
+from apps.messaging.cache import invalidate_room_cache, room_members_key, room_meta_key, warm_room_cache
+
+pytestmark = [
+    pytest.mark.django_db(transaction=True),
+    pytest.mark.usefixtures("in_memory_channel_layer", "presence_batcher"),
+]
+
+
+async def test_connect_member_warms_room_cache(async_redis_client, create_user, create_room, make_communicator):
+    """
+    Первое подключение прогревает кеш комнаты, участник принимается.
+    """
+    user = await create_user("member@example.com")
+    room = await create_room(user)
+
+    communicator = make_communicator(user, room.id)
+    connected, _ = await communicator.connect()
+    assert connected
+
+    assert await async_redis_client.exists(room_meta_key(room.id))
+    assert await async_redis_client.sismember(room_members_key(room.id), str(user.pk))
+
+    await communicator.disconnect()
+
+
+async def test_connect_non_member_is_rejected(async_redis_client, create_user, create_room, make_communicator):
+    member = await create_user("member@example.com")
+    stranger = await create_user("stranger@example.com")
+    room = await create_room(member)
+
+    communicator = make_communicator(stranger, room.id)
+    connected, code = await communicator.connect()
+    assert not connected
+    assert code == 4003
+
+
+async def test_connect_unknown_room_is_rejected(async_redis_client, create_user, make_communicator):
+    user = await create_user("member@example.com")
+
+    communicator = make_communicator(user, uuid.uuid4())
+    connected, code = await communicator.connect()
+    assert not connected
+    assert code == 4004
+
+
+async def test_membership_change_invalidates_cache(async_redis_client, create_user, create_room, make_communicator):
+    """
+    Изменение участников сбрасывает кеш: удалённый участник больше не подключится.
+    """
+    user = await create_user("member@example.com")
+    room = await create_room(user)
+
+    communicator = make_communicator(user, room.id)
+    connected, _ = await communicator.connect()
+    assert connected
+    await communicator.disconnect()
+
+    await database_sync_to_async(room.participants.remove)(user)
+    assert not await async_redis_client.exists(room_members_key(room.id))
+
+    communicator = make_communicator(user, room.id)
+    connected, code = await communicator.connect()
+    assert not connected
+    assert code == 4003
+
+
+async def test_warm_does_not_overwrite_concurrent_invalidation(async_redis_client, monkeypatch, create_user, create_room):
+    """
+    Инвалидация между чтением из БД и записью в Redis: устаревший список не записывается.
+    """
+    user = await create_user("member@example.com")
+    room = await create_room(user)
+    load_room = cache._load_room
+
+    def racing_load(room_id):
+        loaded = load_room(room_id)
+        invalidate_room_cache(room_id)  # on_commit изменения участников пришёлся на прогрев
+        return loaded
+
+    monkeypatch.setattr(cache, "_load_room", racing_load)
+    assert await warm_room_cache(room.id) == [user.pk]
+    assert not await async_redis_client.exists(room_meta_key(room.id))
+
+    monkeypatch.setattr(cache, "_load_room", load_room)
+    assert await warm_room_cache(room.id) == [user.pk]
+    assert await async_redis_client.sismember(room_members_key(room.id), str(user.pk))
+
+
+async def test_message_is_broadcast_to_room(async_redis_client, create_user, create_room, make_communicator):
+    sender = await create_user("sender@example.com")
+    reader = await create_user("reader@example.com")
+    room = await create_room(sender, reader)
+
+    sender_ws = make_communicator(sender, room.id)
+    reader_ws = make_communicator(reader, room.id)
+    assert (await sender_ws.connect())[0]
+    assert (await reader_ws.connect())[0]
+
+    await sender_ws.send_json_to({"message": "привет"})
+    event = await reader_ws.receive_json_from(timeout=2)
+    assert event["message"] == "привет"
+    assert event["display_name"] == "sender"
+
+    await sender_ws.disconnect()
+    await reader_ws.disconnect()
+
+
+async def test_message_rate_limit(async_redis_client, create_user, create_room, make_communicator):
+    """
+    Второе сообщение подряд отклоняется лимитером, в комнату уходит только первое.
+    """
+    sender = await create_user("sender@example.com")
+    room = await create_room(sender)
+
+    communicator = make_communicator(sender, room.id)
+    assert (await communicator.connect())[0]
+
+    await communicator.send_json_to({"message": "раз"})
+    assert (await communicator.receive_json_from(timeout=2))["message"] == "раз"
+
+    await communicator.send_json_to({"message": "два"})
+    error = await communicator.receive_json_from(timeout=2)
+    assert error["error"] is True
+    assert "не чаще" in error["message"]
+    assert await communicator.receive_nothing(timeout=0.2)
+
+    await communicator.disconnect()
+
+
+async def test_non_string_message_is_rejected(async_redis_client, create_user, create_room, make_communicator):
+    """
+    Сообщение не строкой получает ошибку, соединение остаётся открытым.
+    """
+    sender = await create_user("sender@example.com")
+    room = await create_room(sender)
+
+    communicator = make_communicator(sender, room.id)
+    assert (await communicator.connect())[0]
+
+    for message in (5, {"text": "привет"}, ["привет"]):
+        await communicator.send_json_to({"message": message})
+        error = await communicator.receive_json_from(timeout=2)
+        assert error["error"] is True
+        assert error["message"] == "Некорректное сообщение."
+
+    await communicator.send_json_to({"message": "привет"})
+    assert (await communicator.receive_json_from(timeout=2))["message"] == "привет"
+
+    await communicator.disconnect()
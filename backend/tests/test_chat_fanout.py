@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import pytest
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+
+from apps.messaging.fanout import is_large_room, local_fanout
+from apps.messaging.models import ChatRoomParticipant
+from apps.messaging.services import room_group_name
+
+pytestmark = [
+    pytest.mark.django_db(transaction=True),
+    pytest.mark.usefixtures("in_memory_channel_layer"),
+]
+
+
+@pytest.fixture
+async def fanout(async_redis_client, settings):
+    settings.CHAT_LARGE_ROOM_THRESHOLD = 2
+    yield local_fanout
+    await local_fanout.close()
+
+
+async def test_large_room_flag_is_sticky(fanout, create_members):
+    small, _ = await create_members("solo@example.com")
+    large, users = await create_members("a@example.com", "b@example.com")
+
+    assert not await is_large_room(small.pk)
+    assert await is_large_room(large.pk)
+
+    await database_sync_to_async(ChatRoomParticipant.objects.filter(user=users[1]).delete)()
+    assert await is_large_room(large.pk)
+
+
+async def test_large_room_is_delivered_through_local_fanout(fanout, create_members, make_communicator):
+    room, (alice, bob) = await create_members("alice@example.com", "bob@example.com")
+    communicators = []
+    for user in (alice, bob):
+        communicator = make_communicator(user, room.pk)
+        assert (await communicator.connect())[0]
+        communicators.append(communicator)
+
+    assert fanout.subscribers(room.pk) == 2
+    assert not get_channel_layer().groups.get(room_group_name(room.pk))  # pyright: ignore[reportOptionalMemberAccess]
+
+    await communicators[0].send_json_to({"message": "всем"})
+    for communicator in communicators:
+        frame = await communicator.receive_json_from(timeout=2)
+        assert (frame["message"], frame["seq"]) == ("всем", 1)
+
+    for communicator in communicators:
+        await communicator.disconnect()
+    assert fanout.subscribers(room.pk) == 0
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import msgpack
+import pytest
+from channels.layers import get_channel_layer
+
+from apps.messaging.frames import MSGPACK_SUBPROTOCOL
+from apps.messaging.services import room_group_name
+
+pytestmark = [
+    pytest.mark.django_db(transaction=True),
+    pytest.mark.usefixtures("in_memory_channel_layer", "presence_batcher"),
+]
+
+
+async def test_msgpack_subprotocol_roundtrip(async_redis_client, create_members, make_communicator):
+    room, (user,) = await create_members("frames@example.com")
+    communicator = make_communicator(user, room.pk, subprotocols=[MSGPACK_SUBPROTOCOL])
+
+    connected, subprotocol = await communicator.connect()
+    assert connected
+    assert subprotocol == MSGPACK_SUBPROTOCOL
+
+    await communicator.send_to(bytes_data=msgpack.packb({"message": "бинарно"}))
+    frame = msgpack.unpackb(await communicator.receive_from(timeout=2))
+    assert frame["message"] == "бинарно"
+    assert frame["seq"] == 1
+
+    await communicator.send_to(bytes_data=b"\xc1")
+    error = msgpack.unpackb(await communicator.receive_from(timeout=2))
+    assert error["error"] is True
+
+    await communicator.disconnect()
+
+
+async def test_pre_encoded_frame_is_sent_verbatim(async_redis_client, create_members, make_communicator):
+    """
+    Получатель не перекодирует событие: уходит кадр, собранный при group_send.
+    """
+    room, (user,) = await create_members("frames@example.com")
+    json_ws = make_communicator(user, room.pk)
+    binary_ws = make_communicator(user, room.pk, subprotocols=[MSGPACK_SUBPROTOCOL])
+    assert (await json_ws.connect())[0]
+    assert (await binary_ws.connect())[0]
+
+    await get_channel_layer().group_send(
+        room_group_name(room.pk),
+        {
+            "type": "chat.message",
+            "seq": 7,
+            "message": "ignored",
+            "display_name": "ignored",
+            "frames": {"json": '{"pre":"encoded"}', "msgpack": b"\x81\xa3pre\xa7encoded"},
+        },
+    )
+
+    assert await json_ws.receive_from(timeout=2) == '{"pre":"encoded"}'
+    assert await binary_ws.receive_from(timeout=2) == b"\x81\xa3pre\xa7encoded"
+
+    await json_ws.disconnect()
+    await binary_ws.disconnect()
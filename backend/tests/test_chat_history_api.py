@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.messaging.models import ChatMessage, ChatRoom, ChatRoomParticipant
+
+User = get_user_model()
+
+
+@pytest.fixture
+def member(db):
+    return User.objects.create(email="history@example.com", display_name="history")
+
+
+@pytest.fixture
+def room_with_history(member):
+    """
+    Комната с 7 сообщениями; у пар сообщений одинаковый created_at,
+    чтобы проверить разрешение «ничьих» по id.
+    """
+    room = ChatRoom.objects.create(type=ChatRoom.RoomType.GROUP, name="history")
+    ChatRoomParticipant.objects.create(room=room, user=member)
+    base = timezone.now() - timedelta(hours=1)
+    messages = [
+        ChatMessage.objects.create(room=room, sender=member, text=f"m{i}", created_at=base + timedelta(seconds=i // 2))
+        for i in range(7)
+    ]
+    return room, [message.pk for message in messages]
+
+
+def _texts(response) -> list[str]:
+    return [row["text"] for row in response.data["results"]]
+
+
+@pytest.mark.django_db
+def test_history_latest_page(api_client, sync_redis_client, member, room_with_history):
+    room, _ = room_with_history
+    api_client.force_authenticate(member)
+
+    response = api_client.get(reverse("chat-room-messages", args=[room.id]), {"limit": 3})
+
+    assert response.status_code == 200
+    assert _texts(response) == ["m4", "m5", "m6"]
+    assert response.data["has_more"] is True
+    assert set(response.data["results"][0]) == {"id", "seq", "created_at", "text", "sender_id", "sender_display_name"}
+    assert response.data["results"][0]["sender_display_name"] == "history"
+
+
+@pytest.mark.django_db
+def test_history_scroll_back_and_forward(api_client, sync_redis_client, member, room_with_history):
+    """
+    before/after проходят всю историю без пропусков и повторов.
+    """
+    room, ids = room_with_history
+    api_client.force_authenticate(member)
+    url = reverse("chat-room-messages", args=[room.id])
+
+    page = api_client.get(url, {"limit": 3, "before": ids[4]})
+    assert _texts(page) == ["m1", "m2", "m3"]
+    assert page.data["has_more"] is True
+
+    page = api_client.get(url, {"limit": 3, "before": ids[1]})
+    assert _texts(page) == ["m0"]
+    assert page.data["has_more"] is False
+
+    page = api_client.get(url, {"limit": 3, "after": ids[2]})
+    assert _texts(page) == ["m3", "m4", "m5"]
+    assert page.data["has_more"] is True
+
+
+@pytest.mark.django_db
+def test_history_page_queries_do_not_depend_on_depth(api_client, sync_redis_client, member, room_with_history, django_assert_num_queries):
+    """
+    При прогретом кеше участников страница — это курсор + сама выборка, без COUNT/OFFSET.
+    """
+    room, ids = room_with_history
+    api_client.force_authenticate(member)
+    url = reverse("chat-room-messages", args=[room.id])
+    api_client.get(url)  # прогрев кеша участников
+
+    with django_assert_num_queries(2):
+        api_client.get(url, {"limit": 2, "before": ids[6]})
+    with django_assert_num_queries(2):
+        api_client.get(url, {"limit": 2, "before": ids[1]})
+
+
+@pytest.mark.django_db
+def test_history_requires_membership(api_client, sync_redis_client, room_with_history):
+    room, _ = room_with_history
+    stranger = User.objects.create(email="stranger@example.com", display_name="stranger")
+    api_client.force_authenticate(stranger)
+
+    response = api_client.get(reverse("chat-room-messages", args=[room.id]))
+    assert response.status_code == 403
+
+    response = api_client.get(reverse("chat-room-messages", args=[uuid.uuid4()]))
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_history_rejects_both_cursors(api_client, sync_redis_client, member, room_with_history):
+    room, ids = room_with_history
+    api_client.force_authenticate(member)
+
+    response = api_client.get(reverse("chat-room-messages", args=[room.id]), {"before": ids[3], "after": ids[1]})
+    assert response.status_code == 400
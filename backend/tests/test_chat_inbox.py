@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.messaging.models import ChatRoom, ChatRoomParticipant
+
+User = get_user_model()
+
+
+@pytest.fixture
+def inbox(db):
+    """
+    Пользователь в 5 комнатах; у двух одинаковое время активности — «ничья» по id.
+    """
+    user = User.objects.create(email="inbox@example.com", display_name="inbox")
+    base = timezone.now() - timedelta(hours=1)
+    rooms = []
+    for i in range(5):
+        room = ChatRoom.objects.create(
+            type=ChatRoom.RoomType.GROUP,
+            name=f"room{i}",
+            last_message_at=base + timedelta(minutes=min(i, 3)),
+            last_message_preview=f"last in room{i}",
+            last_sender=user,
+        )
+        ChatRoomParticipant.objects.create(room=room, user=user)
+        rooms.append(room)
+    ChatRoom.objects.create(type=ChatRoom.RoomType.GROUP, name="foreign")
+    return user, rooms
+
+
+def _expected_order(rooms) -> list[str]:
+    return [str(room.pk) for room in sorted(rooms, key=lambda room: (room.last_message_at, room.pk), reverse=True)]
+
+
+@pytest.mark.django_db
+def test_inbox_newest_first_with_snapshot(api_client, sync_redis_client, inbox):
+    user, rooms = inbox
+    api_client.force_authenticate(user)
+
+    response = api_client.get(reverse("chat-inbox"))
+
+    assert response.status_code == 200
+    assert [row["id"] for row in response.data["results"]] == _expected_order(rooms)
+    assert response.data["has_more"] is False
+    first = response.data["results"][0]
+    assert first["last_message_preview"].startswith("last in room")
+    assert first["last_sender_display_name"] == "inbox"
+    assert first["unread"] == 0
+
+
+@pytest.mark.django_db
+def test_inbox_keyset_pages_without_gaps(api_client, sync_redis_client, inbox, django_assert_num_queries):
+    user, rooms = inbox
+    api_client.force_authenticate(user)
+    url = reverse("chat-inbox")
+
+    seen: list[str] = []
+    before = None
+    while True:
+        params = {"limit": 2} | ({"before": before} if before else {})
+        with django_assert_num_queries(2 if before else 1):
+            page = api_client.get(url, params)
+        seen += [row["id"] for row in page.data["results"]]
+        if not page.data["has_more"]:
+            break
+        before = seen[-1]
+
+    assert seen == _expected_order(rooms)
+
+
+@pytest.mark.django_db
+def test_inbox_rejects_foreign_cursor(api_client, sync_redis_client, inbox):
+    user, _ = inbox
+    api_client.force_authenticate(user)
+    foreign = ChatRoom.objects.get(name="foreign")
+
+    response = api_client.get(reverse("chat-inbox"), {"before": foreign.pk})
+    assert response.status_code == 400
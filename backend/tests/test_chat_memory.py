@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import gc
+import tracemalloc
+
+import pytest
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.urls import re_path
+
+from apps.messaging.routing import websocket_urlpatterns
+from apps.messaging.services import room_group_name
+
+# Бюджет на простаивающий сокет ChatConsumer сверх голого AsyncWebsocketConsumer
+# в той же группе: собственное состояние consumer’а и всё, что он держит.
+IDLE_CONNECTION_BUDGET_BYTES = 768
+
+CONNECTIONS = 50
+
+
+class BareConsumer(AsyncWebsocketConsumer):
+    async def connect(self) -> None:
+        room_id = self.scope["url_route"]["kwargs"]["room_id"]
+        await self.channel_layer.group_add(room_group_name(room_id), self.channel_name)
+        await self.accept()
+
+
+bare_urlpatterns = [re_path(r"^ws/chat/(?P<room_id>[0-9a-f-]+)/$", BareConsumer.as_asgi())]
+
+
+async def connect(urlpatterns, room, user) -> WebsocketCommunicator:
+    communicator = WebsocketCommunicator(URLRouter(urlpatterns), f"/ws/chat/{room.pk}/")
+    communicator.scope["user"] = user
+    assert (await communicator.connect())[0]
+    return communicator
+
+
+async def idle_bytes(urlpatterns, room, users) -> float:
+    # прогрев: кеш комнаты, скрипты Redis, пулы соединений
+    warmup = await connect(urlpatterns, room, users[0])
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        communicators = [await connect(urlpatterns, room, user) for user in users[1:]]
+        gc.collect()
+        grown = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    for communicator in [warmup, *communicators]:
+        await communicator.disconnect()
+    return grown / len(communicators)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("in_memory_channel_layer")
+async def test_idle_connection_fits_memory_budget(presence_batcher, monkeypatch, create_members):
+    # простаивающим сокетам за время замера не приходит даже «онлайн» соседей
+    monkeypatch.setattr(presence_batcher, "interval", 60)
+    room, users = await create_members(*(f"idle{i}@example.com" for i in range(CONNECTIONS + 1)), name="idle")
+
+    bare = await idle_bytes(bare_urlpatterns, room, users)
+    chat = await idle_bytes(websocket_urlpatterns, room, users)
+
+    assert chat - bare < IDLE_CONNECTION_BUDGET_BYTES, f"{chat - bare:.0f} B per idle connection over bare consumer"
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from channels.db import database_sync_to_async
+
+from apps.messaging.models import ChatRoomParticipant
+from apps.messaging.services import publish_message
+
+pytestmark = [
+    pytest.mark.django_db(transaction=True),
+    pytest.mark.usefixtures("in_memory_channel_layer", "presence_batcher"),
+]
+
+
+async def test_one_socket_receives_all_rooms(async_redis_client, create_user, create_room, make_communicator):
+    """
+    Без ?rooms= сокет подписан на все комнаты пользователя, кадры помечены комнатой.
+    """
+    user = await create_user("mux@example.com")
+    other = await create_user("other@example.com")
+    first, second = await create_room(user, other, name="first"), await create_room(user, other, name="second")
+    await create_room(other, name="foreign")
+
+    communicator = make_communicator(user)
+    assert (await communicator.connect())[0]
+    subscribed = await communicator.receive_json_from(timeout=2)
+    assert subscribed["event"] == "subscribed"
+    assert set(subscribed["rooms"]) == {str(first.pk), str(second.pk)}
+
+    await publish_message(first.pk, other.pk, other.display_name, "в первую")
+    await publish_message(second.pk, other.pk, other.display_name, "во вторую")
+    frames = [await communicator.receive_json_from(timeout=2) for _ in range(2)]
+    assert [(frame["room"], frame["message"]) for frame in frames] == [
+        (str(first.pk), "в первую"),
+        (str(second.pk), "во вторую"),
+    ]
+
+    await communicator.send_json_to({"room": str(second.pk), "message": "ответ"})
+    echo = await communicator.receive_json_from(timeout=2)
+    assert (echo["room"], echo["message"], echo["display_name"]) == (str(second.pk), "ответ", "mux")
+
+    await communicator.disconnect()
+
+
+async def test_subscriptions_change_at_runtime(async_redis_client, create_user, create_room, make_communicator):
+    user = await create_user("mux@example.com")
+    first, second = await create_room(user, name="first"), await create_room(user, name="second")
+    foreign = await create_room(name="foreign")
+    await publish_message(second.pk, user.pk, user.display_name, "пропущенное")
+
+    communicator = make_communicator(user, query=f"?rooms={first.pk}")
+    assert (await communicator.connect())[0]
+    assert (await communicator.receive_json_from(timeout=2))["rooms"] == [str(first.pk)]
+
+    await communicator.send_json_to(
+        {"type": "subscribe", "rooms": [str(second.pk), str(foreign.pk), "junk"], "since": {str(second.pk): 0}}
+    )
+    subscribed = await communicator.receive_json_from(timeout=2)
+    assert subscribed["rooms"] == [str(second.pk)]
+    assert set(subscribed["rejected"]) == {str(foreign.pk), "junk"}
+    replayed = await communicator.receive_json_from(timeout=2)
+    assert (replayed["room"], replayed["message"]) == (str(second.pk), "пропущенное")
+
+    await communicator.send_json_to({"type": "unsubscribe", "rooms": [str(first.pk)]})
+    assert (await communicator.receive_json_from(timeout=2)) == {"event": "unsubscribed", "rooms": [str(first.pk)]}
+
+    await publish_message(first.pk, user.pk, user.display_name, "не дойдёт")
+    assert await communicator.receive_nothing()
+
+    await communicator.send_json_to({"room": str(first.pk), "message": "мимо"})
+    error = await communicator.receive_json_from(timeout=2)
+    assert error["error"] is True and error["room"] == str(first.pk)
+
+    await communicator.disconnect()
+
+
+async def test_removed_participant_is_unsubscribed(async_redis_client, create_user, create_room, make_communicator):
+    user = await create_user("mux@example.com")
+    other = await create_user("other@example.com")
+    first, second = await create_room(user, other, name="first"), await create_room(user, other, name="second")
+
+    communicator = make_communicator(user, query=f"?rooms={first.pk},{second.pk}")
+    assert (await communicator.connect())[0]
+    assert (await communicator.receive_json_from(timeout=2))["rooms"] == [str(first.pk), str(second.pk)]
+
+    await database_sync_to_async(ChatRoomParticipant.objects.filter(room=first, user=user).delete)()
+    assert (await communicator.receive_json_from(timeout=2)) == {"event": "unsubscribed", "rooms": [str(first.pk)]}
+
+    await publish_message(first.pk, other.pk, other.display_name, "уже не участник")
+    await publish_message(second.pk, other.pk, other.display_name, "всё ещё участник")
+    assert (await communicator.receive_json_from(timeout=2))["room"] == str(second.pk)
+    assert await communicator.receive_nothing()
+
+    await communicator.disconnect()
+
+
+async def test_anonymous_is_rejected(async_redis_client, make_communicator):
+    communicator = make_communicator(None, query=f"?rooms={uuid.uuid4()}")
+    connected, code = await communicator.connect()
+    assert not connected
+    assert code == 4001
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import gzip
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.storage import storages
+from django.db import connection
+
+from apps.messaging import partitions
+from apps.messaging.models import ChatMessage, ChatRoom
+from apps.messaging.partitions import (
+    archive_old_partitions,
+    ensure_partitions,
+    list_partitions,
+    month_start,
+    partition_name,
+)
+from apps.utils.pagination import keyset_filter
+
+User = get_user_model()
+
+postgres_only = pytest.mark.skipif(connection.vendor != "postgresql", reason="партиции есть только в PostgreSQL")
+
+
+def test_month_start_crosses_year_boundaries():
+    moment = datetime(2025, 12, 31, 23, 30, tzinfo=timezone.utc)
+    assert month_start(moment) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert month_start(moment, 1) == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert month_start(moment, -12) == datetime(2024, 12, 1, tzinfo=timezone.utc)
+    assert partition_name(month_start(moment, 1)) == "messaging_chatmessage_p2026_01"
+
+
+@pytest.mark.django_db
+def test_maintenance_is_noop_without_partitioned_table():
+    if connection.vendor == "postgresql":
+        pytest.skip("на PostgreSQL таблица партиционирована миграцией")
+    assert ensure_partitions() == []
+    assert archive_old_partitions(days=1) == []
+
+
+def test_history_keyset_bounds_partition_key():
+    """
+    Рядом со сравнением кортежей стоит простое условие на created_at — по нему отсекаются партиции.
+    """
+    cursor = (datetime(2026, 5, 1, tzinfo=timezone.utc), 10)
+    older = keyset_filter(ChatMessage.objects.all(), ("created_at", "id"), cursor, "<")
+    newer = keyset_filter(ChatMessage.objects.all(), ("created_at", "id"), cursor, ">")
+    assert '"messaging_chatmessage"."created_at" <=' in str(older.query)
+    assert '"messaging_chatmessage"."created_at" >=' in str(newer.query)
+
+
+@pytest.fixture
+def scratch_table(monkeypatch):
+    """
+    Отдельная партиционированная таблица со структурой сообщений: архивация
+    в тесте не трогает партиции настоящей таблицы, в том числе LEGACY.
+    """
+    table = "chat_partitions_scratch"
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {table} (LIKE {partitions.TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    monkeypatch.setattr(partitions, "TABLE", table)
+    monkeypatch.setattr(partitions, "LEGACY_PARTITION", f"{table}_legacy")
+    monkeypatch.setattr(partitions, "PARTITION_PREFIX", f"{table}_p")
+    yield table
+    names = [partition.name for partition in partitions.list_partitions()] + partitions.detached_partitions()
+    with connection.cursor() as cursor:
+        for name in [table, *names]:
+            cursor.execute(f"DROP TABLE IF EXISTS {name} CASCADE")
+
+
+@postgres_only
+@pytest.mark.django_db(transaction=True)
+def test_old_partitions_are_exported_and_dropped(settings, tmp_path, scratch_table):
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "dbbackup": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": tmp_path},
+        },
+    }
+    now = datetime.now(timezone.utc)
+    ensure_partitions(now=now, ahead=3)
+    user = User.objects.create(email="archive@example.com", display_name="archive")
+    room = ChatRoom.objects.create(type=ChatRoom.RoomType.GROUP, name="archive")
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {scratch_table} (id, room_id, sender_id, text, created_at) VALUES (%s, %s, %s, %s, %s)",
+            [(1, room.pk, user.pk, "старое", now), (2, room.pk, user.pk, "позднее", month_start(now, 3))],
+        )
+
+    # срок хранения отсчитан так, что текущий и следующий месяцы уходят в архив
+    cutoff = month_start(now, 2)
+    archives = archive_old_partitions(now=cutoff + timedelta(days=30), days=30)
+
+    assert len(archives) == 2
+    assert all(partition.upper > cutoff for partition in list_partitions())
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT text FROM {scratch_table}")
+        assert cursor.fetchall() == [("позднее",)]
+    contents = b"".join(gzip.decompress(storages["dbbackup"].open(name).read()) for name in archives)
+    assert "старое" in contents.decode()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from channels.layers import get_channel_layer
+
+from apps.messaging.presence import (
+    PresenceBatcher,
+    connections_presence_key,
+    leave_presence,
+    online_members,
+    room_presence_key,
+    touch_presence,
+)
+from apps.messaging.services import room_group_name
+
+pytestmark = [
+    pytest.mark.django_db(transaction=True),
+    pytest.mark.usefixtures("in_memory_channel_layer", "presence_batcher"),
+]
+
+
+async def test_presence_entries_expire_and_are_pruned(async_redis_client):
+    room_id = "presence-room"
+
+    assert await touch_presence(room_id, 1, "tab-1") is True
+    assert await touch_presence(room_id, 1, "tab-1") is False  # повторный сигнал — не новое появление
+    assert await touch_presence(room_id, 1, "tab-2") is False
+    await async_redis_client.hset(room_presence_key(room_id), "2", 0)  # сигнал давно протух
+
+    assert await online_members(room_id) == [1]
+    assert not await async_redis_client.hexists(room_presence_key(room_id), "2")
+    assert await async_redis_client.pttl(room_presence_key(room_id)) > 0
+    assert await touch_presence(room_id, 2, "tab-1") is True
+
+
+async def test_offline_only_after_last_connection(async_redis_client):
+    room_id = "presence-room"
+    await touch_presence(room_id, 1, "tab-1")
+    await touch_presence(room_id, 1, "tab-2")
+
+    assert await leave_presence(room_id, 1, "tab-1") is False
+    assert await online_members(room_id) == [1]
+    # соединение, упавшее без disconnect, протухает и не держит пользователя онлайн
+    await async_redis_client.hset(connections_presence_key(room_id, 1), "tab-2", 0)
+    assert await leave_presence(room_id, 1, "tab-3") is True
+    assert await online_members(room_id) == []
+
+
+async def test_batcher_coalesces_room_changes_into_one_event(async_redis_client):
+    """
+    200 печатающих за окно — одно событие в группу; start+stop в окне гасят друг друга.
+    """
+    layer = get_channel_layer()
+    channel = await layer.new_channel()
+    await layer.group_add(room_group_name("busy"), channel)
+    batcher = PresenceBatcher(interval=0.05)
+
+    for user_id in range(200):
+        batcher.add("busy", "typing", user_id)
+        batcher.add("busy", "typing", user_id)
+    batcher.add("busy", "online", 500)
+    batcher.add("busy", "offline", 500)
+
+    event = await layer.receive(channel)
+    assert event["type"] == "chat.presence"
+    assert event["typing"] == list(range(200))
+    assert event["online"] == event["offline"] == []
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(layer.receive(channel), timeout=0.15)
+
+
+async def test_typing_is_debounced_and_broadcast_to_others(async_redis_client, create_members, make_communicator):
+    room, (alice, bob) = await create_members("alice@example.com", "bob@example.com")
+    alice_ws, bob_ws = make_communicator(alice, room.id), make_communicator(bob, room.id)
+    assert (await alice_ws.connect())[0]
+    assert (await bob_ws.connect())[0]
+
+    for _ in range(5):
+        await bob_ws.send_json_to({"type": "typing"})
+
+    frame = await alice_ws.receive_json_from(timeout=2)
+    assert frame["event"] == "presence"
+    assert frame["typing"] == [bob.pk]
+    assert bob.pk in frame["online"]
+    assert await alice_ws.receive_nothing(timeout=0.4)
+
+    # bob видит в том же пакете только alice — свои изменения не приходят
+    frame = await bob_ws.receive_json_from(timeout=2)
+    assert frame["online"] == [alice.pk]
+    assert frame["typing"] == []
+
+    await bob_ws.send_json_to({"type": "presence"})
+    snapshot = await bob_ws.receive_json_from(timeout=2)
+    assert snapshot == {"event": "presence", "room": str(room.id), "online": sorted([alice.pk, bob.pk])}
+
+    await bob_ws.disconnect()
+    frame = await alice_ws.receive_json_from(timeout=2)
+    assert frame["offline"] == [bob.pk]
+    assert frame["stopped_typing"] == [bob.pk]
+
+    await alice_ws.disconnect()
+
+
+async def test_second_socket_keeps_user_online(create_members, make_communicator):
+    room, (alice, bob) = await create_members("alice@example.com", "bob@example.com")
+    alice_ws = make_communicator(alice, room.id)
+    bob_tab, bob_phone = make_communicator(bob, room.id), make_communicator(bob, room.id)
+    for communicator in (alice_ws, bob_tab, bob_phone):
+        assert (await communicator.connect())[0]
+
+    frame = await alice_ws.receive_json_from(timeout=2)
+    assert frame["online"] == [bob.pk]
+
+    await bob_tab.disconnect()
+    assert await alice_ws.receive_nothing(timeout=0.4)
+    assert await online_members(room.id) == sorted([alice.pk, bob.pk])
+
+    await bob_phone.disconnect()
+    frame = await alice_ws.receive_json_from(timeout=2)
+    assert frame["offline"] == [bob.pk]
+
+    await alice_ws.disconnect()
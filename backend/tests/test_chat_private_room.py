@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+
+from apps.messaging import services
+from apps.messaging.models import ChatRoom, ChatRoomParticipant
+from apps.messaging.services import get_or_create_private_room
+
+User = get_user_model()
+
+
+@pytest.fixture
+def pair(db):
+    return (
+        User.objects.create(email="alice@example.com", display_name="alice"),
+        User.objects.create(email="bob@example.com", display_name="bob"),
+    )
+
+
+def test_private_room_is_resolved_by_pair_key(pair, django_assert_num_queries):
+    alice, bob = pair
+    room, created = get_or_create_private_room(alice.pk, bob.pk)
+    assert created
+    assert room.pair_key == f"{min(alice.pk, bob.pk)}:{max(alice.pk, bob.pk)}"
+    assert set(room.memberships.values_list("user_id", flat=True)) == {alice.pk, bob.pk}
+
+    with django_assert_num_queries(1):
+        again, created = get_or_create_private_room(bob.pk, alice.pk)
+    assert (again.pk, created) == (room.pk, False)
+
+
+def test_losing_a_creation_race_returns_the_winner(pair, monkeypatch):
+    alice, bob = pair
+    winner, _ = get_or_create_private_room(alice.pk, bob.pk)
+
+    # второй запрос не увидел комнату: её транзакция ещё не была зафиксирована
+    find = services._find_private_room
+    misses = iter([None])
+    monkeypatch.setattr(services, "_find_private_room", lambda pair_key: next(misses, None) or find(pair_key))
+
+    room, created = get_or_create_private_room(bob.pk, alice.pk)
+    assert (room.pk, created) == (winner.pk, False)
+    assert ChatRoom.objects.filter(type=ChatRoom.RoomType.PRIVATE).count() == 1
+    assert ChatRoomParticipant.objects.count() == 2
+
+
+def test_pair_key_is_unique_only_for_private_rooms(pair):
+    ChatRoom.objects.create(type=ChatRoom.RoomType.PRIVATE, pair_key="1:2")
+    ChatRoom.objects.create(type=ChatRoom.RoomType.GROUP, pair_key="1:2")
+    with pytest.raises(IntegrityError), transaction.atomic():
+        ChatRoom.objects.create(type=ChatRoom.RoomType.PRIVATE, pair_key="1:2")
+
+
+def test_private_room_endpoint(api_client, pair):
+    alice, bob = pair
+    api_client.force_authenticate(alice)
+    url = reverse("chat-private-room")
+
+    first = api_client.post(url, {"user_id": bob.pk}, format="json")
+    assert first.status_code == 201
+    second = api_client.post(url, {"user_id": bob.pk}, format="json")
+    assert second.status_code == 200
+    assert second.data == {"id": first.data["id"], "created": False}
+
+    assert api_client.post(url, {"user_id": alice.pk}, format="json").status_code == 400
+    assert api_client.post(url, {"user_id": bob.pk + 100}, format="json").status_code == 404
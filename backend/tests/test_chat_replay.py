@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from channels.db import database_sync_to_async
+from django.utils import timezone
+
+from apps.messaging.models import ChatMessage
+from apps.messaging.replay import events_since, next_seq, remember_event, room_replay_key, room_seq_key
+from apps.messaging.services import publish_message
+
+pytestmark = [
+    pytest.mark.django_db(transaction=True),
+    pytest.mark.usefixtures("in_memory_channel_layer", "presence_batcher"),
+]
+
+
+async def publish(room, user, count: int) -> list[dict]:
+    return [await publish_message(room.pk, user.pk, user.display_name, f"m{i}") for i in range(count)]
+
+
+async def test_events_get_monotonic_seq_persisted_with_message(async_redis_client, create_members):
+    room, (user,) = await create_members("mobile@example.com")
+
+    events = await publish(room, user, 3)
+
+    assert [event["seq"] for event in events] == [1, 2, 3]
+    stored = await database_sync_to_async(
+        lambda: list(ChatMessage.objects.filter(room=room).order_by("seq").values_list("seq", "text"))
+    )()
+    assert stored == [(1, "m0"), (2, "m1"), (3, "m2")]
+
+
+async def test_reconnect_with_since_replays_gap_from_buffer(async_redis_client, create_members, make_communicator):
+    """
+    Клиент, видевший seq=1, после переподключения получает 2 и 3 до живых сообщений.
+    """
+    room, (user,) = await create_members("mobile@example.com")
+    await publish(room, user, 3)
+
+    communicator = make_communicator(user, room.pk, "?since=1")
+    assert (await communicator.connect())[0]
+
+    replayed = [await communicator.receive_json_from(timeout=2) for _ in range(2)]
+    assert [(frame["seq"], frame["message"]) for frame in replayed] == [(2, "m1"), (3, "m2")]
+
+    await publish(room, user, 1)
+    live = await communicator.receive_json_from(timeout=2)
+    assert live["seq"] == 4
+    assert await communicator.receive_nothing()
+
+    await communicator.disconnect()
+
+
+async def test_reconnect_falls_back_to_database_when_gap_is_older_than_buffer(async_redis_client, settings, create_members, make_communicator):
+    settings.CHAT_REPLAY_BUFFER_SIZE = 2
+    room, (user,) = await create_members("mobile@example.com")
+    await publish(room, user, 5)
+    assert await async_redis_client.zcard(room_replay_key(room.pk)) == 2
+
+    communicator = make_communicator(user, room.pk, "?since=0")
+    assert (await communicator.connect())[0]
+
+    replayed = [await communicator.receive_json_from(timeout=2) for _ in range(5)]
+    assert [frame["seq"] for frame in replayed] == [1, 2, 3, 4, 5]
+    assert await communicator.receive_nothing()
+
+    await communicator.disconnect()
+
+
+async def test_connect_without_since_sends_nothing(async_redis_client, create_members, make_communicator):
+    room, (user,) = await create_members("mobile@example.com")
+    await publish(room, user, 2)
+
+    communicator = make_communicator(user, room.pk)
+    assert (await communicator.connect())[0]
+    assert await communicator.receive_nothing()
+    await communicator.disconnect()
+
+
+async def test_next_seq_reseeds_from_database_after_redis_loss(async_redis_client, create_members):
+    room, (user,) = await create_members("mobile@example.com")
+    await publish(room, user, 3)
+
+    await async_redis_client.delete(room_seq_key(room.pk))
+
+    assert await next_seq(room.pk) == 4
+
+
+async def test_replay_stops_before_seq_still_in_flight(async_redis_client, create_members):
+    """
+    seq 2 выдан, но его событие ещё не в буфере, а 3 уже там: догрузка не отдаёт 3 раньше 2,
+    иначе consumer отбросил бы живой 2 как дубль.
+    """
+    room, (user,) = await create_members("mobile@example.com")
+    await publish(room, user, 1)
+    in_flight = await next_seq(room.pk)
+    third = (await publish(room, user, 1))[0]
+    assert (in_flight, third["seq"]) == (2, 3)
+
+    assert await events_since(room.pk, 1) == []
+
+    await remember_event(room.pk, {**third, "seq": 2, "message": "late"})
+    assert [(event["seq"], event["message"]) for event in await events_since(room.pk, 1)] == [(2, "late"), (3, "m0")]
+
+
+async def test_replay_skips_seq_lost_long_ago(async_redis_client, settings, create_members):
+    room, (user,) = await create_members("mobile@example.com")
+    await publish(room, user, 1)
+    await next_seq(room.pk)  # отправитель упал между номером и сохранением
+    await publish(room, user, 1)
+
+    settings.CHAT_REPLAY_PENDING_TIMEOUT = 0
+    assert [event["seq"] for event in await events_since(room.pk, 1)] == [3]
+
+
+async def test_database_replay_is_bounded_by_buffer_ttl(async_redis_client, settings, create_members):
+    """
+    Догрузка из БД не уходит глубже CHAT_REPLAY_BUFFER_TTL: запрос ограничен
+    по created_at и не обходит старые партиции.
+    """
+    settings.CHAT_REPLAY_BUFFER_SIZE = 2
+    room, (user,) = await create_members("mobile@example.com")
+    await publish(room, user, 5)
+    long_ago = timezone.now() - timedelta(seconds=settings.CHAT_REPLAY_BUFFER_TTL * 2)
+    await database_sync_to_async(ChatMessage.objects.filter(room=room, seq__lte=2).update)(created_at=long_ago)
+
+    assert [event["seq"] for event in await events_since(room.pk, 0)] == [3, 4, 5]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+
+from apps.messaging.models import ChatMessage, ChatRoom, ChatRoomParticipant
+
+User = get_user_model()
+
+postgres_only = pytest.mark.skipif(connection.vendor != "postgresql", reason="tsvector есть только в PostgreSQL")
+
+
+@pytest.fixture
+def member(db):
+    user = User.objects.create(email="reader@example.com", display_name="reader")
+    room = ChatRoom.objects.create(type=ChatRoom.RoomType.GROUP, name="search")
+    ChatRoomParticipant.objects.create(room=room, user=user)
+    return user, room
+
+
+def test_search_requires_postgres_instead_of_ilike(api_client, member):
+    user, _ = member
+    api_client.force_authenticate(user)
+    if connection.vendor == "postgresql":
+        pytest.skip("на PostgreSQL поиск доступен")
+    response = api_client.get(reverse("chat-search"), {"q": "привет"})
+    assert response.status_code == 501
+
+
+@postgres_only
+def test_search_validates_query(api_client, member):
+    user, _ = member
+    api_client.force_authenticate(user)
+    url = reverse("chat-search")
+    assert api_client.get(url).status_code == 400
+    assert api_client.get(url, {"q": "a"}).status_code == 400
+    assert api_client.get(url, {"q": "кот", "limit": 500}).status_code == 400
+
+
+@postgres_only
+def test_search_finds_word_forms_only_in_own_rooms(api_client, member):
+    user, room = member
+    stranger_room = ChatRoom.objects.create(type=ChatRoom.RoomType.GROUP, name="other")
+    texts = ["Коты спят на диване", "Собака гуляет", "I like running", "Про котов ещё раз"]
+    messages = [ChatMessage.objects.create(room=room, sender=user, text=text) for text in texts]
+    ChatMessage.objects.create(room=stranger_room, sender=user, text="Чужой кот")
+    api_client.force_authenticate(user)
+    url = reverse("chat-search")
+
+    first = api_client.get(url, {"q": "кот", "limit": 1})
+    assert first.status_code == 200
+    assert [row["id"] for row in first.data["results"]] == [messages[3].pk]
+    assert first.data["has_more"]
+    assert "<mark>" in first.data["results"][0]["snippet"]
+
+    second = api_client.get(url, {"q": "кот", "limit": 1, "before": messages[3].pk})
+    assert [row["id"] for row in second.data["results"]] == [messages[0].pk]
+    assert not second.data["has_more"]
+
+    english = api_client.get(url, {"q": "runs"})
+    assert [row["id"] for row in english.data["results"]] == [messages[2].pk]
+
+    assert api_client.get(url, {"q": "кот", "room": stranger_room.pk}).status_code == 403
+
+
+@postgres_only
+def test_search_snippet_escapes_message_html(api_client, member):
+    user, room = member
+    ChatMessage.objects.create(room=room, sender=user, text='<img src=x onerror="alert(1)"> кот & пёс')
+    api_client.force_authenticate(user)
+
+    response = api_client.get(reverse("chat-search"), {"q": "кот"})
+
+    snippet = response.data["results"][0]["snippet"]
+    assert "<img" not in snippet and "&lt;img" in snippet
+    assert "<mark>кот</mark>" in snippet and "&amp;" in snippet
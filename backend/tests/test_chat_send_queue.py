@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from apps.messaging.consumers import CLOSE_SLOW_CONSUMER, ChatConsumer
+from apps.messaging.metrics import SendQueueMetrics, send_queue_metrics
+from apps.messaging.services import room_group_name
+
+User = get_user_model()
+
+
+@pytest.fixture
+def stuck_client(monkeypatch):
+    """
+    Клиент, который перестал читать: запись первого же кадра в сокет «висит».
+    """
+    never = asyncio.Event()
+
+    async def blocked_send(self, text_data=None, bytes_data=None, close=False):
+        await never.wait()
+
+    monkeypatch.setattr(ChatConsumer, "send", blocked_send)
+    send_queue_metrics.reset()
+    yield
+    send_queue_metrics.reset()
+
+
+async def flood(room, count: int) -> None:
+    layer = get_channel_layer()
+    for i in range(count):
+        await layer.group_send(
+            room_group_name(room.pk),
+            {"type": "chat.message", "seq": i + 1, "message": "x", "display_name": "x", "frames": {"json": f"{i}"}},
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("in_memory_channel_layer", "stuck_client")
+async def test_slow_consumer_is_closed_with_distinct_code(async_redis_client, settings, create_members, make_communicator):
+    settings.CHAT_SEND_QUEUE_SIZE = 3
+    settings.CHAT_SEND_QUEUE_POLICY = "close"
+    room, (user,) = await create_members("slow@example.com")
+    communicator = make_communicator(user, room.pk)
+    assert (await communicator.connect())[0]
+
+    await flood(room, 10)
+
+    closed = await communicator.receive_output(timeout=2)
+    assert closed == {"type": "websocket.close", "code": CLOSE_SLOW_CONSUMER}
+    assert send_queue_metrics.slow_consumers_closed == 1
+    assert send_queue_metrics.percentiles()["max"] == 3
+    await communicator.wait()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("in_memory_channel_layer", "stuck_client")
+async def test_drop_policy_keeps_queue_bounded(async_redis_client, settings, create_members, make_communicator):
+    settings.CHAT_SEND_QUEUE_SIZE = 3
+    settings.CHAT_SEND_QUEUE_POLICY = "drop"
+    room, (user,) = await create_members("slow@example.com")
+    communicator = make_communicator(user, room.pk)
+    assert (await communicator.connect())[0]
+
+    await flood(room, 10)
+    for _ in range(50):
+        if send_queue_metrics.frames_dropped >= 6:
+            break
+        await asyncio.sleep(0.01)
+
+    # один кадр «висит» в записи, три ждут в очереди, остальные выброшены
+    assert send_queue_metrics.frames_dropped == 6
+    assert send_queue_metrics.slow_consumers_closed == 0
+    assert send_queue_metrics.percentiles()["max"] == 3
+    assert await communicator.receive_nothing()
+    await communicator.disconnect()
+
+
+def test_depth_percentiles_nearest_rank():
+    metrics = SendQueueMetrics(window=100)
+    for depth in range(1, 101):
+        metrics.observe_depth(depth)
+
+    assert metrics.percentiles() == {"p50": 50, "p95": 95, "p99": 99, "max": 100}
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_is_staff_only(api_client, sync_redis_client):
+    user = User.objects.create(email="plain@example.com", display_name="plain")
+    api_client.force_authenticate(user)
+    assert api_client.get(reverse("chat-metrics")).status_code == 403
+
+    user.is_staff = True
+    user.save(update_fields=["is_staff"])
+    response = api_client.get(reverse("chat-metrics"))
+    assert response.status_code == 200
+    assert set(response.data["queue_depth"]) == {"p50", "p95", "p99", "max"}
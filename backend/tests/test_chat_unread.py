@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from django.urls import reverse
+
+from apps.messaging.models import ChatRoomParticipant
+from apps.messaging.replay import room_seq_key
+from apps.messaging.services import publish_message
+from apps.messaging.unread import READ_POINTERS_KEY, flush_read_pointers, mark_read, user_unread_key
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("in_memory_channel_layer")
+async def test_broadcast_increments_others_and_read_receipt_resets(async_redis_client, create_members):
+    room, (alice, bob, carol) = await create_members(
+        "alice@example.com", "bob@example.com", "carol@example.com"
+    )
+
+    for i in range(3):
+        await publish_message(room.pk, alice.pk, alice.display_name, f"m{i}")
+
+    room_field = str(room.pk)
+    assert await async_redis_client.hget(user_unread_key(bob.pk), room_field) == "3"
+    assert await async_redis_client.hget(user_unread_key(carol.pk), room_field) == "3"
+    assert await async_redis_client.hget(user_unread_key(alice.pk), room_field) == "0"
+
+    assert await mark_read(room.pk, bob.pk, 2) == 1
+    assert await mark_read(room.pk, bob.pk, 1) == 1  # старая квитанция не откатывает указатель
+    assert await async_redis_client.hget(READ_POINTERS_KEY, f"{room.pk}:{bob.pk}") == "2"
+
+    # отложенные указатели уже в БД — поздняя квитанция всё равно не откатывает счётчик
+    await database_sync_to_async(flush_read_pointers)()
+    assert await mark_read(room.pk, bob.pk, 1) == 1
+    assert not await async_redis_client.exists(READ_POINTERS_KEY)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("in_memory_channel_layer")
+async def test_read_frame_from_socket(async_redis_client, create_members, make_communicator):
+    room, (alice, bob) = await create_members("alice@example.com", "bob@example.com")
+    await publish_message(room.pk, alice.pk, alice.display_name, "hi")
+
+    communicator = make_communicator(bob, room.pk)
+    assert (await communicator.connect())[0]
+
+    await communicator.send_json_to({"type": "read", "seq": 1})
+    assert await communicator.receive_nothing()
+    assert await async_redis_client.hget(user_unread_key(bob.pk), str(room.pk)) == "0"
+
+    await communicator.send_json_to({"type": "read", "seq": "1"})
+    assert (await communicator.receive_json_from())["error"] is True
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db
+def test_flush_read_pointers_only_moves_forward(sync_redis_client, create_members):
+    room, (alice, bob) = async_to_sync(create_members)("alice@example.com", "bob@example.com")
+    ChatRoomParticipant.objects.filter(room=room, user=alice).update(last_read_seq=5)
+    sync_redis_client.hset(READ_POINTERS_KEY, mapping={f"{room.pk}:{alice.pk}": 3, f"{room.pk}:{bob.pk}": 4})
+
+    assert flush_read_pointers() == 1
+
+    pointers = dict(ChatRoomParticipant.objects.filter(room=room).values_list("user_id", "last_read_seq"))
+    assert pointers == {alice.pk: 5, bob.pk: 4}
+    assert not sync_redis_client.exists(READ_POINTERS_KEY)
+    assert flush_read_pointers() == 0
+
+
+@pytest.mark.django_db
+def test_inbox_reads_counters_without_counting_messages(api_client, sync_redis_client, django_assert_num_queries, create_members):
+    """
+    Одна выборка участий; счётчики из Redis, потерянный — по seq и указателю.
+    """
+    room, (alice,) = async_to_sync(create_members)("alice@example.com")
+    lost, _ = async_to_sync(create_members)("other@example.com")
+    ChatRoomParticipant.objects.create(room=lost, user=alice, last_read_seq=1)
+    sync_redis_client.hset(user_unread_key(alice.pk), str(room.pk), 7)
+    sync_redis_client.set(room_seq_key(lost.pk), 3)
+    api_client.force_authenticate(alice)
+
+    with django_assert_num_queries(1):
+        response = api_client.get(reverse("chat-inbox"))
+
+    assert response.status_code == 200
+    unread = {row["id"]: row["unread"] for row in response.data["results"]}
+    assert unread == {str(room.pk): 7, str(lost.pk): 2}
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.users.blacklist import blacklist_jti, blacklist_key, is_blacklisted
+from apps.users.tokens import VersionedRefreshToken
+
+User = get_user_model()
+
+pytestmark = [pytest.mark.django_db(transaction=True), pytest.mark.usefixtures("sync_redis_client")]
+
+
+@pytest.fixture
+def user():
+    return User.objects.create(email="refresh@example.com", display_name="refresh")
+
+
+def test_rotation_blacklists_old_refresh_in_redis(api_client, user, sync_redis_client):
+    refresh = VersionedRefreshToken.for_user(user)
+    url = reverse("token-refresh")
+
+    response = api_client.post(url, {"refresh": str(refresh)}, format="json")
+    assert response.status_code == 200
+    assert {"access", "refresh"} <= set(response.json())
+
+    # таблицы token_blacklist не растут
+    assert not OutstandingToken.objects.exists()
+    assert not BlacklistedToken.objects.exists()
+
+    ttl = sync_redis_client.ttl(blacklist_key(refresh["jti"]))
+    assert refresh["exp"] - timezone.now().timestamp() - ttl <= 2
+
+    assert api_client.post(url, {"refresh": str(refresh)}, format="json").status_code == 401
+    assert api_client.post(url, {"refresh": response.json()["refresh"]}, format="json").status_code == 200
+
+
+def test_revoked_user_cannot_refresh(api_client, user):
+    refresh = VersionedRefreshToken.for_user(user)
+    user.revoke_tokens()
+
+    response = api_client.post(reverse("token-refresh"), {"refresh": str(refresh)}, format="json")
+    assert response.status_code == 401
+
+
+def test_blacklist_is_set_once():
+    exp = (timezone.now() + timedelta(hours=1)).timestamp()
+    assert blacklist_jti("once", exp)
+    assert not blacklist_jti("once", exp)
+    assert is_blacklisted("once")
+    # истёкший токен в список не нужен
+    assert blacklist_jti("expired", (timezone.now() - timedelta(seconds=1)).timestamp())
+    assert not is_blacklisted("expired")
+
+
+def blacklisted_in_tables(user) -> VersionedRefreshToken:
+    refresh = VersionedRefreshToken.for_user(user)
+    token = OutstandingToken.objects.create(
+        user=user, jti=refresh["jti"], token=str(refresh), expires_at=timezone.now() + timedelta(days=1)
+    )
+    BlacklistedToken.objects.create(token=token)
+    return refresh
+
+
+def test_token_blacklisted_in_tables_is_rejected_before_import(api_client, user, settings):
+    settings.AUTH_JWT_BLACKLIST_DB_FALLBACK = True
+    refresh = blacklisted_in_tables(user)
+
+    response = api_client.post(reverse("token-refresh"), {"refresh": str(refresh)}, format="json")
+    assert response.status_code == 401
+
+
+def test_blacklist_check_skips_tables_after_import(user, settings, django_assert_num_queries):
+    """
+    После переноса (AUTH_JWT_BLACKLIST_DB_FALLBACK выключен) проверка — только Redis.
+    """
+    settings.AUTH_JWT_BLACKLIST_DB_FALLBACK = False
+    refresh = blacklisted_in_tables(user)
+
+    with django_assert_num_queries(0):
+        assert not is_blacklisted(refresh["jti"])
+
+
+def test_import_moves_live_blacklisted_tokens(user):
+    now = timezone.now()
+    for jti, expires_at in (("live", now + timedelta(days=1)), ("expired", now - timedelta(days=1))):
+        token = OutstandingToken.objects.create(user=user, jti=jti, token=jti, expires_at=expires_at)
+        BlacklistedToken.objects.create(token=token)
+    OutstandingToken.objects.create(user=user, jti="active", token="active", expires_at=now + timedelta(days=1))
+
+    call_command("import_jwt_blacklist", "--purge", stdout=StringIO())
+
+    assert is_blacklisted("live")
+    assert not is_blacklisted("expired")
+    assert not is_blacklisted("active")
+    assert not OutstandingToken.objects.exists()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import timedelta
+
+import pytest
+from channels.db import database_sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.utils import timezone
+from taskiq import TaskiqEvents
+
+from apps.messaging.models import PREVIEW_LENGTH, ChatMessage, ChatRoom
+from apps.messaging.persistence import MessageWriteBuffer, message_buffer, store_message
+from config.taskiq_app import flush_chat_messages, taskiq_broker
+
+User = get_user_model()
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def room_and_user(db):
+    user = User.objects.create(email="writer@example.com", display_name="writer")
+    room = ChatRoom.objects.create(type=ChatRoom.RoomType.GROUP, name="buffered")
+    return room, user
+
+
+def _message(room, user, pk: int, **kwargs) -> ChatMessage:
+    return ChatMessage(id=pk, room_id=room.pk, sender_id=user.pk, text=f"msg {pk}", **kwargs)
+
+
+@database_sync_to_async
+def _stored_ids() -> list[int]:
+    return list(ChatMessage.objects.order_by("id").values_list("id", flat=True))
+
+
+async def test_store_message_inserts_immediately_by_default(room_and_user):
+    room, user = room_and_user
+
+    message = await store_message(room.pk, user.pk, "hello")
+
+    assert message.pk is not None
+    assert await _stored_ids() == [message.pk]
+
+
+async def test_buffer_flushes_on_batch_size(room_and_user):
+    """
+    Накопление batch_size сообщений будит фоновый сброс раньше таймера.
+    """
+    room, user = room_and_user
+    buffer = MessageWriteBuffer(flush_interval=60, batch_size=3)
+
+    for pk in (1, 2, 3):
+        buffer.add(_message(room, user, pk))
+
+    for _ in range(50):
+        if len(buffer) == 0 and await _stored_ids():
+            break
+        await asyncio.sleep(0.02)
+
+    assert await _stored_ids() == [1, 2, 3]
+    await buffer.close()
+
+
+async def test_buffer_flushes_on_interval_and_keeps_server_timestamp(room_and_user):
+    room, user = room_and_user
+    buffer = MessageWriteBuffer(flush_interval=0.01, batch_size=100)
+    sent_at = timezone.now() - timedelta(seconds=5)
+
+    buffer.add(_message(room, user, 10, created_at=sent_at))
+    await asyncio.sleep(0.2)
+
+    stored = await database_sync_to_async(ChatMessage.objects.get)(pk=10)
+    assert stored.created_at == sent_at
+    await buffer.close()
+
+
+async def test_buffer_close_writes_everything(room_and_user):
+    """
+    Штатная остановка дописывает остаток буфера.
+    """
+    room, user = room_and_user
+    buffer = MessageWriteBuffer(flush_interval=60, batch_size=100)
+
+    for pk in range(20, 25):
+        buffer.add(_message(room, user, pk))
+    await buffer.close()
+
+    assert await _stored_ids() == [20, 21, 22, 23, 24]
+    assert len(buffer) == 0
+
+
+async def test_worker_shutdown_flushes_message_buffer(room_and_user):
+    """
+    Остановка воркера taskiq дописывает буфер, куда копятся ответы бота.
+    """
+    room, user = room_and_user
+
+    assert flush_chat_messages in taskiq_broker.event_handlers[TaskiqEvents.WORKER_SHUTDOWN]
+    message_buffer.add(_message(room, user, 30))
+    await flush_chat_messages(taskiq_broker.state)
+
+    assert await _stored_ids() == [30]
+    assert len(message_buffer) == 0
+
+
+async def test_buffer_bad_row_does_not_drop_batch(room_and_user):
+    room, user = room_and_user
+    buffer = MessageWriteBuffer(flush_interval=60, batch_size=100)
+
+    buffer.add(_message(room, user, 30))
+    buffer.add(ChatMessage(id=31, room_id=uuid.uuid4(), sender_id=user.pk, text="orphan"))
+    buffer.add(_message(room, user, 32))
+
+    assert await buffer.flush() == 2
+    assert await _stored_ids() == [30, 32]
+    await buffer.close()
+
+
+async def test_buffer_keeps_messages_while_database_is_down(room_and_user, monkeypatch):
+    """
+    Отказ БД не теряет уже разосланные сообщения: они ждут в буфере и пишутся после восстановления.
+    """
+    room, user = room_and_user
+    buffer = MessageWriteBuffer(flush_interval=0.01, batch_size=100)
+    bulk_create = ChatMessage.objects.bulk_create
+
+    def database_down(*args, **kwargs):
+        raise OperationalError("connection refused")
+
+    monkeypatch.setattr(ChatMessage.objects, "bulk_create", database_down)
+    for pk in (50, 51):
+        buffer.add(_message(room, user, pk))
+
+    assert await buffer.flush() == 0
+    assert len(buffer) == 2
+    first_delay = buffer.retry_delay
+    assert first_delay > 0
+    await buffer.flush()
+    assert buffer.retry_delay == first_delay * 2
+
+    monkeypatch.setattr(ChatMessage.objects, "bulk_create", bulk_create)
+    buffer.add(_message(room, user, 52))
+    assert await buffer.flush() == 3
+    assert buffer.retry_delay == 0
+    assert await _stored_ids() == [50, 51, 52]
+    await buffer.close()
+
+
+async def test_room_snapshot_written_with_message(room_and_user):
+    """
+    Снимок последнего сообщения обновляется той же записью; старое не затирает новое.
+    """
+    room, user = room_and_user
+
+    message = await store_message(room.pk, user.pk, "x" * 500)
+    await database_sync_to_async(room.refresh_from_db)()
+    assert room.last_message_at == message.created_at
+    assert room.last_message_preview == "x" * PREVIEW_LENGTH
+    assert room.last_sender_id == user.pk
+
+    buffer = MessageWriteBuffer(flush_interval=60, batch_size=100)
+    buffer.add(_message(room, user, 40, created_at=message.created_at - timedelta(minutes=1)))
+    buffer.add(_message(room, user, 41, created_at=message.created_at + timedelta(minutes=1)))
+    buffer.add(_message(room, user, 42, created_at=message.created_at + timedelta(seconds=30)))
+    await buffer.close()
+
+    await database_sync_to_async(room.refresh_from_db)()
+    assert room.last_message_preview == "msg 41"
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from apps.messaging.models import ChatRoom, ChatRoomParticipant
+from apps.utils.ratelimit import AsyncRateLimiter, RateLimiter, SlidingWindow, TokenBucket
+from apps.utils.throttling import RedisUserRateThrottle
+
+User = get_user_model()
+
+
+def test_sliding_window_counts_attempts_in_window(sync_redis_client):
+    limiter = RateLimiter(sync_redis_client)
+    limit = SlidingWindow(limit=3, window=60)
+
+    results = [limiter.hit("rl:window", limit) for _ in range(4)]
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results[:3]] == [2, 1, 0]
+    assert 0 < results[-1].retry_after <= 60
+    assert sync_redis_client.zcard("rl:window") == 3
+
+
+def test_sliding_window_frees_slot_after_window(sync_redis_client):
+    limiter = RateLimiter(sync_redis_client)
+    limit = SlidingWindow(limit=1, window=0.1)
+
+    assert limiter.hit("rl:short", limit)
+    assert not limiter.hit("rl:short", limit)
+    time.sleep(0.15)
+    assert limiter.hit("rl:short", limit)
+
+
+def test_token_bucket_burst_and_refill(sync_redis_client):
+    limiter = RateLimiter(sync_redis_client)
+    limit = TokenBucket(rate=20, capacity=2)
+
+    assert limiter.hit("rl:bucket", limit)
+    assert limiter.hit("rl:bucket", limit)
+    blocked = limiter.hit("rl:bucket", limit)
+    assert not blocked
+    assert 0 < blocked.retry_after <= 0.05
+
+    time.sleep(0.06)
+    assert limiter.hit("rl:bucket", limit)
+    assert sync_redis_client.pttl("rl:bucket") > 0
+
+
+async def test_concurrent_hits_never_exceed_limit(async_redis_client):
+    """
+    Проверка и учёт попытки атомарны: из 50 одновременных запросов проходят ровно 5.
+    """
+    limiter = AsyncRateLimiter(async_redis_client)
+    limit = SlidingWindow(limit=5, window=60)
+
+    results = await asyncio.gather(*(limiter.hit("rl:race", limit) for _ in range(50)))
+
+    assert sum(r.allowed for r in results) == 5
+
+
+@pytest.mark.django_db
+def test_drf_throttle_returns_429_with_retry_after(api_client, sync_redis_client, monkeypatch):
+    monkeypatch.setattr(RedisUserRateThrottle, "THROTTLE_RATES", {"user": "2/min"})
+    user = User.objects.create(email="throttled@example.com", display_name="throttled")
+    room = ChatRoom.objects.create(type=ChatRoom.RoomType.GROUP, name="throttled")
+    ChatRoomParticipant.objects.create(room=room, user=user)
+    api_client.force_authenticate(user)
+    url = reverse("chat-room-messages", args=[room.id])
+
+    assert api_client.get(url).status_code == 200
+    assert api_client.get(url).status_code == 200
+    response = api_client.get(url)
+
+    assert response.status_code == 429
+    assert int(response["Retry-After"]) > 0
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import re
 
 import pytest
 
-from apps.users.redis_code import CodeManager
+from apps.users.redis_code import AsyncCodeManager, CodeManager
 
 
 @pytest.mark.django_db
@@ -153,3 +154,32 @@ def test_is_request_limited_keeps_ttl_when_blocked(sync_redis_client):
     # ttl должен остаться чем-то разумным, а не -2 (нет ключа)
     assert ttl2 != -2
     # и обычно ttl2 <= ttl1, но это не критично, поэтому не проверяем строго
+
+
+async def test_async_verify_code_limited_counts_attempts(async_redis_client):
+    """
+    verify_code_limited: попытка учитывается и при неверном коде,
+    после max_attempts — лимит без проверки кода.
+    """
+    manager = await AsyncCodeManager.create()
+    key = "login_code:async@example.com"
+    await manager.set_code(key, "123456", expiry=300)
+
+    assert await manager.verify_code_limited("verify_code_ip:1.1.1.1", key, "000000", max_attempts=2) == (False, False)
+    assert await manager.verify_code_limited("verify_code_ip:1.1.1.1", key, "123456", max_attempts=2) == (False, True)
+    assert await manager.get_code(key) is None
+    assert await manager.verify_code_limited("verify_code_ip:1.1.1.1", key, "123456", max_attempts=2) == (True, False)
+
+
+async def test_async_code_is_consumed_once_under_concurrency(async_redis_client):
+    """
+    Параллельные попытки с верным кодом: успешна ровно одна.
+    """
+    manager = await AsyncCodeManager.create()
+    key = "login_code:race@example.com"
+    await manager.set_code(key, "123456", expiry=300)
+
+    results = await asyncio.gather(
+        *(manager.verify_code_limited(f"verify_code_ip:10.0.0.{i}", key, "123456") for i in range(10))
+    )
+    assert sum(valid for _, valid in results) == 1
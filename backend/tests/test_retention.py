@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import storages
+from django.utils import timezone
+
+from apps.complaints.models import Complaint, ComplaintStatus
+from apps.social.models import Activity
+from apps.utils.retention import RetentionPolicy, run_policy
+
+User = get_user_model()
+
+
+@pytest.fixture
+def backup_storage(settings, tmp_path):
+    """
+    Хранилище dbbackup во временной директории.
+    """
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "dbbackup": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": tmp_path},
+        },
+    }
+    return storages["dbbackup"]
+
+
+@pytest.fixture
+def user():
+    return User.objects.create(email="retention@example.com", display_name="Retention")
+
+
+def _activity(user, age_days: int) -> Activity:
+    activity = Activity.objects.create(
+        actor=user,
+        verb=Activity.Verb.FOLLOWED,
+        content_type=ContentType.objects.get_for_model(User),
+        object_id=user.pk,
+    )
+    Activity.objects.filter(pk=activity.pk).update(created_at=timezone.now() - timedelta(days=age_days))
+    return activity
+
+
+@pytest.mark.django_db
+def test_run_policy_deletes_only_expired_rows_in_chunks(user):
+    """
+    Удаляются только строки старше порога; пачки меньше общего объёма не мешают дочистить всё.
+    """
+    old = [_activity(user, age_days=200) for _ in range(5)]
+    fresh = _activity(user, age_days=10)
+
+    policy = RetentionPolicy(label="activity", model="social.Activity", date_field="created_at", days=180)
+    result = async_to_sync(run_policy)(policy, batch_size=2, pause=0)
+
+    assert result.deleted == len(old)
+    assert list(Activity.objects.values_list("pk", flat=True)) == [fresh.pk]
+
+
+@pytest.mark.django_db
+def test_run_policy_respects_max_rows(user):
+    """
+    max_rows ограничивает объём работы за один прогон.
+    """
+    for _ in range(5):
+        _activity(user, age_days=200)
+
+    policy = RetentionPolicy(label="activity", model="social.Activity", date_field="created_at", days=180)
+    result = async_to_sync(run_policy)(policy, batch_size=2, pause=0, max_rows=2)
+
+    assert result.deleted == 2
+    assert Activity.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_run_policy_archives_before_delete(user, backup_storage):
+    """
+    Архивируемая политика:
+    - пишет gzip JSONL в хранилище dbbackup,
+    - удаляет только закрытые жалобы старше порога.
+    """
+    content_type = ContentType.objects.get_for_model(User)
+    resolved = Complaint.objects.create(
+        author=user,
+        content_type=content_type,
+        object_id=user.pk,
+        reason="spam",
+        status=ComplaintStatus.RESOLVED,
+        resolved_at=timezone.now() - timedelta(days=400),
+    )
+    still_open = Complaint.objects.create(
+        author=user,
+        content_type=content_type,
+        object_id=user.pk,
+        reason="spam",
+        status=ComplaintStatus.OPEN,
+    )
+
+    policy = RetentionPolicy(
+        label="complaint",
+        model="complaints.Complaint",
+        date_field="resolved_at",
+        days=365,
+        filters={"status__in": ("resolved", "dismissed")},
+        archive=True,
+    )
+    result = async_to_sync(run_policy)(policy, batch_size=10, pause=0)
+
+    assert result.archived == 1
+    assert result.deleted == 1
+    assert list(Complaint.objects.values_list("pk", flat=True)) == [still_open.pk]
+
+    with backup_storage.open(result.archive_name) as fh:
+        rows = [json.loads(line) for line in gzip.decompress(fh.read()).decode().splitlines()]
+    assert [row["id"] for row in rows] == [resolved.pk]
+    assert rows[0]["reason"] == "spam"
+
+
+@pytest.mark.django_db
+def test_run_policy_without_matches_writes_no_archive(user, backup_storage):
+    policy = RetentionPolicy(
+        label="chat_message",
+        model="messaging.ChatMessage",
+        date_field="created_at",
+        days=30,
+        archive=True,
+    )
+    result = async_to_sync(run_policy)(policy, pause=0)
+
+    assert result.archived == 0
+    assert result.archive_name is None
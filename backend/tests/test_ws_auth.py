@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import pytest
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+
+from apps.messaging.routing import websocket_urlpatterns
+from apps.users.middleware import JWTAuthMiddlewareStack, get_jwt_user
+from apps.users.tokens import VersionedRefreshToken
+
+User = get_user_model()
+
+pytestmark = [
+    pytest.mark.django_db(transaction=True),
+    pytest.mark.usefixtures("in_memory_channel_layer"),
+]
+
+
+@database_sync_to_async
+def access_for(user) -> str:
+    return str(VersionedRefreshToken.for_user(user).access_token)
+
+
+def header_scope(token: str) -> dict:
+    return {"type": "websocket", "headers": [(b"authorization", f"Bearer {token}".encode())]}
+
+
+async def test_header_and_query_tokens_resolve_user(async_redis_client, create_user):
+    user = await create_user("ws@example.com")
+    token = await access_for(user)
+
+    resolved = await get_jwt_user(header_scope(token))
+    assert resolved.pk == user.pk
+    assert resolved.display_name == "ws"
+
+    resolved = await get_jwt_user({"type": "websocket", "query_string": f"token={token}".encode()})
+    assert resolved.pk == user.pk
+
+
+async def test_invalid_token_is_anonymous(async_redis_client, create_user):
+    user = await create_user("ws@example.com")
+    refresh = str(await database_sync_to_async(VersionedRefreshToken.for_user)(user))
+
+    assert not (await get_jwt_user({"type": "websocket"})).is_authenticated
+    assert not (await get_jwt_user(header_scope("garbage"))).is_authenticated
+    # refresh-токен вместо access не принимается
+    assert not (await get_jwt_user(header_scope(refresh))).is_authenticated
+
+
+async def test_reconnects_are_served_from_cache(async_redis_client, create_user):
+    """
+    Повторные подключения берут снимок из Redis: изменение строки в БД не видно до истечения TTL.
+    """
+    user = await create_user("ws@example.com")
+    token = await access_for(user)
+    await get_jwt_user(header_scope(token))
+
+    await User.objects.filter(pk=user.pk).aupdate(display_name="renamed")
+
+    assert (await get_jwt_user(header_scope(token))).display_name == "ws"
+
+
+async def test_revoked_tokens_are_rejected(async_redis_client, create_user):
+    user = await create_user("ws@example.com")
+    old = await access_for(user)
+    assert (await get_jwt_user(header_scope(old))).is_authenticated
+
+    await database_sync_to_async(user.revoke_tokens)()
+
+    assert not (await get_jwt_user(header_scope(old))).is_authenticated
+    assert (await get_jwt_user(header_scope(await access_for(user)))).pk == user.pk
+
+
+async def test_socket_without_token_is_closed(async_redis_client):
+    communicator = WebsocketCommunicator(JWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns)), "/ws/chat/")
+    connected, code = await communicator.connect()
+    assert not connected
+    assert code == 4001
+
+
+async def test_socket_with_token_is_accepted(async_redis_client, create_user):
+    user = await create_user("ws@example.com")
+    communicator = WebsocketCommunicator(
+        JWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns)), f"/ws/chat/?token={await access_for(user)}"
+    )
+    connected, _ = await communicator.connect()
+    assert connected
+    await communicator.disconnect()